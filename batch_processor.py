@@ -0,0 +1,148 @@
+import asyncio
+import functools
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from dotenv import load_dotenv
+from vision_gemini_processor import process_pdf_file
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Maximum number of documents of a batch processed at the same time
+# (OCR and Gemini calls are additionally bounded by the process-wide limits)
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+
+# Optional file inside a zip archive mapping PDF names to product types
+ZIP_MANIFEST_NAME = "manifest.json"
+
+def _extract_member(zip_path, name, spool_dir):
+    # Stream a zip member to its own temp file; the archive is opened per member
+    # since documents are extracted from several threads at once
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=spool_dir)
+    with os.fdopen(fd, "wb") as f, zipfile.ZipFile(zip_path) as archive, archive.open(name) as member:
+        shutil.copyfileobj(member, f)
+    return path
+
+def _read_manifest(archive, filename):
+    # The {PDF name: product type} manifest of an archive, if it has one
+    if ZIP_MANIFEST_NAME not in archive.namelist():
+        return {}
+    try:
+        manifest = json.loads(archive.read(ZIP_MANIFEST_NAME))
+    except ValueError as e:
+        raise ValueError(f"{ZIP_MANIFEST_NAME} in {filename} is not valid JSON: {str(e)}")
+    if not isinstance(manifest, dict):
+        raise ValueError(f"{ZIP_MANIFEST_NAME} in {filename} must be a JSON object mapping PDF names to product types")
+    return manifest
+
+def _spool_upload(upload, spool_dir):
+    # Copy the upload to our own temp file so it outlives the request body
+    fd, path = tempfile.mkstemp(dir=spool_dir)
+    with os.fdopen(fd, "wb") as f:
+        upload.file.seek(0)
+        shutil.copyfileobj(upload.file, f)
+    return path
+
+async def collect_batch_documents(uploads, product_types):
+    """
+    Spool uploaded PDFs and zip archives to a temp directory and list the documents to process.
+
+    product_types holds one product type per upload, or a single one for all uploads;
+    the product type of a zip archive applies to every PDF inside it unless the
+    archive contains a manifest.json mapping file names to product types.
+
+    Returns the documents and the temp directory, which the caller removes when done.
+    Each document is a dict with index, filename, product_type and either a
+    load() callable returning the path of the PDF on disk or an error message.
+    Raises ValueError for mismatched product types or an invalid manifest.
+    """
+    if len(product_types) == 1:
+        product_types = product_types * len(uploads)
+    if len(product_types) != len(uploads):
+        raise ValueError("Provide one product type per uploaded file, or a single product type for all files")
+
+    spool_dir = tempfile.mkdtemp(prefix="batch_")
+    documents = []
+
+    def add_document(filename, product_type, load=None, error=None):
+        documents.append({
+            "index": len(documents),
+            "filename": filename,
+            "product_type": product_type,
+            "load": load,
+            "error": error
+        })
+
+    try:
+        for upload, product_type in zip(uploads, product_types):
+            filename = upload.filename or ""
+            if filename.lower().endswith(".pdf"):
+                path = await asyncio.to_thread(_spool_upload, upload, spool_dir)
+                add_document(filename, product_type, load=lambda path=path: path)
+            elif filename.lower().endswith(".zip"):
+                path = await asyncio.to_thread(_spool_upload, upload, spool_dir)
+                try:
+                    with zipfile.ZipFile(path) as archive:
+                        manifest = _read_manifest(archive, filename)
+                        members = archive.infolist()
+                except zipfile.BadZipFile:
+                    add_document(filename, product_type, error="File is not a valid zip archive")
+                    continue
+
+                for member in members:
+                    name = member.filename
+                    if member.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                        continue
+                    member_product_type = manifest.get(name) or manifest.get(os.path.basename(name)) or product_type
+                    # Members are extracted lazily and removed once processed, so only
+                    # documents in flight take up extra disk space
+                    add_document(
+                        f"{filename}/{name}", member_product_type,
+                        load=functools.partial(_extract_member, path, name, spool_dir)
+                    )
+            else:
+                add_document(filename, product_type, error="File must be a PDF or a zip archive of PDFs")
+    except BaseException:
+        cleanup_batch(spool_dir)
+        raise
+
+    return documents, spool_dir
+
+async def process_batch_documents(documents, force_refresh=False, max_workers=None):
+    """
+    Process batch documents with bounded concurrency, yielding (document, result) as each one finishes
+    """
+    semaphore = asyncio.Semaphore(max_workers or BATCH_MAX_WORKERS)
+
+    async def process_document(document):
+        if document["error"]:
+            return document, {"error": document["error"]}
+        async with semaphore:
+            pdf_path = None
+            try:
+                pdf_path = await asyncio.to_thread(document["load"])
+                result = await process_pdf_file(pdf_path, document["product_type"], force_refresh)
+            except Exception as e:
+                result = f"⚠️ Error processing PDF: {str(e)}"
+            finally:
+                if pdf_path:
+                    os.remove(pdf_path)
+        return document, result
+
+    tasks = [asyncio.create_task(process_document(document)) for document in documents]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away: stop the documents still in progress
+        for task in tasks:
+            task.cancel()
+
+def cleanup_batch(spool_dir):
+    """
+    Remove the temp directory of a finished batch
+    """
+    shutil.rmtree(spool_dir, ignore_errors=True)
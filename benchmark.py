@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the PDF processing pipeline.
+
+Usage:
+    python benchmark.py render [fixture.pdf] [--workers 0,1,2,4,8,16] [--pages 64]
+    python benchmark.py vision-client [--requests 200] [--concurrency 1,16] [--pool-size 4]
+    python benchmark.py ocr-backends fixtures/ [--backends vision,tesseract,replay]
+    python benchmark.py classify [--product-type HEALTH] [--documents 50] [--concurrency 8] [--text-file text.txt]
+    python benchmark.py vehicle-rules [policy.txt ...] [--iterations 1000] [--verbose]
+    python benchmark.py layouts fixtures/ [--iterations 100]
+    python benchmark.py policy-writes [--writes 2000] [--concurrency 1,8,32] [--synchronous FULL] [--batch-size 256]
+    python benchmark.py policy-import [--rows 1000000] [--formats ndjson,csv,json] [--batch-rows 10000]
+    python benchmark.py policy-queries [--rows 1000000] [--iterations 20]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def make_fixture_pdf(path, pages):
+    """Write a synthetic multi-page policy-like PDF (text, tables and shading) to path"""
+    import fitz  # PyMuPDF for PDF processing
+
+    pdf_document = fitz.open()
+    for page_num in range(pages):
+        page = pdf_document.new_page(width=595, height=842)  # A4
+        page.insert_text((50, 60), f"POLICY SCHEDULE - PAGE {page_num + 1}", fontsize=16)
+        for row in range(40):
+            y = 100 + row * 17
+            page.draw_rect(fitz.Rect(45, y - 12, 550, y + 4), color=(0.6, 0.6, 0.6), fill=(0.95, 0.95, 0.95) if row % 2 else None)
+            page.insert_text((50, y), f"Field {row + 1:02d}: Policy No 3005/{page_num:04d}/{row:03d}  Premium Rs. {1000 + row * 37:,}.00", fontsize=10)
+    pdf_document.save(path)
+    pdf_document.close()
+
+async def render_all_pages(pdf_path, page_count, workers, batch_size):
+    from page_renderer import render_settings
+    from render_pool import make_render_pool, render_page_range, render_batches
+
+    settings = render_settings()
+    batches = [list(range(first, min(first + batch_size, page_count))) for first in range(0, page_count, batch_size)]
+    pool = make_render_pool(workers) if workers > 0 else None
+
+    async def render_batch(page_nums):
+        if pool:
+            return await asyncio.get_running_loop().run_in_executor(pool, render_page_range, pdf_path, page_nums, settings)
+        # Like the API without a pool: one batch at a time on a thread
+        return await asyncio.to_thread(render_page_range, pdf_path, page_nums, settings)
+
+    try:
+        if pool:
+            # Spawn the workers before timing so process start-up is not counted
+            await asyncio.gather(*(
+                asyncio.get_running_loop().run_in_executor(pool, render_page_range, pdf_path, [0], settings)
+                for _ in range(workers)
+            ))
+        started = time.perf_counter()
+        rendered_pages = 0
+        async for page_nums, images, renders, error in render_batches(batches, render_batch, workers or 1):
+            if error:
+                raise error
+            rendered_pages += len(images)
+        return rendered_pages, time.perf_counter() - started
+    finally:
+        if pool:
+            pool.shutdown()
+
+def bench_render(args):
+    """Pages per second of the render stage for each worker count"""
+    pdf_path = args.fixture
+    temp_path = None
+    if not pdf_path:
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        make_fixture_pdf(temp_path, args.pages)
+        pdf_path = temp_path
+
+    import fitz  # PyMuPDF for PDF processing
+
+    with fitz.open(pdf_path) as pdf_document:
+        page_count = len(pdf_document)
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+
+    print(f"🖨️  Rendering {page_count} pages of {pdf_path} ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>8}{'seconds':>10}{'pages/s':>10}{'speedup':>9}")
+    baseline = None
+    try:
+        for workers in worker_counts:
+            rendered_pages, seconds = asyncio.run(render_all_pages(pdf_path, page_count, workers, args.batch_size))
+            pages_per_second = rendered_pages / seconds
+            baseline = baseline or pages_per_second
+            print(f"{workers:>8}{seconds:>10.2f}{pages_per_second:>10.1f}{pages_per_second / baseline:>8.1f}x")
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+def start_vision_stub(latency):
+    """Start a local gRPC server answering BatchAnnotateImages with empty annotations; returns (server, port)"""
+    import grpc
+    from google.cloud.vision_v1 import AnnotateImageResponse, BatchAnnotateImagesRequest, BatchAnnotateImagesResponse
+
+    def batch_annotate_images(request, context):
+        time.sleep(latency)
+        return BatchAnnotateImagesResponse(responses=[AnnotateImageResponse() for _ in request.requests])
+
+    handler = grpc.method_handlers_generic_handler("google.cloud.vision.v1.ImageAnnotator", {
+        "BatchAnnotateImages": grpc.unary_unary_rpc_method_handler(
+            batch_annotate_images,
+            request_deserializer=BatchAnnotateImagesRequest.deserialize,
+            response_serializer=BatchAnnotateImagesResponse.serialize
+        )
+    })
+    server = grpc.server(ThreadPoolExecutor(max_workers=64))
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, port
+
+def bench_vision_client(args):
+    """Per-request latency of a client per request (the old behaviour) versus the shared client pool"""
+    from google.cloud import vision_v1
+    from vision_client import VisionClientManager
+
+    server, port = start_vision_stub(args.latency_ms / 1000)
+    endpoint = f"127.0.0.1:{port}"
+    payload = os.urandom(args.image_kb * 1024)
+    image_request = vision_v1.AnnotateImageRequest(
+        image=vision_v1.Image(content=payload),
+        features=[vision_v1.Feature(type_=vision_v1.Feature.Type.DOCUMENT_TEXT_DETECTION)]
+    )
+    shared = VisionClientManager(endpoint=endpoint, pool_size=args.pool_size, insecure=True)
+
+    def fresh_request():
+        manager = VisionClientManager(endpoint=endpoint, pool_size=1, insecure=True)
+        try:
+            manager.get_client().batch_annotate_images(requests=[image_request])
+        finally:
+            manager.close()
+
+    def shared_request():
+        shared.get_client().batch_annotate_images(requests=[image_request])
+
+    def timed(request):
+        started = time.perf_counter()
+        request()
+        return time.perf_counter() - started
+
+    print(f"🔌 {args.requests} requests of {args.image_kb} KB against a local stub ({args.latency_ms} ms server time)")
+    print(f"{'client':<22}{'concurrency':>12}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'req/s':>9}")
+    try:
+        # Warm up the shared pool so its one-off channel setup is not counted
+        for _ in range(args.pool_size):
+            shared_request()
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            for name, request in (("client per request", fresh_request), (f"shared pool ({args.pool_size})", shared_request)):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    latencies = sorted(executor.map(lambda _: timed(request), range(args.requests)))
+                seconds = time.perf_counter() - started
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                print(
+                    f"{name:<22}{concurrency:>12}{statistics.mean(latencies) * 1000:>10.2f}"
+                    f"{statistics.median(latencies) * 1000:>9.2f}{p95 * 1000:>9.2f}{args.requests / seconds:>9.1f}"
+                )
+    finally:
+        shared.close()
+        server.stop(None)
+
+def bench_ocr_backends(args):
+    """Throughput and field recall of each OCR backend on a fixture directory (see render_report.py for fixtures)"""
+    from page_renderer import render_settings
+    from ocr_backends import get_ocr_backend
+    from render_report import normalize, expected_field_values, render_document
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.fixture_dir, "*.pdf")))
+    if not pdf_paths:
+        print(f"❌ No PDF fixtures found in {args.fixture_dir}")
+        return 1
+
+    # Render once; every backend reads the same page images
+    documents = []
+    for pdf_path in pdf_paths:
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        fields_path = os.path.join(args.fixture_dir, f"{name}.fields.json")
+        expected = []
+        if os.path.exists(fields_path):
+            with open(fields_path) as f:
+                expected = expected_field_values(json.load(f))
+        images, _ = render_document(pdf_path, render_settings())
+        documents.append((name, images, expected))
+    page_count = sum(len(images) for _, images, _ in documents)
+
+    print(f"🔎 {len(documents)} documents, {page_count} pages")
+    print(f"{'backend':<12}{'seconds':>10}{'pages/s':>10}{'errors':>8}{'fields':>11}")
+    for backend_name in args.backends.split(","):
+        backend = get_ocr_backend(backend_name)
+        errors = found = expected_total = 0
+        started = time.perf_counter()
+        for name, images, expected in documents:
+            texts = []
+            for first in range(0, len(images), backend.max_batch_size):
+                batch = images[first:first + backend.max_batch_size]
+                for result in backend.ocr_images(list(range(first, first + len(batch))), batch):
+                    errors += 1 if result["error"] else 0
+                    texts.append(result["text"])
+            text = normalize("\n".join(texts))
+            found += sum(1 for value in expected if value in text)
+            expected_total += len(expected)
+        seconds = time.perf_counter() - started
+        print(f"{backend_name:<12}{seconds:>10.2f}{page_count / seconds:>10.1f}{errors:>8}{f'{found}/{expected_total}':>11}")
+
+def bench_classify(args):
+    """Latency and throughput of the classify stage with the configured LLM extractor (e.g. the local stub server)"""
+    from vision_gemini_processor import classify_document_text, extractor_for, is_processed_result, resolve_product_type
+
+    insurance_type, vehicle_type = resolve_product_type(args.product_type)
+    if args.text_file:
+        with open(args.text_file) as f:
+            page_texts = f.read().split("\f")
+    else:
+        page_texts = [f"POLICY SCHEDULE PAGE {page_num + 1}\nPolicy No 3005/{page_num:04d}\nInsured Name: Test Person\nPremium Rs. 12,345.00" for page_num in range(6)]
+    full_text = "\n".join(text for text in page_texts if text)
+
+    async def run():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def classify_one(_):
+            async with semaphore:
+                started = time.perf_counter()
+                result = await classify_document_text(full_text, insurance_type, vehicle_type, page_texts)
+                return time.perf_counter() - started, is_processed_result(result)
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(classify_one(document) for document in range(args.documents)))
+        return outcomes, time.perf_counter() - started
+
+    print(f"🧠 {args.documents} {args.product_type} documents with {extractor_for(insurance_type, vehicle_type).name}, concurrency {args.concurrency}")
+    outcomes, seconds = asyncio.run(run())
+    latencies = sorted(latency for latency, _ in outcomes)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"   mean {statistics.mean(latencies) * 1000:.1f} ms, p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+    print(f"   {args.documents / seconds:.1f} documents/s, {sum(1 for _, ok in outcomes if not ok)} failed")
+
+def bench_vehicle_rules(args):
+    """Latency, coverage and prompt size reduction of the vehicle rule pre-extractor"""
+    from vehicle_rules import VEHICLE_RULES_MIN_CONFIDENCE, extract_vehicle_fields
+    from vision_gemini_processor import build_vehicle_prompt, vehicle_field_template
+
+    if args.text_files:
+        texts = []
+        for path in args.text_files:
+            with open(path) as f:
+                texts.append((os.path.basename(path), f.read().replace("\f", "\n")))
+    else:
+        texts = [("synthetic", "\n".join([
+            "ABC General Insurance Company Limited - Private Car Package Policy Schedule",
+            "Policy No. : 3001/A/123456789/00/000   Date of Issue: 12-Mar-2024",
+            "Insured Name: Test Person   Mobile No: 98765 43210   Email ID: test.person@example.com",
+            "Address: 12, Gandhi Street, Anna Nagar, Chennai - 600040   PAN No: ABCPK1234L",
+            "Period of Insurance: From 00:00 hrs of 15/03/2024 to Midnight of 14/03/2025",
+            "Total IDV (Rs.): 5,45,000   CGST @ 9% 1,234.00  SGST @ 9% 1,234.00   Total Premium (Rs.): 16,178.00"
+        ] * 4))]
+
+    template = vehicle_field_template("Car")
+    print(f"{'document':<24}{'chars':>8}{'us/doc':>9}{'found':>7}{'filled':>8}{'prompt':>9}{'trimmed':>9}")
+    for name, text in texts:
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            fields = extract_vehicle_fields(text)
+        per_document = (time.perf_counter() - started) / args.iterations
+        filled = [field for field, match in fields.items() if match["confidence"] >= VEHICLE_RULES_MIN_CONFIDENCE]
+        full_prompt = build_vehicle_prompt(text, "Car")
+        trimmed_prompt = build_vehicle_prompt(text, "Car", [field for field in template if field not in filled])
+        print(
+            f"{name[:23]:<24}{len(text):>8}{per_document * 1e6:>9.0f}{len(fields):>7}{len(filled):>8}"
+            f"{len(full_prompt):>9}{len(trimmed_prompt):>9}"
+        )
+        if args.verbose:
+            for field, match in fields.items():
+                print(f"   {field:<18}{match['confidence']:>5.2f}  {match['rule']:<11}{match['value']}")
+
+def bench_layouts(args):
+    """Layout lookup latency and template coverage of PDF fixtures against the layout index"""
+    import fitz  # PyMuPDF for PDF processing
+    from layout_templates import LAYOUT_MIN_CONFIDENCE, get_layout_index, read_pdf_layout
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.fixture_dir, "*.pdf")))
+    if not pdf_paths:
+        print(f"❌ No PDF fixtures found in {args.fixture_dir}")
+        return 1
+
+    index = get_layout_index()
+    print(f"🗂️ {len(index.layouts)} known layouts in {index.path}")
+    print(f"{'document':<28}{'read ms':>9}{'lookup us':>11}{'similarity':>12}{'fields':>8}{'trusted':>9}  insurer")
+    for pdf_path in pdf_paths:
+        started = time.perf_counter()
+        pdf_document = fitz.open(pdf_path)
+        layout = read_pdf_layout(pdf_document)
+        pdf_document.close()
+        read_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            match = index.lookup(layout)
+        lookup_seconds = (time.perf_counter() - started) / args.iterations
+
+        name = os.path.basename(pdf_path)[:27]
+        if match is None:
+            print(f"{name:<28}{read_seconds * 1000:>9.1f}{lookup_seconds * 1e6:>11.0f}  no text layer")
+            continue
+        trusted = sum(1 for field in match["fields"].values() if field["confidence"] >= LAYOUT_MIN_CONFIDENCE)
+        print(
+            f"{name:<28}{read_seconds * 1000:>9.1f}{lookup_seconds * 1e6:>11.0f}{match['score']:>12.3f}"
+            f"{len(match['fields']):>8}{trusted:>9}  {match['insurer'] or '-'}"
+        )
+
+def sample_policy_row(number):
+    """A synthetic policy row in POLICY_COLUMNS order"""
+    return (
+        f"Customer {number}", f"customer{number}@example.com", ("ACKO", "HDFC ERGO", "ICICI Lombard")[number % 3],
+        f"3001/{number:08d}", "2025-04-01", "2026-03-31", "2025-03-28", "2026-03-31", ("bike", "car")[number % 2],
+        "2025-03-28 10:00:00"
+    )
+
+def bench_policy_writes(args):
+    """Durable policy inserts per second from concurrent clients: a connection per write (the old behaviour), the WAL pool and group commit"""
+    import sqlite3
+    from database import CREATE_POLICIES_TABLE, INSERT_POLICY, PolicyStore, PolicyWriteBatcher
+
+    def connection_per_write(path):
+        conn = sqlite3.connect(path)
+        conn.execute(CREATE_POLICIES_TABLE)
+        conn.close()
+
+        def write(number):
+            conn = sqlite3.connect(path)
+            conn.execute(INSERT_POLICY, sample_policy_row(number))
+            conn.commit()
+            conn.close()
+        return write, None
+
+    def pooled(path):
+        store = PolicyStore(path, pool_size=args.pool_size, synchronous=args.synchronous)
+        return (lambda number: store.insert_policy(sample_policy_row(number))), store.close
+
+    def group_commit(path):
+        store = PolicyStore(path, pool_size=args.pool_size, synchronous=args.synchronous)
+        writer = PolicyWriteBatcher(store, args.batch_size, args.batch_delay_ms / 1000)
+
+        def close():
+            writer.close()
+            store.close()
+            return f"{writer.rows / max(writer.batches, 1):.1f} rows per commit"
+        return (lambda number: writer.submit(sample_policy_row(number)).result()), close
+
+    def timed(write, number):
+        started = time.perf_counter()
+        try:
+            write(number)
+            return time.perf_counter() - started, None
+        except sqlite3.OperationalError as e:
+            return time.perf_counter() - started, str(e)
+
+    print(f"💾 {args.writes} policy inserts per run, synchronous={args.synchronous} for the pool")
+    print(f"{'writer':<22}{'concurrency':>12}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    for concurrency in (int(value) for value in args.concurrency.split(",")):
+        writers = (("connection per write", connection_per_write), (f"WAL pool ({args.pool_size})", pooled), ("group commit", group_commit))
+        for name, make_writer in writers:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                write, close = make_writer(os.path.join(tmp_dir, "insurance.db"))
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    results = list(executor.map(lambda number: timed(write, number), range(args.writes)))
+                seconds = time.perf_counter() - started
+                note = close() if close else ""
+            latencies = sorted(latency for latency, _ in results)
+            errors = sum(1 for _, error in results if error)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(
+                f"{name:<22}{concurrency:>12}{(args.writes - errors) / seconds:>10.0f}"
+                f"{statistics.median(latencies) * 1000:>9.2f}{p95 * 1000:>9.2f}{errors:>8}  {note or ''}"
+            )
+
+def write_policy_import_file(path, import_format, rows, invalid_every):
+    """Write a synthetic bulk import file of rows policies, every invalid_every-th one missing its email"""
+    import csv
+    from database import POLICY_COLUMNS
+
+    fields = POLICY_COLUMNS[:-1]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        if import_format == "csv":
+            writer.writerow(fields)
+        elif import_format == "json":
+            f.write("[\n")
+        for number in range(rows):
+            record = dict(zip(fields, sample_policy_row(number)))
+            if invalid_every and number % invalid_every == invalid_every - 1:
+                del record["email"]
+            if import_format == "csv":
+                # An invalid row is short a column, so its last field is missing
+                writer.writerow([record[field] for field in fields if field in record])
+            else:
+                separator = ",\n" if import_format == "json" and number < rows - 1 else "\n"
+                f.write(json.dumps(record) + separator)
+        if import_format == "json":
+            f.write("]\n")
+
+def bench_policy_import(args):
+    """Rows per second and peak memory of the bulk policy import for each upload format"""
+    import resource
+    from database import PolicyStore
+    from policy_import import import_policies
+
+    print(f"📥 {args.rows} rows per format, {args.batch_rows} rows per transaction")
+    print(f"{'format':<8}{'file MB':>9}{'rows/s':>10}{'inserted':>10}{'failed':>8}{'peak RSS MB':>13}")
+    for import_format in args.formats.split(","):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, f"policies.{import_format}")
+            write_policy_import_file(path, import_format, args.rows, args.invalid_every)
+            store = PolicyStore(os.path.join(tmp_dir, "insurance.db"))
+            with open(path, "rb") as f:
+                summary = import_policies(f, import_format, store, batch_rows=args.batch_rows)
+            store.close()
+            # ru_maxrss is in KB on Linux
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(
+                f"{import_format:<8}{os.path.getsize(path) / 1e6:>9.1f}{summary['rows_per_second']:>10}"
+                f"{summary['inserted']:>10}{summary['failed']:>8}{peak_mb:>13.0f}"
+            )
+
+def bench_policy_queries(args):
+    """Lookup latency on the original policies table, the migration time, the same lookups on the indexed schema and page listing cost by depth"""
+    import sqlite3
+    from database import POLICY_COLUMNS, POLICY_FILTERS, POLICY_RANGE_ORDER, PolicyStore, migrate_create_policies, migrate_schema
+
+    # Mixed date formats, as the original table accepted any text
+    date_styles = ("{y}-{m:02d}-{d:02d}", "{d:02d}-{m:02d}-{y}", "{d:02d}/{m:02d}/{y}")
+
+    def legacy_row(number):
+        row = list(sample_policy_row(number))
+        day, month = number % 28 + 1, number % 12 + 1
+        style = date_styles[number % len(date_styles)]
+        row[4] = style.format(y=2025, m=month, d=day)
+        row[5] = row[7] = style.format(y=2026, m=month, d=day)
+        row[6] = style.format(y=2025, m=month, d=day)
+        # Resubmitted policies: every duplicate_every-th row repeats an earlier policy number
+        if args.duplicate_every and number % args.duplicate_every == args.duplicate_every - 1:
+            row[2:4] = sample_policy_row(number - 3)[2:4]
+        return tuple(row)
+
+    lookups = (
+        ("policy_number =", "SELECT id FROM policies WHERE policy_number = ?", ("3001/00500000",)),
+        ("email =", "SELECT id FROM policies WHERE email = ?", ("customer123456@example.com",)),
+        ("insurer count", "SELECT COUNT(*) FROM policies WHERE insurer = ?", ("ACKO",)),
+        ("expiry in 30 days", "SELECT id FROM policies WHERE expiry_date BETWEEN ? AND ? LIMIT 100", ("2026-03-01", "2026-03-30"))
+    )
+
+    def run_lookups(conn, label):
+        for name, sql, params in lookups:
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                rows = conn.execute(sql, params).fetchall()
+            seconds = (time.perf_counter() - started) / args.iterations
+            print(f"{label:<10}{name:<20}{seconds * 1000:>10.3f}{len(rows):>8}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(os.path.join(tmp_dir, "insurance.db"), isolation_level=None)
+        migrate_create_policies(conn)
+        conn.execute("PRAGMA user_version = 1")
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        placeholders = ", ".join("?" * len(POLICY_COLUMNS))
+        conn.executemany(
+            f"INSERT INTO policies ({', '.join(POLICY_COLUMNS)}) VALUES ({placeholders})",
+            (legacy_row(number) for number in range(args.rows))
+        )
+        conn.execute("COMMIT")
+        print(f"🗄️ {args.rows} policies loaded into the original schema in {time.perf_counter() - started:.1f} s")
+        print(f"{'schema':<10}{'lookup':<20}{'ms':>10}{'rows':>8}")
+        run_lookups(conn, "original")
+
+        started = time.perf_counter()
+        applied = migrate_schema(conn)
+        kept, duplicates = (conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("policies", "policy_duplicates"))
+        print(f"🔧 migrations {applied} in {time.perf_counter() - started:.1f} s: {kept} policies kept, {duplicates} duplicates set aside")
+        run_lookups(conn, "indexed")
+        conn.close()
+
+        # Listing pages: keyset pagination (GET /policies) against LIMIT/OFFSET at increasing depth
+        store = PolicyStore(os.path.join(tmp_dir, "insurance.db"))
+        print(f"{'listing':<46}{'page':>8}{'keyset ms':>11}{'offset ms':>11}")
+        listings = (
+            ({}, "all policies"),
+            ({"insurer": "ACKO"}, "insurer = ACKO"),
+            ({"vehicle_type": "car"}, "vehicle_type = car"),
+            ({"expiry_from": "2026-04-01", "expiry_to": "2026-06-30"}, "expiry in Apr-Jun"),
+            ({"insurer": "ACKO", "expiry_from": "2026-04-01", "expiry_to": "2026-12-31"}, "insurer = ACKO, expiry from Apr"),
+            ({"vehicle_type": "car", "start_from": "2025-07-01"}, "vehicle_type = car, start from Jul")
+        )
+        for filters, label in listings:
+            conditions = [f"{POLICY_FILTERS[name][0]} {POLICY_FILTERS[name][1]} ?" for name in filters]
+            where = " WHERE " + " AND ".join(conditions) if conditions else ""
+            order_column = next((column for names, column in POLICY_RANGE_ORDER if any(name in filters for name in names)), None)
+            with store.connection() as conn:
+                matching = conn.execute("SELECT COUNT(*) FROM policies" + where, list(filters.values())).fetchone()[0]
+            for page in (1, 100, 1000, matching // args.page_size):
+                if page < 1 or (page - 1) * args.page_size >= matching:
+                    continue
+                # The cursor a client paging from the start would hold at this depth
+                cursor = store.list_policies(filters, fields=("id",), limit=(page - 1) * args.page_size)[1] if page > 1 else None
+                started = time.perf_counter()
+                for _ in range(args.iterations):
+                    store.list_policies(filters, cursor=cursor, limit=args.page_size)
+                keyset = (time.perf_counter() - started) / args.iterations
+                offset_sql = (
+                    "SELECT * FROM policies" + where
+                    + f" ORDER BY {order_column + ', ' if order_column else ''}id LIMIT ? OFFSET ?"
+                )
+                started = time.perf_counter()
+                with store.connection() as conn:
+                    for _ in range(args.iterations):
+                        conn.execute(offset_sql, list(filters.values()) + [args.page_size, (page - 1) * args.page_size]).fetchall()
+                offset = (time.perf_counter() - started) / args.iterations
+                print(f"{label:<46}{page:>8}{keyset * 1000:>11.3f}{offset * 1000:>11.3f}")
+        store.close()
+
+BENCHMARKS = {
+    "render": bench_render,
+    "vision-client": bench_vision_client,
+    "ocr-backends": bench_ocr_backends,
+    "classify": bench_classify,
+    "vehicle-rules": bench_vehicle_rules,
+    "layouts": bench_layouts,
+    "policy-writes": bench_policy_writes,
+    "policy-import": bench_policy_import,
+    "policy-queries": bench_policy_queries
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the PDF processing pipeline")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    render = subparsers.add_parser("render", help="Render stage throughput by worker count")
+    render.add_argument("fixture", nargs="?", help="PDF to render (a synthetic document is generated when omitted)")
+    render.add_argument("--workers", default="0,1,2,4,8,16", help="Comma separated worker counts; 0 renders on a thread")
+    render.add_argument("--pages", type=int, default=64, help="Pages of the synthetic document")
+    render.add_argument("--batch-size", type=int, default=8, help="Pages per render batch")
+
+    vision_client = subparsers.add_parser("vision-client", help="Shared Vision client pool versus a client per request")
+    vision_client.add_argument("--requests", type=int, default=200, help="Requests per run")
+    vision_client.add_argument("--concurrency", default="1,16", help="Comma separated numbers of concurrent callers")
+    vision_client.add_argument("--pool-size", type=int, default=4, help="Channels in the shared pool")
+    vision_client.add_argument("--image-kb", type=int, default=200, help="Image payload size per request")
+    vision_client.add_argument("--latency-ms", type=float, default=5, help="Simulated server processing time")
+
+    ocr_backends = subparsers.add_parser("ocr-backends", help="OCR backend throughput and field recall")
+    ocr_backends.add_argument("fixture_dir", help="Directory of PDF fixtures (with optional <name>.fields.json)")
+    ocr_backends.add_argument("--backends", default="vision,tesseract", help="Comma separated OCR backends")
+
+    classify = subparsers.add_parser("classify", help="Classify stage latency and throughput with the configured LLM extractor")
+    classify.add_argument("--product-type", default="HEALTH", choices=["CAR", "BIKE", "HEALTH"])
+    classify.add_argument("--documents", type=int, default=50, help="Documents to classify")
+    classify.add_argument("--concurrency", type=int, default=8, help="Documents classified at the same time")
+    classify.add_argument("--text-file", help="Document text, pages separated by form feeds (synthetic text when omitted)")
+
+    vehicle_rules = subparsers.add_parser("vehicle-rules", help="Vehicle rule pre-extractor latency, coverage and prompt size")
+    vehicle_rules.add_argument("text_files", nargs="*", help="OCR text of vehicle policies (a synthetic text when omitted)")
+    vehicle_rules.add_argument("--iterations", type=int, default=1000, help="Extractions per document for timing")
+    vehicle_rules.add_argument("--verbose", action="store_true", help="Print every field found with its confidence")
+
+    layouts = subparsers.add_parser("layouts", help="Layout lookup latency and template coverage against the layout index")
+    layouts.add_argument("fixture_dir", help="Directory of vehicle policy PDFs")
+    layouts.add_argument("--iterations", type=int, default=100, help="Lookups per document for timing")
+
+    policy_writes = subparsers.add_parser("policy-writes", help="Policy insert throughput from concurrent clients")
+    policy_writes.add_argument("--writes", type=int, default=2000, help="Inserts per run")
+    policy_writes.add_argument("--concurrency", default="1,8,32", help="Comma separated numbers of concurrent clients")
+    policy_writes.add_argument("--pool-size", type=int, default=8, help="Connections in the pool")
+    policy_writes.add_argument("--synchronous", default="FULL", choices=["FULL", "NORMAL"], help="SQLite synchronous level of the pool")
+    policy_writes.add_argument("--batch-size", type=int, default=256, help="Maximum rows per group commit")
+    policy_writes.add_argument("--batch-delay-ms", type=float, default=5, help="Maximum wait for a group commit to fill")
+
+    policy_import = subparsers.add_parser("policy-import", help="Bulk policy import rows per second and peak memory")
+    policy_import.add_argument("--rows", type=int, default=1000000, help="Rows per upload")
+    policy_import.add_argument("--formats", default="ndjson,csv,json", help="Comma separated upload formats")
+    policy_import.add_argument("--batch-rows", type=int, default=10000, help="Rows per transaction")
+    policy_import.add_argument("--invalid-every", type=int, default=1000, help="Make every n-th row invalid (0 for none)")
+
+    policy_queries = subparsers.add_parser("policy-queries", help="Policy lookups before and after the indexed schema migration")
+    policy_queries.add_argument("--rows", type=int, default=1000000, help="Policies in the table")
+    policy_queries.add_argument("--iterations", type=int, default=20, help="Runs of each lookup for timing")
+    policy_queries.add_argument("--page-size", type=int, default=50, help="Policies per listed page")
+    policy_queries.add_argument("--duplicate-every", type=int, default=500, help="Make every n-th row repeat an earlier policy number (0 for none)")
+
+    args = parser.parse_args()
+    return BENCHMARKS[args.benchmark](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,181 @@
 import sqlite3
+import threading
+import queue
+import json
+import time
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from dotenv import load_dotenv
 from models import BikeInsurancePolicy
 
-def save_policy(policy: BikeInsurancePolicy):
-    # Connect to the database (creates it if not already there)
-    conn = sqlite3.connect("insurance.db")
-    cursor = conn.cursor()
+# Load environment variables from .env file
+load_dotenv()
+
+# Policy database settings
+POLICY_DB_PATH = os.getenv("POLICY_DB_PATH", "insurance.db")
+
+# Connections kept open and shared by requests
+POLICY_DB_POOL_SIZE = max(1, int(os.getenv("POLICY_DB_POOL_SIZE", "8")))
+
+# SQLite synchronous level in WAL mode: FULL syncs the WAL on every commit so an
+# acknowledged write survives power loss; NORMAL only syncs at checkpoints and
+# may lose the last commits on power loss (never on a crash of the process)
+POLICY_DB_SYNCHRONOUS = os.getenv("POLICY_DB_SYNCHRONOUS", "FULL").upper()
+
+# How long a writer waits for the database lock before failing with "database is locked"
+POLICY_DB_BUSY_TIMEOUT_MS = int(os.getenv("POLICY_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Policies per page of GET /policies by default, and at most
+POLICY_PAGE_SIZE = int(os.getenv("POLICY_PAGE_SIZE", "50"))
+POLICY_PAGE_MAX_SIZE = int(os.getenv("POLICY_PAGE_MAX_SIZE", "500"))
+
+# Group commit of policy inserts: rows from concurrent requests are written in
+# one transaction of up to POLICY_WRITE_BATCH_SIZE rows, committed at the latest
+# POLICY_WRITE_BATCH_DELAY_MS after the first row of the batch arrived
+POLICY_WRITE_BATCHING = os.getenv("POLICY_WRITE_BATCHING", "true").lower() == "true"
+POLICY_WRITE_BATCH_SIZE = max(1, int(os.getenv("POLICY_WRITE_BATCH_SIZE", "256")))
+POLICY_WRITE_BATCH_DELAY_MS = float(os.getenv("POLICY_WRITE_BATCH_DELAY_MS", "5"))
+
+POLICY_COLUMNS = (
+    "name", "email", "insurer", "policy_number", "policy_start_date",
+    "policy_end_date", "date_of_policy", "expiry_date", "vehicle_type", "submitted_at"
+)
+
+DATE_COLUMNS = ("policy_start_date", "policy_end_date", "date_of_policy", "expiry_date")
+
+# Fields a policy listing can return; legacy_values only when asked for
+POLICY_FIELDS = ("id",) + POLICY_COLUMNS + ("legacy_values",)
+DEFAULT_POLICY_FIELDS = ("id",) + POLICY_COLUMNS
+
+# Filters of a policy listing by parameter name: (column, comparison)
+POLICY_FILTERS = {
+    "insurer": ("insurer", "="),
+    "vehicle_type": ("vehicle_type", "="),
+    "email": ("email", "="),
+    "expiry_from": ("expiry_date", ">="),
+    "expiry_to": ("expiry_date", "<="),
+    "start_from": ("policy_start_date", ">="),
+    "start_to": ("policy_start_date", "<=")
+}
+
+# A listing with a date range filter is ordered by that date (then id), so the
+# range and the order are read from the same index instead of sorting every
+# matching row for each page; expiry_date wins when both ranges are given
+POLICY_RANGE_ORDER = (
+    (("expiry_from", "expiry_to"), "expiry_date"),
+    (("start_from", "start_to"), "policy_start_date")
+)
+
+# Formats accepted for policy dates; day-first before month-first, as policies are Indian
+DATE_FORMATS = (
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y/%m/%d", "%d-%b-%Y", "%d %b %Y",
+    "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%d-%m-%y", "%d/%m/%y"
+)
+
+# Formats accepted for submission times (the last one is the old save_policy format)
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%B %d, %Y at %I:%M %p")
+
+@lru_cache(maxsize=4096)
+def iso_date(value):
+    """
+    A date in any of DATE_FORMATS (or an ISO timestamp) as YYYY-MM-DD, or None if it cannot be read
+    """
+    value = " ".join(str(value or "").replace("Sept", "Sep").split())
+    if len(value) > 10 and value[4] == "-" and value[10] in "T ":
+        value = value[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def iso_datetime(value):
+    """
+    A submission time in any of DATETIME_FORMATS as YYYY-MM-DD HH:MM:SS, or None if it cannot be read
+    """
+    value = " ".join(str(value or "").split())
+    try:
+        # Fast path for the format written since the first version
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+# Dates are ISO 8601 text, so they sort and compare as dates and range
+# queries can use the indexes. A policy number is unique per insurer.
+CREATE_POLICIES_TABLE = """
+    CREATE TABLE IF NOT EXISTS policies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT,
+        insurer TEXT,
+        policy_number TEXT,
+        policy_start_date TEXT,
+        policy_end_date TEXT,
+        date_of_policy TEXT,
+        expiry_date TEXT,
+        vehicle_type TEXT,
+        submitted_at TEXT,
+        legacy_values TEXT,
+        UNIQUE (insurer, policy_number)
+    )
+"""
+
+# The unique constraint indexes (insurer, policy_number); insurer gets its own
+# index too, so an insurer's policies are walked in id order
+CREATE_POLICY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_policies_policy_number ON policies (policy_number)",
+    "CREATE INDEX IF NOT EXISTS idx_policies_email ON policies (email)",
+    "CREATE INDEX IF NOT EXISTS idx_policies_insurer ON policies (insurer)",
+    "CREATE INDEX IF NOT EXISTS idx_policies_expiry_date ON policies (expiry_date)"
+)
 
-    # Create table if it doesn't exist (now includes email + submitted_at)
-    cursor.execute('''
+# Statements are kept as constants so each pooled connection prepares them once
+# and reuses them from its statement cache
+INSERT_POLICY = f"""
+    INSERT INTO policies ({", ".join(POLICY_COLUMNS)})
+    VALUES ({", ".join("?" * len(POLICY_COLUMNS))})
+"""
+
+def policy_row(policy, submitted_at=None):
+    """
+    The INSERT_POLICY parameters of a policy, stamped with the submission time.
+    Raises ValueError for a date that cannot be read.
+    """
+    dates = {}
+    for column in DATE_COLUMNS:
+        dates[column] = iso_date(getattr(policy, column))
+        if dates[column] is None:
+            raise ValueError(f"Invalid {column}: {getattr(policy, column)!r}")
+    return (
+        policy.name,
+        policy.email,
+        policy.insurer,
+        policy.policy_number,
+        dates["policy_start_date"],
+        dates["policy_end_date"],
+        dates["date_of_policy"],
+        dates["expiry_date"],
+        policy.vehicle_type,
+        submitted_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+def migrate_create_policies(conn):
+    """
+    Version 1: the original policies table (dates as free-form text, no indexes)
+    """
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS policies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT,
             email TEXT,
             insurer TEXT,
@@ -20,24 +187,453 @@ def save_policy(policy: BikeInsurancePolicy):
             vehicle_type TEXT,
             submitted_at TEXT
         )
-    ''')
+    """)
 
-    # Insert the new policy data, including submitted_at
-    cursor.execute('''
-        INSERT INTO policies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        policy.name,
-        policy.email,
-        policy.insurer,
-        policy.policy_number,
-        policy.policy_start_date.isoformat(),
-        policy.policy_end_date.isoformat(),
-        policy.date_of_policy.isoformat(),
-        policy.expiry_date.isoformat(),
-        policy.vehicle_type,
-        policy.submitted_at  # already in "July 9, 2025 at 06:45 PM" format
-    ))
+def migrate_normalize_policies(conn, batch_rows=10000):
+    """
+    Version 2: ISO dates, indexes and one policy per (insurer, policy_number).
+
+    Existing rows are copied into the new table with their dates converted.
+    Values that cannot be read as dates are stored as NULL and kept verbatim
+    in legacy_values (JSON). Of several rows with the same insurer and policy
+    number the latest one is kept; the others move to policy_duplicates.
+    """
+    conn.execute("ALTER TABLE policies RENAME TO policies_v1")
+    conn.execute(CREATE_POLICIES_TABLE)
+    conn.execute("CREATE TABLE policy_duplicates AS SELECT * FROM policies WHERE 0")
+
+    # rowid is the id, also in tables created by the old database.save_policy, which have no
+    # id column; the index on (insurer, policy_number) holds it as its last column
+    conn.execute("CREATE INDEX policies_v1_dedup ON policies_v1 (insurer, policy_number)")
+    rows = conn.execute(f"""
+        SELECT rowid, {", ".join(POLICY_COLUMNS)},
+            EXISTS (
+                SELECT 1 FROM policies_v1 AS newer
+                WHERE newer.insurer = old.insurer AND newer.policy_number = old.policy_number
+                AND newer.rowid > old.rowid
+            )
+        FROM policies_v1 AS old ORDER BY rowid
+    """)
+    insert_columns = ("id",) + POLICY_COLUMNS + ("legacy_values",)
+    placeholders = ", ".join("?" * len(insert_columns))
+    while True:
+        batch = rows.fetchmany(batch_rows)
+        if not batch:
+            break
+        kept, duplicates = [], []
+        for row in batch:
+            values = dict(zip(("id",) + POLICY_COLUMNS, row[:-1]))
+            legacy = {}
+            for column in DATE_COLUMNS + ("submitted_at",):
+                raw = values[column]
+                values[column] = iso_datetime(raw) if column == "submitted_at" else iso_date(raw)
+                if values[column] is None and raw not in (None, ""):
+                    legacy[column] = raw
+            values["legacy_values"] = json.dumps(legacy) if legacy else None
+            (duplicates if row[-1] else kept).append(tuple(values[column] for column in insert_columns))
+        conn.executemany(f"INSERT INTO policies ({', '.join(insert_columns)}) VALUES ({placeholders})", kept)
+        conn.executemany(f"INSERT INTO policy_duplicates ({', '.join(insert_columns)}) VALUES ({placeholders})", duplicates)
+
+    conn.execute("DROP TABLE policies_v1")
+    for statement in CREATE_POLICY_INDEXES:
+        conn.execute(statement)
+
+def migrate_vehicle_type_index(conn):
+    """
+    Version 3: index vehicle_type, so the policies of a vehicle type are walked in id order
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_policies_vehicle_type ON policies (vehicle_type)")
+
+def migrate_date_range_indexes(conn):
+    """
+    Version 4: index the date range listings, alone and after an insurer or
+    vehicle type filter, so they are walked in (date, id) order
+    """
+    for name, columns in (
+        ("start_date", "policy_start_date"),
+        ("insurer_expiry_date", "insurer, expiry_date"),
+        ("insurer_start_date", "insurer, policy_start_date"),
+        ("vehicle_type_expiry_date", "vehicle_type, expiry_date"),
+        ("vehicle_type_start_date", "vehicle_type, policy_start_date")
+    ):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_policies_{name} ON policies ({columns})")
 
-    # Save and close the connection
-    conn.commit()
-    conn.close()
+# Schema migrations in order; PRAGMA user_version records the last one applied
+SCHEMA_MIGRATIONS = (
+    (1, migrate_create_policies),
+    (2, migrate_normalize_policies),
+    (3, migrate_vehicle_type_index),
+    (4, migrate_date_range_indexes)
+)
+
+def migrate_schema(conn):
+    """
+    Apply the pending schema migrations, each in its own transaction.
+    Returns the versions applied.
+    """
+    applied = []
+    for version, migration in SCHEMA_MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked under the write lock, so concurrent processes migrate once
+            if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return applied
+
+class PolicyStore:
+    """
+    Pool of SQLite connections to the policy database in WAL mode.
+
+    WAL lets readers run alongside the single writer, and every connection
+    waits up to busy_timeout for the write lock instead of failing at once.
+    Connections run in autocommit mode; transaction() takes the write lock up
+    front with BEGIN IMMEDIATE, so concurrent writers queue on the busy
+    timeout instead of deadlocking when a read lock is upgraded.
+    """
+
+    def __init__(self, path=POLICY_DB_PATH, pool_size=POLICY_DB_POOL_SIZE, synchronous=POLICY_DB_SYNCHRONOUS,
+                 busy_timeout_ms=POLICY_DB_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.pool_size = pool_size
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pool = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        with self.connection() as conn:
+            self.migrated_versions = migrate_schema(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+            check_same_thread=False, cached_statements=64
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection, opening one while the pool is below its size
+        """
+        if self._closed:
+            raise RuntimeError("Policy store is closed")
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._connections) < self.pool_size:
+                    conn = self._connect()
+                    self._connections.append(conn)
+            if conn is None:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a write transaction on a pooled connection, committed on success and rolled back on error
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def insert_policy(self, row):
+        """
+        Insert one policy row (see policy_row) and return its id
+        """
+        with self.transaction() as conn:
+            return conn.execute(INSERT_POLICY, row).lastrowid
+
+    def insert_many(self, rows):
+        """
+        Insert policy rows in one transaction with executemany. Rows rejected by
+        a constraint are skipped; returns {index: error message} for them.
+        """
+        with self.transaction() as conn:
+            conn.execute("SAVEPOINT insert_many")
+            try:
+                conn.executemany(INSERT_POLICY, rows)
+                conn.execute("RELEASE insert_many")
+                return {}
+            except sqlite3.IntegrityError:
+                conn.execute("ROLLBACK TO insert_many")
+                conn.execute("RELEASE insert_many")
+
+            # Insert row by row to find the offending rows and keep the others
+            errors = {}
+            for index, row in enumerate(rows):
+                try:
+                    conn.execute(INSERT_POLICY, row)
+                except sqlite3.IntegrityError as e:
+                    errors[index] = str(e)
+            return errors
+
+    def list_policies(self, filters=None, fields=DEFAULT_POLICY_FIELDS, cursor=None, limit=POLICY_PAGE_SIZE, descending=False):
+        """
+        One page of policies matching the filters ({POLICY_FILTERS name: value}), in id order,
+        or in (date, id) order with a date range filter (see POLICY_RANGE_ORDER).
+        Raises ValueError for an unknown field or filter or an invalid cursor.
+
+        Pages are read by keyset: cursor is the sort key of the last policy
+        of the previous page, so each page is an index seek past it rather
+        than an OFFSET scan over the pages before. Returns the policies as
+        dicts of the requested fields and the cursor of the next page (None
+        on the last): an id, or "<date>:<id>" for a date ordered listing.
+        """
+        filters = filters or {}
+        unknown = [field for field in fields if field not in POLICY_FIELDS]
+        unknown += [name for name in filters if name not in POLICY_FILTERS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        order_column = next(
+            (column for names, column in POLICY_RANGE_ORDER if any(name in filters for name in names)), None
+        )
+        fields = ("id",) + tuple(field for field in fields if field != "id")
+        bounds = [POLICY_FILTERS[name] + (value,) for name, value in filters.items()]
+        comparison = "<" if descending else ">"
+        direction = "DESC" if descending else "ASC"
+        order_by = f"{order_column} {direction}, id {direction}" if order_column else f"id {direction}"
+        if cursor is not None:
+            try:
+                key = str(cursor)
+                if order_column:
+                    cursor_date, key = key.rsplit(":", 1)
+                cursor_id = int(key)
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+
+        if cursor is None:
+            seeks = [(bounds, order_by)]
+        elif not order_column:
+            seeks = [(bounds + [("id", comparison, cursor_id)], order_by)]
+        else:
+            # The rest of the cursor's date, then the dates past it: each is an exact
+            # index seek, where a (date, id) row value only seeks by date and walks
+            # every policy of the cursor's date before the cursor
+            seek = comparison + "="
+            others = [bound for bound in bounds if bound[0] != order_column]
+            ranges = [bound for bound in bounds if bound[0] == order_column]
+            later = [bound for bound in bounds if bound[:2] != (order_column, seek)]
+            start = [value for _, bound, value in ranges if bound == seek]
+            if start and (start[0] < cursor_date if descending else start[0] > cursor_date):
+                later.append((order_column, seek, start[0]))
+            else:
+                later.append((order_column, comparison, cursor_date))
+            seeks = [(later, order_by)]
+            # The range bounds are left out of the equality seek, as they would
+            # steer SQLite to the date index alone instead of a composite one
+            if all(cursor_date >= value if bound == ">=" else cursor_date <= value for _, bound, value in ranges):
+                seeks.insert(0, (others + [(order_column, "=", cursor_date), ("id", comparison, cursor_id)], f"id {direction}"))
+
+        # Column names come from POLICY_FIELDS and POLICY_FILTERS only; one row
+        # past the page tells whether there is a next page
+        columns = ", ".join(fields + ((order_column,) if order_column else ()))
+        queries, params = [], []
+        for seek_bounds, seek_order in seeks:
+            sql = f"SELECT {columns} FROM policies"
+            if seek_bounds:
+                sql += " WHERE " + " AND ".join(f"{column} {bound} ?" for column, bound, _ in seek_bounds)
+            queries.append(f"{sql} ORDER BY {seek_order} LIMIT ?")
+            params += [value for _, _, value in seek_bounds] + [limit + 1]
+        if len(queries) == 1:
+            sql = queries[0]
+        else:
+            sql = " UNION ALL ".join(f"SELECT * FROM ({query})" for query in queries) + f" ORDER BY {order_by} LIMIT ?"
+            params.append(limit + 1)
+
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        policies = [dict(zip(fields, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last[-1]}:{last[0]}" if order_column else last[0]
+        return policies, next_cursor
+
+    def close(self):
+        """
+        Close every pooled connection
+        """
+        with self._lock:
+            self._closed = True
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+class PolicyWriteBatcher:
+    """
+    Background writer that group-commits policy inserts.
+
+    submit() queues a row and returns a Future. The writer thread takes the
+    queued rows into one transaction until max_rows are collected or max_delay
+    has passed since the first one (waiting only while concurrent writers are
+    expected), commits, and only then resolves each
+    Future with the row id, so a caller is acknowledged once its row is as
+    durable as a single-row commit would have made it. A row that violates
+    a constraint fails alone; a failed commit fails the whole batch. Rows
+    whose callers were cancelled before the writer took them are dropped.
+    """
+
+    def __init__(self, store, max_rows=POLICY_WRITE_BATCH_SIZE, max_delay=POLICY_WRITE_BATCH_DELAY_MS / 1000):
+        self.store = store
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self._last_batch_rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="policy-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """
+        Queue a policy row (see policy_row) and return a Future resolved with its id after the commit
+        """
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _take(self, item):
+        # Claim a queued row; False if its caller was cancelled while it waited
+        return item[1].set_running_or_notify_cancel()
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return None
+            if self._take(item):
+                break
+        batch = [item]
+        # Wait up to max_delay for as many rows as the last batch held, since that
+        # many writers are likely to be back; a lone writer is committed at once
+        expected_rows = self._last_batch_rows
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_rows:
+            timeout = deadline - time.monotonic() if len(batch) < expected_rows else 0
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch is written
+                self._queue.put(None)
+                break
+            if self._take(item):
+                batch.append(item)
+        self._last_batch_rows = len(batch)
+        return batch
+
+    def _write(self, batch):
+        outcomes = []
+        try:
+            with self.store.transaction() as conn:
+                for row, _ in batch:
+                    try:
+                        outcomes.append(conn.execute(INSERT_POLICY, row).lastrowid)
+                    except sqlite3.IntegrityError as e:
+                        outcomes.append(e)
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        else:
+            self.batches += 1
+            self.rows += len(batch)
+
+        for (_, future), outcome in zip(batch, outcomes):
+            # Claimed futures can no longer be cancelled, but never let one kill the writer
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def _run(self):
+        while True:
+            batch = None
+            try:
+                batch = self._collect()
+                if batch is None:
+                    return
+                self._write(batch)
+            except Exception as e:
+                # Fail this batch and keep serving the rows queued after it
+                print(f"Policy writer error: {str(e)}")
+                for _, future in batch or ():
+                    if not future.done():
+                        future.set_exception(e)
+
+    def close(self):
+        """
+        Write the rows still queued and stop the writer thread
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+_policy_store = None
+_policy_store_lock = threading.Lock()
+_policy_writer = None
+
+def get_policy_store():
+    """
+    Return the process-wide policy store, creating it on first use
+    """
+    global _policy_store
+    with _policy_store_lock:
+        if _policy_store is None:
+            _policy_store = PolicyStore()
+        return _policy_store
+
+def get_policy_writer():
+    """
+    Return the process-wide group-commit writer of the policy store, starting it on first use
+    """
+    global _policy_writer
+    store = get_policy_store()
+    with _policy_store_lock:
+        if _policy_writer is None:
+            _policy_writer = PolicyWriteBatcher(store)
+        return _policy_writer
+
+def close_policy_store():
+    """
+    Flush pending policy writes and close the process-wide policy store, if it was opened
+    """
+    global _policy_store, _policy_writer
+    with _policy_store_lock:
+        if _policy_writer is not None:
+            _policy_writer.close()
+            _policy_writer = None
+        if _policy_store is not None:
+            _policy_store.close()
+            _policy_store = None
+
+def save_policy(policy: BikeInsurancePolicy):
+    """
+    Store a submitted policy and return its id once it is committed
+    """
+    row = policy_row(policy)
+    if POLICY_WRITE_BATCHING:
+        return get_policy_writer().submit(row).result()
+    return get_policy_store().insert_policy(row)
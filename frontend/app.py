@@ -94,27 +94,37 @@ if st.session_state.authenticated:
     elif st.session_state.user_type == "manager":
         st.title("📂 Manager Dashboard")
 
-        import sqlite3
         import pandas as pd
 
+        # Policies are read a page at a time from the API's GET /policies
+        if "policy_cursors" not in st.session_state:
+            st.session_state.policy_cursors = [None]
+        cursors = st.session_state.policy_cursors
+
         try:
-            conn = sqlite3.connect("../insurance.db")
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT * FROM policies")
-            rows = cursor.fetchall()
-            conn.close()
-
-            if rows:
-                columns = [
-                    "Name", "Insurer", "Policy Number", "Policy Start Date", "Policy End Date",
-                    "Date of Policy", "Expiry Date", "Vehicle Type", "Fuel Type", "Vehicle Number", "Submitted At"
-                ]
-                df = pd.DataFrame(rows, columns=columns)
+            params = {"limit": 100}
+            if cursors[-1] is not None:
+                params["cursor"] = cursors[-1]
+            response = requests.get("http://localhost:8000/policies", params=params)
+            response.raise_for_status()
+            listing = response.json()
+
+            if listing["policies"]:
+                df = pd.DataFrame(listing["policies"])
                 st.dataframe(df, use_container_width=True)
 
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button("📥 Download as CSV", data=csv, file_name="policies.csv", mime="text/csv")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if len(cursors) > 1 and st.button("⬅️ Previous page"):
+                        cursors.pop()
+                        st.rerun()
+                with col2:
+                    if listing["next_cursor"] is not None and st.button("Next page ➡️"):
+                        cursors.append(listing["next_cursor"])
+                        st.rerun()
+
+                # The API streams the export page by page, so the browser downloads it directly
+                st.link_button("📥 Download as CSV", "http://localhost:8000/policies/export.csv")
             else:
                 st.info("No policies submitted yet.")
         except Exception as e:
@@ -0,0 +1,182 @@
+import sqlite3
+import threading
+import asyncio
+import json
+import time
+import uuid
+import shutil
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Job queue settings
+JOB_QUEUE_DB_PATH = os.getenv("JOB_QUEUE_DB_PATH", "jobs.db")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "job_spool")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+class JobQueue:
+    """
+    Background PDF processing jobs backed by a local SQLite table.
+
+    Uploaded PDFs are spooled to disk and processed by a fixed pool of
+    asyncio workers; the job table records status and page-level progress so
+    clients can poll for the result instead of holding the request open.
+    Table writes run in order on a single writer thread, off the event loop.
+    """
+
+    def __init__(self, process_func, db_path=JOB_QUEUE_DB_PATH, spool_dir=JOB_SPOOL_DIR, workers=JOB_WORKERS):
+        # process_func(pdf_path, product_type, force_refresh, progress_callback) -> result
+        self.process_func = process_func
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-writer")
+        os.makedirs(spool_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT,
+                product_type TEXT,
+                filename TEXT,
+                pdf_path TEXT,
+                force_refresh INTEGER,
+                pages_total INTEGER,
+                pages_done INTEGER,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    async def _write(self, sql, params=()):
+        # Queued behind the progress updates already submitted, so writes stay in order
+        await asyncio.wrap_future(self._writer.submit(self._execute, sql, params))
+
+    async def start(self):
+        """
+        Start the worker pool and requeue jobs left unfinished by a previous run
+        """
+        self._queue = asyncio.Queue()
+        await self._write("UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),))
+        pending = await asyncio.to_thread(self._queued_job_ids)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _queued_job_ids(self):
+        with self._lock:
+            return [
+                job_id for (job_id,) in self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")
+            ]
+
+    async def stop(self):
+        """
+        Stop the worker pool and write the pending updates; running jobs are requeued on the next start
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self._writer.shutdown)
+        with self._lock:
+            self._conn.close()
+
+    def _spool(self, fileobj, pdf_path):
+        with open(pdf_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+
+    async def submit(self, fileobj, filename, product_type, force_refresh=False):
+        """
+        Spool an uploaded PDF file object to disk, record a queued job and return its id
+        """
+        job_id = uuid.uuid4().hex
+        pdf_path = os.path.join(self.spool_dir, f"{job_id}.pdf")
+        await asyncio.to_thread(self._spool, fileobj, pdf_path)
+
+        now = time.time()
+        await self._write(
+            """
+            INSERT INTO jobs (
+                id, status, product_type, filename, pdf_path, force_refresh,
+                pages_total, pages_done, result, error, created_at, updated_at
+            ) VALUES (?, 'queued', ?, ?, ?, ?, NULL, 0, NULL, NULL, ?, ?)
+            """,
+            (job_id, product_type, filename, pdf_path, int(force_refresh), now, now)
+        )
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Return a job as a dict (result decoded), or None if the id is unknown
+        """
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            self._conn.row_factory = None
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id):
+        job = await asyncio.to_thread(self.get, job_id)
+        if job is None or job["status"] != "queued":
+            return
+        await self._write("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+        def progress_callback(pages_done, pages_total):
+            # Called on the event loop for every page batch; not waited for
+            self._writer.submit(
+                self._execute,
+                "UPDATE jobs SET pages_done = ?, pages_total = ?, updated_at = ? WHERE id = ?",
+                (pages_done, pages_total, time.time(), job_id)
+            )
+
+        try:
+            result = await self.process_func(job["pdf_path"], job["product_type"], bool(job["force_refresh"]), progress_callback)
+        except asyncio.CancelledError:
+            # Shutting down: leave the job to be requeued on the next start
+            raise
+        except Exception as e:
+            result = f"⚠️ Error processing PDF: {str(e)}"
+
+        if isinstance(result, dict) and "error" not in result:
+            await self._write(
+                "UPDATE jobs SET status = 'completed', result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+        else:
+            error = result.get("error") if isinstance(result, dict) else result
+            await self._write(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (str(error), time.time(), job_id)
+            )
+
+        # The spooled PDF is no longer needed once the job has finished
+        try:
+            os.remove(job["pdf_path"])
+        except OSError:
+            pass
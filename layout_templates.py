@@ -0,0 +1,379 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import re
+import time
+import os
+from dotenv import load_dotenv
+from vehicle_rules import AMOUNT_FIELDS, FIELD_VALUE_PATTERNS, normalize_vehicle_value
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Layout template settings
+LAYOUT_TEMPLATES_ENABLED = os.getenv("LAYOUT_TEMPLATES_ENABLED", "true").lower() == "true"
+LAYOUT_INDEX_PATH = os.getenv("LAYOUT_INDEX_PATH", "layout_index.db")
+
+# Learn layouts and templates from every processed document
+LAYOUT_LEARN = os.getenv("LAYOUT_LEARN", "true").lower() == "true"
+
+# Pages of each document that are fingerprinted and read by templates
+LAYOUT_MAX_PAGES = int(os.getenv("LAYOUT_MAX_PAGES", "2"))
+
+# Minimum fingerprint similarity (0-1) for a document to count as a known layout
+LAYOUT_MATCH_THRESHOLD = float(os.getenv("LAYOUT_MATCH_THRESHOLD", "0.8"))
+
+# Template fields at or above this confidence are used without asking the LLM.
+# A field's confidence is confirmations / (confirmations + conflicts + 1), so
+# 0.9 needs nine documents where the template agreed with the extraction.
+LAYOUT_MIN_CONFIDENCE = float(os.getenv("LAYOUT_MIN_CONFIDENCE", "0.9"))
+
+# Top part of the first page whose words identify the insurer and product
+HEADER_HEIGHT = 0.2
+
+# Keywords whose positions on the first page make up the layout fingerprint
+ANCHOR_KEYWORDS = [
+    "policy no", "policy number", "period of insurance", "insured name", "name of insured",
+    "address", "email", "mobile", "date of issue", "registration", "engine", "chassis",
+    "make", "model", "idv", "premium", "gst", "nominee"
+]
+
+# Anchors at most this far apart (as a fraction of the page) count as the same position
+ANCHOR_TOLERANCE = 0.03
+
+# Margin around a template box when reading its value, as a fraction of the page
+BOX_TOLERANCE = 0.01
+
+_ANCHORS = [(keyword, re.compile(rf"\b{re.escape(keyword)}\b")) for keyword in ANCHOR_KEYWORDS]
+_WORD = re.compile(r"[a-z]{3,}")
+# Text of a line that can serve as a label: words without values
+_LABEL_TEXT = re.compile(r"[A-Za-z][A-Za-z .()/&'\-:#]{2,60}")
+_TRAILING_LABEL = re.compile(r"([A-Za-z][A-Za-z .()/&'\-]{0,40}?)[\s:\-#=|.]*$")
+
+def read_pdf_layout(pdf_document, max_pages=LAYOUT_MAX_PAGES):
+    """
+    Text lines with their positions of the first pages of a PDF (blocking call, not thread-safe).
+
+    Returns {"page_count": n, "pages": [[{"text": ..., "bbox": [x0, y0, x1, y1]}, ...], ...]}
+    with boxes as fractions of the page size. Pages without a text layer have no lines.
+    """
+    pages = []
+    for page_num in range(min(max_pages, len(pdf_document))):
+        page = pdf_document[page_num]
+        width, height = page.rect.width or 1, page.rect.height or 1
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            if block.get("type") != 0:
+                continue
+            for line in block["lines"]:
+                text = " ".join("".join(span["text"] for span in line["spans"]).split())
+                if text:
+                    x0, y0, x1, y1 = line["bbox"]
+                    lines.append({"text": text, "bbox": [x0 / width, y0 / height, x1 / width, y1 / height]})
+        pages.append(sorted(lines, key=lambda line: (round(line["bbox"][1], 3), line["bbox"][0])))
+    return {"page_count": len(pdf_document), "pages": pages}
+
+def layout_fingerprint(layout):
+    """
+    Fingerprint of a layout: page count, the words of the first page header and
+    the positions of the anchor keywords on the first page. None without a text layer.
+    """
+    lines = layout["pages"][0] if layout["pages"] else []
+    if not lines:
+        return None
+    header_lines = [line for line in lines if line["bbox"][1] < HEADER_HEIGHT]
+    anchors = {}
+    for line in lines:
+        lowered = line["text"].lower()
+        for keyword, pattern in _ANCHORS:
+            if keyword not in anchors and pattern.search(lowered):
+                anchors[keyword] = [round(line["bbox"][0], 3), round(line["bbox"][1], 3)]
+    insurer = next(
+        (line["text"] for line in header_lines if re.search(r"insurance|assurance", line["text"], re.IGNORECASE)),
+        None
+    )
+    return {
+        "page_count": layout["page_count"],
+        "header_words": sorted({word for line in header_lines for word in _WORD.findall(line["text"].lower())}),
+        "anchors": anchors,
+        "insurer": insurer
+    }
+
+def fingerprint_similarity(a, b):
+    """
+    Similarity (0-1) of two fingerprints: header word overlap and anchor position agreement
+    """
+    words_a, words_b = set(a["header_words"]), set(b["header_words"])
+    header = len(words_a & words_b) / len(words_a | words_b) if words_a | words_b else 0.0
+    keywords = set(a["anchors"]) | set(b["anchors"])
+    if keywords:
+        agreeing = sum(
+            1 for keyword in keywords
+            if keyword in a["anchors"] and keyword in b["anchors"]
+            and abs(a["anchors"][keyword][0] - b["anchors"][keyword][0]) <= ANCHOR_TOLERANCE
+            and abs(a["anchors"][keyword][1] - b["anchors"][keyword][1]) <= ANCHOR_TOLERANCE
+        )
+        anchors = agreeing / len(keywords)
+    else:
+        anchors = header
+    score = (header + anchors) / 2
+    # Policies of one layout differ in page count when they carry add-on pages
+    return score if a["page_count"] == b["page_count"] else score * 0.9
+
+def _center_in(bbox, box):
+    x, y = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+    return (box[0] - BOX_TOLERANCE <= x <= box[2] + BOX_TOLERANCE
+            and box[1] - BOX_TOLERANCE <= y <= box[3] + BOX_TOLERANCE)
+
+def _same_value(field, a, b):
+    if a is None or b is None:
+        return False
+    if field in AMOUNT_FIELDS:
+        try:
+            return abs(float(a) - float(b)) < 0.005
+        except ValueError:
+            return False
+    return str(a).casefold() == str(b).casefold()
+
+def _find_label_line(lines, label):
+    return next((line for line in lines if line["text"].lower().startswith(label)), None)
+
+def read_template_field(field, rule, layout):
+    """
+    Read one field from a layout with its learned rule; None when the rule does not apply
+    """
+    if rule["page"] >= len(layout["pages"]):
+        return None
+    lines = layout["pages"][rule["page"]]
+    if rule["relation"] == "same_line":
+        line = next((line for line in lines if rule["label"] in line["text"].lower()), None)
+        if line is None:
+            return None
+        start = line["text"].lower().index(rule["label"]) + len(rule["label"])
+        raw = line["text"][start:].lstrip(" :-#=|.")
+    else:
+        box = rule["box"]
+        if rule["relation"] == "offset":
+            label_line = _find_label_line(lines, rule["label"])
+            if label_line is None:
+                return None
+            x, y = label_line["bbox"][0], label_line["bbox"][1]
+            box = [x + box[0], y + box[1], x + box[2], y + box[3]]
+        raw = " ".join(line["text"] for line in lines if _center_in(line["bbox"], box))
+        # A line holding several values of the same kind ("From 15/03/2024 to 14/03/2025")
+        occurrence = rule.get("occurrence", 0)
+        if occurrence and field in FIELD_VALUE_PATTERNS:
+            matches = list(FIELD_VALUE_PATTERNS[field].finditer(raw))
+            raw = matches[occurrence].group(0) if occurrence < len(matches) else ""
+    if field not in FIELD_VALUE_PATTERNS:
+        raw = " ".join(raw.split()[:rule["words"]])
+    return normalize_vehicle_value(field, raw) if raw else None
+
+def derive_template_field(field, value, layout):
+    """
+    Learn where a field's value sits in a layout: after a label on the same
+    line, at an offset from a label line, or at a fixed position. None when
+    the value is not found on the fingerprinted pages.
+    """
+    target = normalize_vehicle_value(field, str(value))
+    if target is None:
+        return None
+    words = len(str(value).split())
+    for page_num, lines in enumerate(layout["pages"]):
+        for line in lines:
+            occurrence = 0
+            if field in FIELD_VALUE_PATTERNS:
+                matches = [match.start() for match in FIELD_VALUE_PATTERNS[field].finditer(line["text"])]
+                occurrence = next((
+                    position for position, start in enumerate(matches)
+                    if _same_value(field, normalize_vehicle_value(field, line["text"][start:]), target)
+                ), -1)
+                start = matches[occurrence] if occurrence != -1 else -1
+            else:
+                start = line["text"].lower().find(target.lower())
+            if start == -1:
+                continue
+
+            label = _TRAILING_LABEL.search(line["text"][:start])
+            label_text = " ".join(label.group(1).lower().split()) if label else ""
+            if len(label_text) >= 3:
+                return {"page": page_num, "relation": "same_line", "label": label_text, "words": words}
+
+            # Nearest label line to the left on the same row, else right above
+            x0, y0, x1, y1 = line["bbox"]
+            height = y1 - y0
+            left = [
+                other for other in lines
+                if other is not line and other["bbox"][2] <= x0 + BOX_TOLERANCE
+                and abs((other["bbox"][1] + other["bbox"][3]) / 2 - (y0 + y1) / 2) < height / 2
+            ]
+            above = [
+                other for other in lines
+                if other is not line and other["bbox"][3] <= y0 + BOX_TOLERANCE and y0 - other["bbox"][3] < 3 * height
+                and other["bbox"][0] < x1 and other["bbox"][2] > x0
+            ]
+            label_line = (
+                max(left, key=lambda other: other["bbox"][2]) if left
+                else max(above, key=lambda other: other["bbox"][3]) if above
+                else None
+            )
+            if label_line is not None and _LABEL_TEXT.fullmatch(label_line["text"]):
+                lx, ly = label_line["bbox"][0], label_line["bbox"][1]
+                return {
+                    "page": page_num, "relation": "offset", "label": label_line["text"].lower()[:40],
+                    "box": [round(x0 - lx, 4), round(y0 - ly, 4), round(x1 - lx, 4), round(y1 - ly, 4)],
+                    "occurrence": occurrence, "words": words
+                }
+            return {
+                "page": page_num, "relation": "absolute", "box": [round(c, 4) for c in line["bbox"]],
+                "occurrence": occurrence, "words": words
+            }
+    return None
+
+def template_confidence(entry):
+    """
+    Confidence of a learned template field from how often it agreed with the extraction
+    """
+    return entry["confirmations"] / (entry["confirmations"] + entry["conflicts"] + 1)
+
+class LayoutIndex:
+    """
+    Persistent index of known document layouts and their field templates.
+
+    Every layout is kept in memory, so a lookup is a similarity scan over a few
+    dozen fingerprints; each change is written through to SQLite as one row,
+    so the index is updated incrementally as documents are processed.
+    """
+
+    def __init__(self, path=LAYOUT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS layouts (
+                layout_id TEXT PRIMARY KEY,
+                insurer TEXT,
+                fingerprint TEXT,
+                templates TEXT,
+                documents INTEGER,
+                created_at REAL,
+                updated_at REAL
+            )
+        """)
+        self._conn.commit()
+        self.layouts = {
+            layout_id: {
+                "layout_id": layout_id, "insurer": insurer, "fingerprint": json.loads(fingerprint),
+                "templates": json.loads(templates), "documents": documents
+            }
+            for layout_id, insurer, fingerprint, templates, documents in self._conn.execute(
+                "SELECT layout_id, insurer, fingerprint, templates, documents FROM layouts"
+            )
+        }
+
+    def match(self, fingerprint):
+        """
+        Return (layout_id, similarity) of the most similar known layout, with layout_id None below LAYOUT_MATCH_THRESHOLD
+        """
+        best_id, best_score = None, 0.0
+        with self._lock:
+            for layout_id, known in self.layouts.items():
+                score = fingerprint_similarity(fingerprint, known["fingerprint"])
+                if score > best_score:
+                    best_id, best_score = layout_id, score
+        return (best_id if best_score >= LAYOUT_MATCH_THRESHOLD else None), round(best_score, 3)
+
+    def lookup(self, layout):
+        """
+        Fingerprint a document layout and read every templated field of its known layout.
+
+        Returns None without a text layer, otherwise a dict with the fingerprint,
+        the matched layout (or None) and {field: {"value", "confidence", "rule": "layout"}}.
+        """
+        fingerprint = layout_fingerprint(layout)
+        if fingerprint is None:
+            return None
+        layout_id, score = self.match(fingerprint)
+        fields = {}
+        insurer = fingerprint["insurer"]
+        if layout_id is not None:
+            with self._lock:
+                known = self.layouts[layout_id]
+                insurer = known["insurer"] or insurer
+                templates = dict(known["templates"])
+            for field, entry in templates.items():
+                value = read_template_field(field, entry["rule"], layout)
+                if value is not None:
+                    fields[field] = {"value": value, "confidence": round(template_confidence(entry), 3), "rule": "layout"}
+        return {
+            "layout": layout, "fingerprint": fingerprint, "layout_id": layout_id,
+            "insurer": insurer, "score": score, "fields": fields
+        }
+
+    def learn(self, match, fields, skip_fields=()):
+        """
+        Update the index from a processed document: the fields extracted
+        without the template confirm or correct its rules, and an unknown
+        layout is added. Returns the layout id.
+        """
+        layout, fingerprint = match["layout"], match["fingerprint"]
+        now = time.time()
+        with self._lock:
+            layout_id = match["layout_id"]
+            if layout_id is None or layout_id not in self.layouts:
+                layout_id = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+                known = self.layouts.setdefault(layout_id, {
+                    "layout_id": layout_id, "insurer": fingerprint["insurer"],
+                    "fingerprint": fingerprint, "templates": {}, "documents": 0
+                })
+            else:
+                known = self.layouts[layout_id]
+                # Header words that vary between documents (names, numbers) drop out
+                words = sorted(set(known["fingerprint"]["header_words"]) & set(fingerprint["header_words"]))
+                if len(words) >= len(known["fingerprint"]["header_words"]) / 2:
+                    known["fingerprint"]["header_words"] = words
+
+            for field, value in fields.items():
+                if field in skip_fields or value in (None, ""):
+                    continue
+                entry = known["templates"].get(field)
+                if entry is not None:
+                    if _same_value(field, read_template_field(field, entry["rule"], layout), normalize_vehicle_value(field, str(value))):
+                        entry["confirmations"] += 1
+                        continue
+                    entry["conflicts"] += 1
+                    if entry["conflicts"] <= entry["confirmations"]:
+                        continue
+                # Unknown field, or a rule that is wrong more often than right: learn it from this document
+                rule = derive_template_field(field, value, layout)
+                if rule is not None:
+                    known["templates"][field] = {"rule": rule, "confirmations": 1, "conflicts": 0}
+
+            known["documents"] += 1
+            self._conn.execute(
+                """
+                INSERT INTO layouts (layout_id, insurer, fingerprint, templates, documents, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(layout_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint, templates = excluded.templates,
+                    documents = excluded.documents, updated_at = excluded.updated_at
+                """,
+                (layout_id, known["insurer"], json.dumps(known["fingerprint"]), json.dumps(known["templates"]),
+                 known["documents"], now, now)
+            )
+            self._conn.commit()
+        return layout_id
+
+_layout_index = None
+_layout_index_lock = threading.Lock()
+
+def get_layout_index():
+    """
+    Return the process-wide layout index, creating it on first use
+    """
+    global _layout_index
+    with _layout_index_lock:
+        if _layout_index is None:
+            _layout_index = LayoutIndex()
+        return _layout_index
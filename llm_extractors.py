@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import threading
+import os
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Extractor used for the classify stage, as "backend" or "backend:model":
+# "gemini", "gemini:models/gemini-1.5-flash", "openai:gpt-4o-mini", "replay"
+LLM_EXTRACTOR = os.getenv("LLM_EXTRACTOR", "gemini")
+
+# Per product type overrides, e.g. a cheaper or faster model for BIKE policies
+LLM_EXTRACTOR_BY_PRODUCT = {
+    product_type: os.getenv(f"LLM_EXTRACTOR_{product_type}")
+    for product_type in ("CAR", "BIKE", "HEALTH")
+}
+
+# Default Gemini model
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-1.5-pro")
+
+# OpenAI-compatible chat completions endpoint (OpenAI, vLLM, llama.cpp, Ollama or the local stub server)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://localhost:8080/v1")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Socket timeout of OpenAI-compatible requests, in seconds
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "120"))
+
+# Directory of recorded responses for the replay extractor
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", "llm_fixtures")
+
+# Extractor that answers (and records) prompts the replay extractor has no recording for; unset fails them
+LLM_REPLAY_RECORD_FROM = os.getenv("LLM_REPLAY_RECORD_FROM") or None
+
+class LlmRetryableError(Exception):
+    """
+    Rate limiting or a transient server-side failure of an LLM endpoint; the call is retried
+    """
+
+class LlmExtractor:
+    """
+    Interface of the LLM behind the classify stage: generate() returns the model's text for a prompt
+    """
+
+    name = None
+
+    async def generate(self, prompt):
+        raise NotImplementedError
+
+class GeminiExtractor(LlmExtractor):
+    """
+    Google Gemini through the async generate_content API
+    """
+
+    def __init__(self, model_name=None):
+        import google.generativeai as genai
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
+        genai.configure(api_key=api_key)
+        self.model_name = model_name or GEMINI_MODEL
+        self.name = f"gemini:{self.model_name}"
+        self._model = genai.GenerativeModel(self.model_name)
+
+    async def generate(self, prompt):
+        response = await self._model.generate_content_async(prompt)
+        return response.text
+
+class OpenAICompatibleExtractor(LlmExtractor):
+    """
+    Any OpenAI-compatible /chat/completions endpoint, hosted or local
+    """
+
+    def __init__(self, model_name=None, base_url=OPENAI_BASE_URL, api_key=OPENAI_API_KEY):
+        self.model_name = model_name or OPENAI_MODEL
+        self.name = f"openai:{self.model_name}"
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        # One session per extractor keeps connections to the endpoint alive
+        self._session = requests.Session()
+        if api_key:
+            self._session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, prompt):
+        response = self._session.post(self.url, json={
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0
+        }, timeout=OPENAI_TIMEOUT_SECONDS)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise LlmRetryableError(f"{self.url} returned {response.status_code}: {response.text[:200]}")
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def generate(self, prompt):
+        return await asyncio.to_thread(self._post, prompt)
+
+class ReplayExtractor(LlmExtractor):
+    """
+    Deterministic extractor for tests and offline load tests: responses are
+    replayed from <fixture_dir>/<prompt hash>.json recordings. With
+    record_from set, prompts without a recording are answered by that
+    extractor and recorded.
+    """
+
+    name = "replay"
+
+    def __init__(self, fixture_dir=LLM_REPLAY_DIR, record_from=LLM_REPLAY_RECORD_FROM):
+        self.fixture_dir = fixture_dir
+        self.record_from = record_from
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _recording_path(self, prompt):
+        return os.path.join(self.fixture_dir, hashlib.sha256(prompt.encode("utf-8")).hexdigest() + ".json")
+
+    async def generate(self, prompt):
+        path = self._recording_path(prompt)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)["response"]
+        if not self.record_from:
+            raise Exception(f"Replay Error: no recorded response for prompt {os.path.basename(path)[:-5]}")
+
+        response_text = await get_llm_extractor(self.record_from).generate(prompt)
+        with open(path, "w") as f:
+            json.dump({"response": response_text, "recorded_from": self.record_from}, f)
+        return response_text
+
+LLM_EXTRACTORS = {
+    "gemini": GeminiExtractor,
+    "openai": OpenAICompatibleExtractor,
+    "replay": ReplayExtractor
+}
+
+_llm_extractors = {}
+_llm_extractors_lock = threading.Lock()
+
+def get_llm_extractor(spec=None):
+    """
+    Return the process-wide extractor for a "backend" or "backend:model" spec (LLM_EXTRACTOR when not given)
+    """
+    spec = spec or LLM_EXTRACTOR
+    backend, _, model_name = spec.partition(":")
+    if backend not in LLM_EXTRACTORS:
+        raise ValueError(f"Unknown LLM extractor: {backend}. Must be one of {', '.join(LLM_EXTRACTORS)}.")
+    with _llm_extractors_lock:
+        if spec not in _llm_extractors:
+            if backend == "replay":
+                _llm_extractors[spec] = ReplayExtractor()
+            else:
+                _llm_extractors[spec] = LLM_EXTRACTORS[backend](model_name or None)
+        return _llm_extractors[spec]
+
+def extractor_spec_for_product(product_type):
+    """
+    The extractor spec configured for a product type (CAR, BIKE or HEALTH)
+    """
+    return LLM_EXTRACTOR_BY_PRODUCT.get(product_type) or LLM_EXTRACTOR
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an OpenAI-compatible LLM endpoint, for offline load tests
+of the classify stage and the full /process-pdf/ path.
+
+Answers POST /v1/chat/completions with the response recorded for the prompt
+(same recordings as the replay extractor) or with a canned, schema-shaped
+JSON object, after an optional simulated latency.
+
+Usage:
+    python llm_stub_server.py [--port 8080] [--latency-ms 500] [--replay-dir llm_fixtures]
+    LLM_EXTRACTOR=openai OPENAI_BASE_URL=http://localhost:8080/v1 uvicorn main:app
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Parses for both vehicle and medical prompts, with every field left empty
+CANNED_RESPONSE = json.dumps({"Coverton imp_keys": {}, "medical_insurance": {}})
+
+def make_handler(latency_seconds, replay_dir):
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = request["messages"][-1]["content"]
+
+            content = CANNED_RESPONSE
+            if replay_dir:
+                path = os.path.join(replay_dir, hashlib.sha256(prompt.encode("utf-8")).hexdigest() + ".json")
+                if os.path.exists(path):
+                    with open(path) as f:
+                        content = json.load(f)["response"]
+
+            time.sleep(latency_seconds)
+            body = json.dumps({
+                "id": "stub",
+                "object": "chat.completion",
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ChatCompletionsHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated model latency per request")
+    parser.add_argument("--replay-dir", help="Directory of recorded responses (see llm_extractors.ReplayExtractor)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency_ms / 1000, args.replay_dir))
+    print(f"🤖 LLM stand-in listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
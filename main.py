@@ -1,17 +1,54 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from models import BikeInsurancePolicy
 import sqlite3
 from datetime import datetime
-from vision_gemini_processor import process_insurance_document
+from policy_import import IMPORT_FORMATS, detect_import_format, import_policies
+from database import (
+    POLICY_WRITE_BATCHING, POLICY_PAGE_SIZE, POLICY_PAGE_MAX_SIZE, DEFAULT_POLICY_FIELDS, iso_date,
+    get_policy_store, get_policy_writer, close_policy_store, policy_row
+)
+from vision_gemini_processor import (
+    process_insurance_document, process_pdf_file, reclassify_from_ocr_cache,
+    is_processed_result, resolve_product_type
+)
+from result_cache import get_result_cache
+from near_duplicates import get_near_duplicate_index
+from job_queue import JobQueue
+from batch_processor import collect_batch_documents, process_batch_documents, cleanup_batch
+from render_pool import shutdown_render_pool
+from vision_client import close_vision_clients
+from ocr_backends import OCR_BACKENDS
+from contextlib import asynccontextmanager
+import csv
+import io
 import json
+import asyncio
 from enum import Enum
+from typing import List, Optional
+
+# Background PDF processing jobs for the asynchronous /jobs/ endpoints, created at startup
+job_queue = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global job_queue
+    # Open the policy database (creating the table on first run) before serving requests
+    get_policy_store()
+    job_queue = JobQueue(process_pdf_file)
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    close_policy_store()
+    shutdown_render_pool()
+    close_vision_clients()
 
 app = FastAPI(
     title="InsuraWise Insurance API",
     description="Insurance policy management with PDF processing using Google Cloud Vision API and Gemini AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,69 +66,220 @@ class ProductType(str, Enum):
     bike = "BIKE"
     health = "HEALTH"
 
-# Initialize DB on first run
-def init_db():
-    conn = sqlite3.connect("insurance.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS policies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            email TEXT,
-            insurer TEXT,
-            policy_number TEXT,
-            policy_start_date TEXT,
-            policy_end_date TEXT,
-            date_of_policy TEXT,
-            expiry_date TEXT,
-            vehicle_type TEXT,
-            submitted_at TEXT
+@app.post("/submit-policy/")
+async def submit_policy(policy: BikeInsurancePolicy):
+    try:
+        row = policy_row(policy)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    
+    try:
+        if POLICY_WRITE_BATCHING:
+            # Acknowledged once the group commit holding the row is durable
+            await asyncio.wrap_future(get_policy_writer().submit(row))
+        else:
+            await asyncio.to_thread(get_policy_store().insert_policy, row)
+    except sqlite3.IntegrityError:
+        return JSONResponse(
+            status_code=409,
+            content={"error": f"Policy {policy.policy_number} of {policy.insurer} already exists"}
         )
-    """)
-    conn.commit()
-    conn.close()
+    return {"message": "Policy stored successfully"}
 
-init_db()
+def policy_filters(**values):
+    """
+    The policy listing filters that were given, with the date filters in ISO format
+    """
+    filters = {name: value for name, value in values.items() if value is not None}
+    # Dates are compared as stored, in ISO format
+    for name in ("expiry_from", "expiry_to", "start_from", "start_to"):
+        if name in filters:
+            value = iso_date(filters[name])
+            if value is None:
+                raise ValueError(f"Invalid {name}: {filters[name]!r}")
+            filters[name] = value
+    return filters
 
-@app.post("/submit-policy/")
-def submit_policy(policy: BikeInsurancePolicy):
-    conn = sqlite3.connect("insurance.db")
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        INSERT INTO policies (
-            name, email, insurer, policy_number, policy_start_date,
-            policy_end_date, date_of_policy, expiry_date,
-            vehicle_type, submitted_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        policy.name,
-        policy.email,
-        policy.insurer,
-        policy.policy_number,
-        policy.policy_start_date,
-        policy.policy_end_date,
-        policy.date_of_policy,
-        policy.expiry_date,
-        policy.vehicle_type,
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ))
-
-    conn.commit()
-    conn.close()
+@app.get("/policies")
+async def list_policies(
+    insurer: Optional[str] = Query(None, description="Only policies of this insurer"),
+    vehicle_type: Optional[str] = Query(None, description="Only policies of this vehicle type"),
+    email: Optional[str] = Query(None, description="Only policies with this email address"),
+    expiry_from: Optional[str] = Query(None, description="Only policies expiring on or after this date"),
+    expiry_to: Optional[str] = Query(None, description="Only policies expiring on or before this date"),
+    start_from: Optional[str] = Query(None, description="Only policies starting on or after this date"),
+    start_to: Optional[str] = Query(None, description="Only policies starting on or before this date"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return (id is always included)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(POLICY_PAGE_SIZE, ge=1, le=POLICY_PAGE_MAX_SIZE, description="Policies per page"),
+    order: str = Query("asc", description="asc for oldest first, desc for newest first")
+):
+    """
+    List stored policies a page at a time
+    
+    - **insurer**, **vehicle_type**, **email**: Exact match filters
+    - **expiry_from**, **expiry_to**, **start_from**, **start_to**: Date range filters (inclusive)
+    - **fields**: Return only these fields, e.g. `name,policy_number,expiry_date`
+    - **cursor**: Pass the `next_cursor` of a page to get the page after it; it is null on the last page
+    
+    Policies come in id order, or by date then id when a date range filter is given
+    (expiry date if both ranges are)
+    
+    Every page costs the same however deep into the listing it is
+    """
+    try:
+        filters = policy_filters(
+            insurer=insurer, vehicle_type=vehicle_type, email=email, expiry_from=expiry_from,
+            expiry_to=expiry_to, start_from=start_from, start_to=start_to
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if order not in ("asc", "desc"):
+        return JSONResponse(status_code=400, content={"error": "Invalid order. Must be asc or desc."})
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else DEFAULT_POLICY_FIELDS
+    
+    try:
+        policies, next_cursor = await asyncio.to_thread(
+            get_policy_store().list_policies, filters, field_list, cursor, limit, order == "desc"
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+    return {"policies": policies, "next_cursor": next_cursor, "limit": limit}
 
-    return {"message": "Policy stored successfully"}
+@app.get("/policies/export.csv")
+async def export_policies_csv(
+    insurer: Optional[str] = Query(None, description="Only policies of this insurer"),
+    vehicle_type: Optional[str] = Query(None, description="Only policies of this vehicle type"),
+    email: Optional[str] = Query(None, description="Only policies with this email address"),
+    expiry_from: Optional[str] = Query(None, description="Only policies expiring on or after this date"),
+    expiry_to: Optional[str] = Query(None, description="Only policies expiring on or before this date"),
+    start_from: Optional[str] = Query(None, description="Only policies starting on or after this date"),
+    start_to: Optional[str] = Query(None, description="Only policies starting on or before this date"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export (id is always included)")
+):
+    """
+    Download every stored policy matching the filters as CSV
+    
+    Takes the same filters as GET /policies. The file is streamed a listing page at
+    a time, so the table is never held in memory
+    """
+    try:
+        filters = policy_filters(
+            insurer=insurer, vehicle_type=vehicle_type, email=email, expiry_from=expiry_from,
+            expiry_to=expiry_to, start_from=start_from, start_to=start_to
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else DEFAULT_POLICY_FIELDS
+    
+    # The first page is read before the response starts, so bad fields still get a 400
+    store = get_policy_store()
+    try:
+        policies, next_cursor = await asyncio.to_thread(
+            store.list_policies, filters, field_list, None, POLICY_PAGE_MAX_SIZE
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+    columns = ["id"] + [field for field in field_list if field != "id"]
+    
+    async def csv_pages():
+        nonlocal policies, next_cursor
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        while True:
+            writer.writerows(policies)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if next_cursor is None:
+                break
+            policies, next_cursor = await asyncio.to_thread(
+                store.list_policies, filters, field_list, next_cursor, POLICY_PAGE_MAX_SIZE
+            )
+    
+    return StreamingResponse(
+        csv_pages(), media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="policies.csv"'}
+    )
+
+@app.post("/policies/bulk")
+async def import_policies_bulk(
+    policies_file: UploadFile = File(..., description="Policies as NDJSON, CSV (with a header row) or a JSON array"),
+    import_format: Optional[str] = Form(None, description="ndjson, csv or json (default: from the file extension or content type)")
+):
+    """
+    Import many policies in one request
+    
+    - **policies_file**: One policy per NDJSON line, CSV row or JSON array element, with the
+      fields of /submit-policy/
+    - **import_format**: Format of the file when it cannot be told from its name
+    
+    Rows are validated and stored as they are read; invalid rows are skipped and reported
+    with their row number while the valid ones are stored
+    """
+    import_format = (import_format or detect_import_format(policies_file.filename, policies_file.content_type) or "").lower()
+    if import_format not in IMPORT_FORMATS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Unknown import format. Must be one of {', '.join(IMPORT_FORMATS)}."}
+        )
+    
+    try:
+        # The upload is spooled to disk by FastAPI and read back in a thread
+        summary = await asyncio.to_thread(import_policies, policies_file.file, import_format)
+        return JSONResponse(status_code=400 if summary.get("error") else 200, content=summary)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+
+def build_pdf_result_content(result, product_type):
+    """
+    Build the status code and response body for a processed PDF result
+    """
+    insurance_type, vehicle_type = resolve_product_type(product_type)
+    if is_processed_result(result):
+        # Per-page processing details are reported next to the extracted data
+        metadata = result.pop("processing_metadata", None)
+        return 200, {
+            "message": "PDF processed successfully",
+            "data": result,
+            "metadata": metadata,
+            "product_type": product_type,
+            "insurance_type": insurance_type,
+            "vehicle_type": vehicle_type
+        }
+    elif isinstance(result, str) and result.startswith("⚠️"):
+        return 500, {"error": result}
+    else:
+        return 500, {"error": "Failed to process PDF", "details": result}
 
 @app.post("/process-pdf/")
 async def process_pdf(
     pdf_file: UploadFile = File(..., description="Upload insurance PDF document"),
-    product_type: ProductType = Form(..., description="Select product type")
+    product_type: ProductType = Form(..., description="Select product type"),
+    force_refresh: bool = Form(False, description="Re-process the PDF even if a cached result exists"),
+    ocr_backend: Optional[str] = Form(None, description="OCR engine for this document: vision, tesseract or replay (default: configured)")
 ):
     """
     Process insurance PDF with Google Cloud Vision API and Gemini AI
     
     - **pdf_file**: Upload your insurance policy PDF
     - **product_type**: Select product type (CAR, BIKE, or HEALTH)
+    - **force_refresh**: Bypass the result cache and re-process the document
+    - **ocr_backend**: OCR engine to use instead of the configured one
     
     Returns JSON in specified format based on product type
     """
@@ -103,6 +291,12 @@ async def process_pdf(
                 content={"error": "File must be a PDF"}
             )
         
+        if ocr_backend and ocr_backend not in OCR_BACKENDS:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Invalid OCR backend. Must be one of {', '.join(OCR_BACKENDS)}."}
+            )
+        
         # Convert product type to insurance type and vehicle type for processing logic
         if product_type.value in ["CAR", "BIKE"]:
             insurance_type_lower = "vehicle"
@@ -117,28 +311,172 @@ async def process_pdf(
             )
         
         # Process the PDF
-        result = await process_insurance_document(pdf_file, product_type.value, vehicle_type_lower)
+        result = await process_insurance_document(pdf_file, product_type.value, vehicle_type_lower, force_refresh, ocr_backend)
+        
+        status_code, content = build_pdf_result_content(result, product_type.value)
+        return JSONResponse(status_code=status_code, content=content)
+            
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+
+@app.post("/process-pdf/batch")
+async def process_pdf_batch(
+    pdf_files: List[UploadFile] = File(..., description="Upload insurance PDF documents and/or zip archives of PDFs"),
+    product_types: List[ProductType] = Form(..., description="Product type for each uploaded file, or one for all files"),
+    force_refresh: bool = Form(False, description="Re-process the PDFs even if cached results exist")
+):
+    """
+    Process many insurance PDFs in one request
+    
+    - **pdf_files**: PDFs and/or zip archives of PDFs
+    - **product_types**: One product type per uploaded file (in order), or a single one for all files.
+      A zip archive's product type applies to every PDF inside it unless the archive contains a
+      manifest.json mapping file names to product types
+    - **force_refresh**: Bypass the result cache and re-process the documents
+    
+    Results are streamed back as NDJSON, one line per document as soon as it finishes,
+    followed by a summary line
+    """
+    try:
+        documents, spool_dir = await collect_batch_documents(pdf_files, [product_type.value for product_type in product_types])
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+    
+    async def result_lines():
+        succeeded = 0
+        try:
+            async for document, result in process_batch_documents(documents, force_refresh):
+                status_code, content = build_pdf_result_content(result, document["product_type"])
+                if status_code == 200:
+                    succeeded += 1
+                line = {"index": document["index"], "filename": document["filename"], "status_code": status_code}
+                line.update(content)
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"summary": {"total": len(documents), "succeeded": succeeded, "failed": len(documents) - succeeded}}) + "\n"
+        finally:
+            cleanup_batch(spool_dir)
+    
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs/")
+async def submit_pdf_job(
+    pdf_file: UploadFile = File(..., description="Upload insurance PDF document"),
+    product_type: ProductType = Form(..., description="Select product type"),
+    force_refresh: bool = Form(False, description="Re-process the PDF even if a cached result exists")
+):
+    """
+    Queue an insurance PDF for background processing and return a job id immediately
+    
+    Poll **GET /jobs/{job_id}** for progress and fetch the output from **GET /jobs/{job_id}/result**
+    """
+    try:
+        # Validate file type
+        if not pdf_file.filename.lower().endswith('.pdf'):
+            return JSONResponse(
+                status_code=400,
+                content={"error": "File must be a PDF"}
+            )
         
-        if isinstance(result, dict) and ("Coverton imp_keys" in result or "medical_insurance" in result):
+        job_id = await job_queue.submit(pdf_file.file, pdf_file.filename, product_type.value, force_refresh)
+        
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/jobs/{job_id}",
+                "result_url": f"/jobs/{job_id}/result"
+            }
+        )
+        
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Internal server error: {str(e)}"}
+        )
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """
+    Status and page-level progress of a background PDF processing job
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "product_type": job["product_type"],
+        "pages_done": job["pages_done"],
+        "pages_total": job["pages_total"],
+        "error": job["error"],
+        "created_at": datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "updated_at": datetime.fromtimestamp(job["updated_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Result of a finished background PDF processing job, in the same format as /process-pdf/
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    
+    if job["status"] in ("queued", "running"):
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job["id"],
+                "status": job["status"],
+                "pages_done": job["pages_done"],
+                "pages_total": job["pages_total"]
+            }
+        )
+    if job["status"] == "failed":
+        return JSONResponse(status_code=500, content={"error": job["error"]})
+    
+    status_code, content = build_pdf_result_content(job["result"], job["product_type"])
+    return JSONResponse(status_code=status_code, content=content)
+
+@app.post("/reclassify/")
+async def reclassify_pdf(
+    pdf_sha256: str = Form(..., description="SHA-256 of a previously processed PDF (metadata.pdf_sha256)"),
+    product_type: ProductType = Form(..., description="Select product type")
+):
+    """
+    Rerun the Gemini classification of a previously processed PDF from its cached OCR text
+    """
+    try:
+        result = await reclassify_from_ocr_cache(pdf_sha256, product_type.value)
+        
+        if is_processed_result(result):
+            metadata = result.pop("processing_metadata", None)
             return JSONResponse(
                 status_code=200,
                 content={
-                    "message": "PDF processed successfully",
+                    "message": "PDF reclassified successfully",
                     "data": result,
-                    "product_type": product_type.value,
-                    "insurance_type": insurance_type_lower,
-                    "vehicle_type": vehicle_type_lower
+                    "metadata": metadata,
+                    "product_type": product_type.value
                 }
             )
-        elif isinstance(result, str) and result.startswith("⚠️"):
-            return JSONResponse(
-                status_code=500,
-                content={"error": result}
-            )
+        elif isinstance(result, dict) and "error" in result:
+            return JSONResponse(status_code=404, content=result)
         else:
             return JSONResponse(
                 status_code=500,
-                content={"error": "Failed to process PDF", "details": result}
+                content={"error": "Failed to reclassify PDF", "details": result}
             )
             
     except Exception as e:
@@ -147,13 +485,30 @@ async def process_pdf(
             content={"error": f"Internal server error: {str(e)}"}
         )
 
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit/miss counters and size of the processed document cache and the near-duplicate page index
+    """
+    stats = get_result_cache().stats()
+    stats["near_duplicates"] = get_near_duplicate_index().stats()
+    return stats
+
 @app.get("/")
 def read_root():
     return {
         "message": "InsuraWise Insurance API",
         "endpoints": {
             "submit_policy": "/submit-policy/",
+            "list_policies": "/policies",
+            "import_policies": "/policies/bulk",
             "process_pdf": "/process-pdf/",
+            "process_pdf_batch": "/process-pdf/batch",
+            "submit_job": "/jobs/",
+            "job_status": "/jobs/{job_id}",
+            "job_result": "/jobs/{job_id}/result",
+            "reclassify": "/reclassify/",
+            "cache_stats": "/cache/stats",
             "docs": "/docs",
             "redoc": "/redoc"
         },
@@ -0,0 +1,160 @@
+from models import IndividualMemberDetails
+
+# Number of member slots (member_1, member_2, ...) in the medical JSON format
+MEMBER_SLOTS = 3
+
+def _split_long_text(text, max_chars):
+    # Split a page that is larger than a chunk on line boundaries
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            # A single line longer than a chunk is cut hard
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+class TextChunker:
+    """
+    Incrementally group consecutive pages into chunks of at most max_chars
+    characters, so chunks can be handed out while later pages are still
+    being read. Pages are kept whole unless a single page is larger than a chunk.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.chunk_count = 0
+        self._current = []
+        self._current_size = 0
+
+    def _emit(self):
+        chunk = "\n".join(self._current)
+        self._current = []
+        self._current_size = 0
+        self.chunk_count += 1
+        return chunk
+
+    def add_page(self, text):
+        """
+        Add the next page and return the chunks it completed
+        """
+        completed = []
+        if not text:
+            return completed
+        for piece in _split_long_text(text, self.max_chars):
+            if self._current and self._current_size + len(piece) + 1 > self.max_chars:
+                completed.append(self._emit())
+            self._current.append(piece)
+            self._current_size += len(piece) + 1
+        return completed
+
+    def finish(self):
+        """
+        Return the last, partly filled chunk (if any) once every page has been added
+        """
+        return [self._emit()] if self._current else []
+
+def split_text_into_chunks(page_texts, max_chars):
+    """
+    Group consecutive pages into chunks of at most max_chars characters,
+    keeping pages whole unless a single page is larger than a chunk
+    """
+    chunker = TextChunker(max_chars)
+    chunks = []
+    for text in page_texts:
+        chunks.extend(chunker.add_page(text))
+    chunks.extend(chunker.finish())
+    return chunks
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, (dict, list)):
+        return not value
+    return False
+
+def _merge_fields(target, values):
+    # The first non-empty value wins; later chunks only fill fields still empty
+    for field, value in values.items():
+        if field not in target or (_is_empty(target[field]) and not _is_empty(value)):
+            target[field] = value
+
+def _chunk_members(member_details):
+    # Members come either in member_1..member_N slots or as a single flat member
+    if not isinstance(member_details, dict):
+        return []
+    slot_keys = sorted(
+        (key for key in member_details if key.startswith("member_") and key[7:].isdigit()),
+        key=lambda key: int(key[7:])
+    )
+    if slot_keys:
+        return [member_details[key] for key in slot_keys if isinstance(member_details[key], dict)]
+    return [member_details]
+
+def merge_members(partials):
+    """
+    Merge individual member details across chunks: members are kept in
+    document order, de-duplicated by name, and the first MEMBER_SLOTS fill
+    member_1..member_N
+    """
+    members = []
+    members_by_name = {}
+    for partial in partials:
+        for member in _chunk_members(partial.get("individual_member_details")):
+            if all(_is_empty(value) for value in member.values()):
+                continue
+            name_key = " ".join(str(member.get("name") or "").lower().split())
+            if name_key and name_key in members_by_name:
+                _merge_fields(members_by_name[name_key], member)
+                continue
+            merged_member = dict(member)
+            members.append(merged_member)
+            if name_key:
+                members_by_name[name_key] = merged_member
+
+    empty_member = {field: "" for field in IndividualMemberDetails.model_fields}
+    merged = {}
+    for slot in range(MEMBER_SLOTS):
+        member = dict(empty_member)
+        if slot < len(members):
+            member.update(members[slot])
+        merged[f"member_{slot + 1}"] = member
+    return merged
+
+def merge_medical_partials(partials):
+    """
+    Merge the "medical_insurance" objects extracted from each chunk into one.
+
+    Conflicts are resolved deterministically in chunk (page) order: for every
+    field the value from the earliest chunk that filled it wins, and later
+    chunks only fill fields that are still empty.
+    """
+    merged = {}
+    for partial in partials:
+        for section, values in partial.items():
+            if section == "individual_member_details":
+                continue
+            if isinstance(values, dict):
+                target = merged.setdefault(section, {})
+                if isinstance(target, dict):
+                    _merge_fields(target, values)
+            elif section not in merged or (_is_empty(merged[section]) and not _is_empty(values)):
+                merged[section] = values
+
+    merged["individual_member_details"] = merge_members(partials)
+    return merged
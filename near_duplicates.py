@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+import time
+import os
+import zlib
+from PIL import Image, ImageChops
+from dotenv import load_dotenv
+from page_renderer import FINGERPRINT_THUMBNAIL_SIZE
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Near-duplicate page detection settings. Off by default: a matched page reuses
+# another document's OCR text, so enable it only where that is acceptable
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "false").lower() == "true"
+NEAR_DUPLICATE_INDEX_PATH = os.getenv("NEAR_DUPLICATE_INDEX_PATH", "near_dup_index.db")
+
+# Maximum Hamming distance (bits out of 64) between the dHashes of two pages
+# for them to be compared at all
+NEAR_DUPLICATE_MAX_DISTANCE = max(0, min(int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "6")), 15))
+
+# Maximum per-pixel difference (0-255) between the grayscale thumbnails of two
+# pages for them to count as the same page. The dHash alone cannot tell pages
+# apart that differ in a few characters. On the 576x768 thumbnails a changed
+# digit in 5-12pt text differs by 60 or more, while JPEG re-encodings of the
+# same page differ by up to about 26.
+NEAR_DUPLICATE_MAX_PIXEL_DIFF = int(os.getenv("NEAR_DUPLICATE_MAX_PIXEL_DIFF", "40"))
+
+# Reuse the whole extraction of an earlier document when every page matches it
+# (only when near-duplicate detection is enabled)
+NEAR_DUPLICATE_REUSE_RESULTS = os.getenv("NEAR_DUPLICATE_REUSE_RESULTS", "true").lower() == "true"
+
+def hamming_distance(dhash_a, dhash_b):
+    """
+    Number of differing bits between two hex dHashes
+    """
+    return bin(int(dhash_a, 16) ^ int(dhash_b, 16)).count("1")
+
+def thumbnail_difference(thumbnail_a, thumbnail_b):
+    """
+    Largest per-pixel difference between two compressed grayscale thumbnails
+    """
+    thumbnail_a = zlib.decompress(thumbnail_a)
+    thumbnail_b = zlib.decompress(thumbnail_b)
+    if len(thumbnail_a) != len(thumbnail_b):
+        return 255
+    image_a = Image.frombytes("L", FINGERPRINT_THUMBNAIL_SIZE, thumbnail_a)
+    image_b = Image.frombytes("L", FINGERPRINT_THUMBNAIL_SIZE, thumbnail_b)
+    return ImageChops.difference(image_a, image_b).getextrema()[1]
+
+class NearDuplicateIndex:
+    """
+    Persistent index of the perceptual fingerprints of OCRed pages.
+
+    Each page is stored under its OCR cache key with its dHash and thumbnail.
+    The dHashes are split into max_distance + 1 bands kept in memory: two
+    hashes within max_distance bits of each other agree exactly on at least
+    one band, so a lookup only compares pages sharing a band. Candidates are
+    confirmed by comparing thumbnails before their text is reused.
+    """
+
+    def __init__(self, path=NEAR_DUPLICATE_INDEX_PATH, max_distance=NEAR_DUPLICATE_MAX_DISTANCE,
+                 max_pixel_diff=NEAR_DUPLICATE_MAX_PIXEL_DIFF):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_pixel_diff = max_pixel_diff
+        self.lookups = 0
+        self.page_hits = 0
+        self.rejected = 0
+        self.document_hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                page_key TEXT PRIMARY KEY,
+                backend TEXT,
+                dhash TEXT,
+                thumbnail BLOB,
+                created_at REAL
+            )
+        """)
+        # Version 1 keeps compressed 576x768 thumbnails; pages indexed with
+        # the older 96x128 thumbnails cannot be confirmed and are dropped
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+
+        band_count = max_distance + 1
+        self._band_bounds = [(64 * band // band_count, 64 * (band + 1) // band_count) for band in range(band_count)]
+        self._bands = [{} for _ in range(band_count)]
+        self._dhashes = {}
+        for page_key, backend, dhash in self._conn.execute("SELECT page_key, backend, dhash FROM pages"):
+            self._index(page_key, backend, dhash)
+
+    def _band_values(self, dhash):
+        bits = int(dhash, 16)
+        return [(bits >> start) & ((1 << (end - start)) - 1) for start, end in self._band_bounds]
+
+    def _index(self, page_key, backend, dhash):
+        self._dhashes[page_key] = (backend, dhash)
+        for band, value in zip(self._bands, self._band_values(dhash)):
+            band.setdefault(value, []).append(page_key)
+
+    def find(self, backend, dhash, thumbnail):
+        """
+        Return {"page_key", "distance", "pixel_diff"} of the closest indexed page
+        read by the same OCR backend that passes both thresholds, or None
+        """
+        with self._lock:
+            self.lookups += 1
+            candidates = {}
+            for band, value in zip(self._bands, self._band_values(dhash)):
+                for page_key in band.get(value, ()):
+                    page_backend, page_dhash = self._dhashes[page_key]
+                    if page_backend == backend and page_key not in candidates:
+                        distance = hamming_distance(dhash, page_dhash)
+                        if distance <= self.max_distance:
+                            candidates[page_key] = distance
+            if not candidates:
+                return None
+
+            best = None
+            # Closest hashes first; stop at the first thumbnail that also matches
+            for page_key in sorted(candidates, key=candidates.get):
+                row = self._conn.execute("SELECT thumbnail FROM pages WHERE page_key = ?", (page_key,)).fetchone()
+                pixel_diff = thumbnail_difference(thumbnail, row[0])
+                if pixel_diff <= self.max_pixel_diff:
+                    best = {"page_key": page_key, "distance": candidates[page_key], "pixel_diff": pixel_diff}
+                    break
+            if best is None:
+                self.rejected += 1
+            else:
+                self.page_hits += 1
+            return best
+
+    def add_many(self, backend, fingerprints):
+        """
+        Index a {page_key: (dhash, thumbnail)} dict, skipping pages already indexed
+        """
+        with self._lock:
+            new_pages = {
+                page_key: fingerprint for page_key, fingerprint in fingerprints.items()
+                if page_key not in self._dhashes
+            }
+            if not new_pages:
+                return
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pages (page_key, backend, dhash, thumbnail, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(page_key, backend, dhash, thumbnail, now) for page_key, (dhash, thumbnail) in new_pages.items()]
+            )
+            self._conn.commit()
+            for page_key, (dhash, _) in new_pages.items():
+                self._index(page_key, backend, dhash)
+
+    def record_document_hit(self):
+        """
+        Count a document whose extraction was reused from a near-duplicate
+        """
+        with self._lock:
+            self.document_hits += 1
+
+    def stats(self):
+        """
+        Lookup and hit counters, thresholds and size of the index
+        """
+        with self._lock:
+            return {
+                "enabled": NEAR_DUPLICATE_ENABLED,
+                "pages": len(self._dhashes),
+                "lookups": self.lookups,
+                "page_hits": self.page_hits,
+                "rejected": self.rejected,
+                "hit_rate": round(self.page_hits / self.lookups, 3) if self.lookups else 0.0,
+                "document_hits": self.document_hits,
+                "max_distance": self.max_distance,
+                "max_pixel_diff": self.max_pixel_diff
+            }
+
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+def get_near_duplicate_index():
+    """
+    Return the process-wide near-duplicate page index, creating it on first use
+    """
+    global _near_duplicate_index
+    with _near_duplicate_index_lock:
+        if _near_duplicate_index is None:
+            _near_duplicate_index = NearDuplicateIndex()
+        return _near_duplicate_index
@@ -0,0 +1,219 @@
+import io
+import json
+import threading
+import os
+from google.cloud import vision_v1
+from PIL import Image
+from dotenv import load_dotenv
+from ocr_cache import hash_page_image
+from vision_client import get_vision_client
+
+# Load environment variables from .env file
+load_dotenv()
+
+# OCR engine used for pages that need OCR: "vision", "tesseract" or "replay"
+OCR_BACKEND = os.getenv("OCR_BACKEND", "vision")
+
+# "local_digital" sends pages that render cleanly (digital pages without a usable
+# text layer) to OCR_LOCAL_BACKEND and only scans to OCR_BACKEND; "off" sends every page to OCR_BACKEND
+OCR_ROUTING = os.getenv("OCR_ROUTING", "off")
+OCR_LOCAL_BACKEND = os.getenv("OCR_LOCAL_BACKEND", "tesseract")
+
+# Pages whose images cover at most this fraction of the page count as clean digital pages for routing
+OCR_LOCAL_MAX_IMAGE_COVERAGE = float(os.getenv("OCR_LOCAL_MAX_IMAGE_COVERAGE", "0.1"))
+
+# Tesseract language(s) and extra command line options
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+TESSERACT_CONFIG = os.getenv("TESSERACT_CONFIG", "")
+
+# Directory of recorded page texts for the replay backend
+OCR_REPLAY_DIR = os.getenv("OCR_REPLAY_DIR", "ocr_fixtures")
+
+# Backend that reads (and records) pages the replay backend has no recording for; unset fails those pages
+OCR_REPLAY_RECORD_FROM = os.getenv("OCR_REPLAY_RECORD_FROM") or None
+
+def _text_detection_features():
+    return [vision_v1.Feature(type_=vision_v1.Feature.Type.TEXT_DETECTION)]
+
+def page_result_from_response(page_num, response):
+    """
+    Convert a single AnnotateImageResponse into a page result dict
+    """
+    if response.error.message:
+        return {"page": page_num + 1, "text": "", "error": f"Vision API Error: {response.error.message}"}
+
+    texts = response.text_annotations
+    if texts:
+        # The first annotation contains all text of the page
+        text = texts[0].description
+    else:
+        text = response.full_text_annotation.text
+    return {"page": page_num + 1, "text": text, "error": None}
+
+def detect_text_batch(client, page_nums, images):
+    """
+    OCR a batch of page images with one batch_annotate_images call (blocking call)
+    """
+    requests = [
+        vision_v1.AnnotateImageRequest(
+            image=vision_v1.Image(content=img_data),
+            features=_text_detection_features()
+        )
+        for img_data in images
+    ]
+    try:
+        response = client.batch_annotate_images(requests=requests)
+    except Exception as e:
+        # The whole RPC failed, so every page of the batch failed
+        return [{"page": page_num + 1, "text": "", "error": f"Vision API Error: {str(e)}"} for page_num in page_nums]
+
+    # Responses are returned in the same order as the requests
+    return [
+        page_result_from_response(page_num, page_response)
+        for page_num, page_response in zip(page_nums, response.responses)
+    ]
+
+class OcrBackend:
+    """
+    Interface of an OCR engine: ocr_images() reads a batch of rendered page images
+    """
+
+    name = None
+    # Maximum number of images per ocr_images() call
+    max_batch_size = 16
+    # Whether page texts read by this engine are stored in the OCR text cache
+    cacheable = True
+
+    def ocr_images(self, page_nums, images):
+        """
+        OCR a batch of page images (blocking call). Returns one
+        {"page": 1, "text": "...", "error": None} dict per image, in order.
+        """
+        raise NotImplementedError
+
+    def page_key(self, img_data):
+        """
+        OCR cache key of a page image; text read by other engines is kept apart from Vision API text
+        """
+        page_hash = hash_page_image(img_data)
+        return page_hash if self.name == "vision" else f"{self.name}:{page_hash}"
+
+class VisionOcrBackend(OcrBackend):
+    """
+    Google Cloud Vision text detection through the shared client pool
+    """
+
+    name = "vision"
+
+    def ocr_images(self, page_nums, images):
+        return detect_text_batch(get_vision_client(), page_nums, images)
+
+class TesseractOcrBackend(OcrBackend):
+    """
+    Local, offline OCR with Tesseract (needs the tesseract binary and pytesseract)
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang=TESSERACT_LANG, config=TESSERACT_CONFIG):
+        try:
+            import pytesseract
+        except ImportError:
+            raise ImportError("The tesseract OCR backend needs pytesseract: pip install pytesseract")
+        self._pytesseract = pytesseract
+        self.lang = lang
+        self.config = config
+
+    def ocr_images(self, page_nums, images):
+        results = []
+        for page_num, img_data in zip(page_nums, images):
+            try:
+                with Image.open(io.BytesIO(img_data)) as image:
+                    text = self._pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+                results.append({"page": page_num + 1, "text": text, "error": None})
+            except Exception as e:
+                results.append({"page": page_num + 1, "text": "", "error": f"Tesseract Error: {str(e)}"})
+        return results
+
+class ReplayOcrBackend(OcrBackend):
+    """
+    Deterministic OCR for tests and offline runs: page texts are replayed from
+    <fixture_dir>/<page image hash>.json recordings. With record_from set, pages
+    without a recording are read by that backend and recorded.
+    """
+
+    name = "replay"
+    cacheable = False
+
+    def __init__(self, fixture_dir=OCR_REPLAY_DIR, record_from=OCR_REPLAY_RECORD_FROM):
+        self.fixture_dir = fixture_dir
+        self.record_from = record_from
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _recording_path(self, img_data):
+        return os.path.join(self.fixture_dir, f"{hash_page_image(img_data)}.json")
+
+    def ocr_images(self, page_nums, images):
+        results = {}
+        missing = []
+        for page_num, img_data in zip(page_nums, images):
+            path = self._recording_path(img_data)
+            if os.path.exists(path):
+                with open(path) as f:
+                    recording = json.load(f)
+                results[page_num] = {"page": page_num + 1, "text": recording["text"], "error": None}
+            else:
+                missing.append((page_num, img_data))
+
+        if missing and self.record_from:
+            recorded = get_ocr_backend(self.record_from).ocr_images(
+                [page_num for page_num, _ in missing], [img_data for _, img_data in missing]
+            )
+            for (page_num, img_data), result in zip(missing, recorded):
+                if not result["error"]:
+                    with open(self._recording_path(img_data), "w") as f:
+                        json.dump({"text": result["text"], "recorded_from": self.record_from}, f)
+                results[page_num] = result
+        else:
+            for page_num, img_data in missing:
+                results[page_num] = {
+                    "page": page_num + 1, "text": "",
+                    "error": f"Replay Error: no recording for page image {hash_page_image(img_data)}"
+                }
+        return [results[page_num] for page_num in page_nums]
+
+OCR_BACKENDS = {
+    "vision": VisionOcrBackend,
+    "tesseract": TesseractOcrBackend,
+    "replay": ReplayOcrBackend
+}
+
+_ocr_backends = {}
+_ocr_backends_lock = threading.Lock()
+
+def get_ocr_backend(name=None):
+    """
+    Return the process-wide instance of an OCR backend (OCR_BACKEND when name is not given)
+    """
+    name = name or OCR_BACKEND
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}. Must be one of {', '.join(OCR_BACKENDS)}.")
+    with _ocr_backends_lock:
+        if name not in _ocr_backends:
+            _ocr_backends[name] = OCR_BACKENDS[name]()
+        return _ocr_backends[name]
+
+def route_ocr_page(decision, backend_name=None):
+    """
+    Pick the OCR backend for a page from its text layer classifier decision.
+    An explicitly requested backend is used for every page; otherwise the
+    routing policy may send clean digital pages to the local backend.
+    """
+    if backend_name:
+        return backend_name
+    if OCR_ROUTING == "local_digital" and (
+        decision.get("reason") == "garbled_text_layer"
+        or decision.get("image_coverage", 1.0) <= OCR_LOCAL_MAX_IMAGE_COVERAGE
+    ):
+        return OCR_LOCAL_BACKEND
+    return OCR_BACKEND
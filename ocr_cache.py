@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import mmap
+import time
+import zlib
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# OCR text cache settings
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "ocr_cache")
+
+# How long a process waits for another one to finish writing to the cache
+OCR_CACHE_BUSY_TIMEOUT_MS = int(os.getenv("OCR_CACHE_BUSY_TIMEOUT_MS", "10000"))
+
+# Page hashes per lookup query, below SQLite's limit on bound parameters
+OCR_CACHE_LOOKUP_BATCH = 500
+
+def hash_page_image(img_data):
+    """
+    Content hash of a rendered page image, used as the OCR cache key
+    """
+    return hashlib.sha256(img_data).hexdigest()
+
+def hash_page_text(text):
+    """
+    Content hash of a page read from its text layer
+    """
+    return "text:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def document_page_hashes(pages):
+    """
+    The ordered page hashes a document is recorded under, skipping failed pages
+    """
+    return [
+        page.get("page_hash") or hash_page_text(page["text"])
+        for page in pages if not page.get("error")
+    ]
+
+class OcrTextCache:
+    """
+    Persistent cache of per-page OCR text.
+
+    Page texts are zlib-compressed and appended to a single data file that is
+    read through a memory map; a SQLite index maps each page hash to its
+    offset and length. Documents are recorded as the ordered list of their
+    page hashes so their text can be rebuilt without the PDF.
+
+    Several processes (uvicorn workers) can share the cache: appends are made
+    while holding the index's write transaction, so no two processes append
+    at the same time and every offset is the end of the file as written.
+    """
+
+    def __init__(self, directory=OCR_CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, "pages.bin")
+        self._lock = threading.Lock()
+        self._data_file = open(self.data_path, "ab+")
+        self._mmap = None
+        self._mapped_size = 0
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.db"), timeout=OCR_CACHE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA busy_timeout={OCR_CACHE_BUSY_TIMEOUT_MS}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                page_hash TEXT PRIMARY KEY,
+                offset INTEGER,
+                length INTEGER,
+                created_at REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                pdf_sha256 TEXT PRIMARY KEY,
+                page_hashes TEXT,
+                created_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_page_hashes ON documents (page_hashes)")
+        self._conn.commit()
+
+    def _read(self, offset, length):
+        # Remap when the data file has grown past the current mapping
+        if offset + length > self._mapped_size:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._data_file.flush()
+            self._mapped_size = os.path.getsize(self.data_path)
+            self._mmap = mmap.mmap(self._data_file.fileno(), self._mapped_size, access=mmap.ACCESS_READ)
+        return zlib.decompress(self._mmap[offset:offset + length]).decode("utf-8")
+
+    def get(self, page_hash):
+        """
+        Return the cached text of a page, or None if it has not been seen
+        """
+        return self.get_many([page_hash]).get(page_hash)
+
+    def _lookup(self, page_hashes):
+        # Index rows of the given pages, queried in batches of bound parameters
+        page_hashes = list(page_hashes)
+        rows = []
+        for start in range(0, len(page_hashes), OCR_CACHE_LOOKUP_BATCH):
+            batch = page_hashes[start:start + OCR_CACHE_LOOKUP_BATCH]
+            rows += self._conn.execute(
+                f"SELECT page_hash, offset, length FROM pages WHERE page_hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+        return rows
+
+    def get_many(self, page_hashes):
+        """
+        Return a {page_hash: text} dict for the pages found in the cache
+        """
+        if not page_hashes:
+            return {}
+        with self._lock:
+            return {page_hash: self._read(offset, length) for page_hash, offset, length in self._lookup(page_hashes)}
+
+    def put_many(self, page_texts):
+        """
+        Store a {page_hash: text} dict, skipping pages that are already cached
+        """
+        if not page_texts:
+            return
+        with self._lock:
+            # The write lock is held from before the file end is read until the
+            # offsets are committed, so other processes append after these pages
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = {row[0] for row in self._lookup(page_texts)}
+                now = time.time()
+                index_rows = []
+                self._data_file.seek(0, os.SEEK_END)
+                for page_hash, text in page_texts.items():
+                    if page_hash in existing:
+                        continue
+                    blob = zlib.compress(text.encode("utf-8"))
+                    offset = self._data_file.tell()
+                    self._data_file.write(blob)
+                    index_rows.append((page_hash, offset, len(blob), now))
+                self._data_file.flush()
+                os.fsync(self._data_file.fileno())
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO pages (page_hash, offset, length, created_at) VALUES (?, ?, ?, ?)",
+                    index_rows
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def put_document(self, pdf_sha256, pages):
+        """
+        Record a document as its ordered page hashes and store the page texts
+        """
+        ok_pages = [page for page in pages if not page.get("error")]
+        page_hashes = document_page_hashes(ok_pages)
+        self.put_many({page_hash: page["text"] for page_hash, page in zip(page_hashes, ok_pages)})
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (pdf_sha256, page_hashes, created_at) VALUES (?, ?, ?)",
+                (pdf_sha256, json.dumps(page_hashes), time.time())
+            )
+            self._conn.commit()
+
+    def get_document_pages(self, pdf_sha256):
+        """
+        Return the page texts of a previously processed document in page order, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_hashes FROM documents WHERE pdf_sha256 = ?", (pdf_sha256,)
+            ).fetchone()
+        if row is None:
+            return None
+        page_hashes = json.loads(row[0])
+        page_texts = self.get_many(page_hashes)
+        if len(page_texts) != len(set(page_hashes)):
+            return None
+        return [page_texts[page_hash] for page_hash in page_hashes]
+
+    def find_document(self, page_hashes, exclude=None):
+        """
+        Return the sha256 of the latest other document recorded with exactly these page hashes, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pdf_sha256 FROM documents WHERE page_hashes = ? AND pdf_sha256 != ? ORDER BY created_at DESC LIMIT 1",
+                (json.dumps(page_hashes), exclude or "")
+            ).fetchone()
+        return row[0] if row else None
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+def get_ocr_cache():
+    """
+    Return the process-wide OCR text cache, creating it on first use
+    """
+    global _ocr_cache
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OcrTextCache()
+        return _ocr_cache
@@ -0,0 +1,153 @@
+import io
+import math
+import os
+import zlib
+import fitz  # PyMuPDF for PDF processing
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Pixel budget of a rendered page: the zoom factor is picked so the rendered
+# area is about this many pixels (an A4 page at the old fixed 2x zoom is ~2 million)
+RENDER_TARGET_PIXELS = int(os.getenv("RENDER_TARGET_PIXELS", "2000000"))
+
+# Bounds of the adaptive zoom factor (1.0 = 72 DPI)
+RENDER_MIN_ZOOM = float(os.getenv("RENDER_MIN_ZOOM", "1.0"))
+RENDER_MAX_ZOOM = float(os.getenv("RENDER_MAX_ZOOM", "4.0"))
+
+# Render pages in grayscale instead of RGB
+RENDER_GRAYSCALE = os.getenv("RENDER_GRAYSCALE", "false").lower() == "true"
+
+# Image encoding sent to OCR: "png" (lossless), "jpeg" or "webp"
+RENDER_IMAGE_FORMAT = os.getenv("RENDER_IMAGE_FORMAT", "png").lower()
+
+# Quality (1-100) of the lossy jpeg and webp encodings
+RENDER_IMAGE_QUALITY = int(os.getenv("RENDER_IMAGE_QUALITY", "85"))
+
+# Render only the bounding box of the page content, dropping blank margins
+RENDER_CROP_TO_CONTENT = os.getenv("RENDER_CROP_TO_CONTENT", "false").lower() == "true"
+
+# Zoom of the low resolution preview used to find the content bounding box
+_CROP_PREVIEW_ZOOM = 0.5
+
+# Preview pixels darker than this count as content
+_CROP_INK_THRESHOLD = 230
+
+# Margin kept around the content bounding box, in points
+_CROP_MARGIN = 12
+
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+
+# Size of the grayscale thumbnail kept to compare near-duplicate pages (about
+# 72 DPI for A4, fine enough for a changed digit in 6pt text to show), and of the dHash grid
+FINGERPRINT_THUMBNAIL_SIZE = (576, 768)
+DHASH_SIZE = 8
+
+def render_settings(**overrides):
+    """
+    The configured render settings as a dict, with any overrides applied
+    """
+    settings = {
+        "target_pixels": RENDER_TARGET_PIXELS,
+        "min_zoom": RENDER_MIN_ZOOM,
+        "max_zoom": RENDER_MAX_ZOOM,
+        "grayscale": RENDER_GRAYSCALE,
+        "image_format": RENDER_IMAGE_FORMAT,
+        "quality": RENDER_IMAGE_QUALITY,
+        "crop_to_content": RENDER_CROP_TO_CONTENT,
+        # Compute a perceptual fingerprint of each page (see near_duplicates.py)
+        "fingerprint": False
+    }
+    settings.update(overrides)
+    if settings["image_format"] not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {settings['image_format']}")
+    return settings
+
+def content_bbox(page):
+    """
+    Bounding box of the non-blank area of a page, found on a low resolution
+    grayscale preview so it works for scans as well as born-digital pages.
+    Returns the full page rect when the page is blank.
+    """
+    preview = page.get_pixmap(matrix=fitz.Matrix(_CROP_PREVIEW_ZOOM, _CROP_PREVIEW_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", (preview.width, preview.height), preview.samples)
+    ink = ImageOps.invert(image).point(lambda value: 255 if value > 255 - _CROP_INK_THRESHOLD else 0)
+    box = ink.getbbox()
+    if box is None:
+        return page.rect
+
+    left, top, right, bottom = (value / _CROP_PREVIEW_ZOOM for value in box)
+    rect = fitz.Rect(
+        page.rect.x0 + left - _CROP_MARGIN, page.rect.y0 + top - _CROP_MARGIN,
+        page.rect.x0 + right + _CROP_MARGIN, page.rect.y0 + bottom + _CROP_MARGIN
+    )
+    return rect & page.rect
+
+def adaptive_zoom(rect, settings):
+    """
+    Zoom factor that renders rect at about the target pixel budget, within the zoom bounds
+    """
+    area = max(rect.width * rect.height, 1.0)
+    zoom = math.sqrt(settings["target_pixels"] / area)
+    return max(settings["min_zoom"], min(zoom, settings["max_zoom"]))
+
+def encode_pixmap(pix, image_format, quality):
+    """
+    Encode a pixmap as PNG, JPEG or WebP bytes
+    """
+    if image_format == "png":
+        return pix.tobytes("png")
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=quality)
+    return buffer.getvalue()
+
+def page_fingerprint(pix):
+    """
+    Perceptual fingerprint of a rendered page: a 64-bit difference hash (dHash)
+    as hex and a grayscale thumbnail (zlib-compressed raw bytes) to verify matches
+    """
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    thumbnail = image.resize(FINGERPRINT_THUMBNAIL_SIZE, Image.BOX).convert("L")
+    grid = thumbnail.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BOX).tobytes()
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            left = grid[row * (DHASH_SIZE + 1) + col]
+            bits = (bits << 1) | (left > grid[row * (DHASH_SIZE + 1) + col + 1])
+    return f"{bits:0{DHASH_SIZE * DHASH_SIZE // 4}x}", zlib.compress(thumbnail.tobytes())
+
+def render_page(page, settings=None):
+    """
+    Render a PDF page for OCR with the given (or configured) render settings.
+
+    Returns the encoded image bytes and a dict describing the render:
+    zoom, pixel size, image format, byte size, whether it was cropped and,
+    with the fingerprint setting, the page's dHash and thumbnail.
+    """
+    settings = settings or render_settings()
+    clip = content_bbox(page) if settings["crop_to_content"] else page.rect
+    zoom = adaptive_zoom(clip, settings)
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(zoom, zoom),
+        clip=clip,
+        colorspace=fitz.csGRAY if settings["grayscale"] else fitz.csRGB,
+        alpha=False
+    )
+    img_data = encode_pixmap(pix, settings["image_format"], settings["quality"])
+    render_info = {
+        "zoom": round(zoom, 3),
+        "width": pix.width,
+        "height": pix.height,
+        "image_format": settings["image_format"],
+        "bytes": len(img_data),
+        "cropped": clip != page.rect
+    }
+    if settings.get("fingerprint"):
+        # The thumbnail is taken off the render info before it is reported
+        render_info["dhash"], render_info["thumbnail"] = page_fingerprint(pix)
+    return img_data, render_info
@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+import time
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from models import BikeInsurancePolicy
+from database import policy_row, get_policy_store
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Validated rows written per transaction (one executemany each) by a bulk import
+POLICY_IMPORT_BATCH_ROWS = max(1, int(os.getenv("POLICY_IMPORT_BATCH_ROWS", "10000")))
+
+# Row errors listed in a bulk import response; later ones are only counted
+POLICY_IMPORT_MAX_ERRORS = int(os.getenv("POLICY_IMPORT_MAX_ERRORS", "1000"))
+
+# Characters read at a time from a JSON array upload, and the largest single element accepted
+JSON_READ_SIZE = 64 * 1024
+JSON_MAX_RECORD_CHARS = 1024 * 1024
+
+IMPORT_FORMATS = ("ndjson", "csv", "json")
+
+def detect_import_format(filename=None, content_type=None):
+    """
+    The import format of an upload from its file extension or content type, or None
+    """
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in ("ndjson", "jsonl"):
+        return "ndjson"
+    if extension in ("csv", "json"):
+        return extension
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return {
+        "application/x-ndjson": "ndjson",
+        "application/jsonl": "ndjson",
+        "text/csv": "csv",
+        "application/json": "json"
+    }.get(content_type)
+
+def read_ndjson_records(text_file):
+    """
+    Yield (row_number, record) for each non-blank line; a line that is not JSON yields its error message instead
+    """
+    for row_number, line in enumerate(text_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, f"Invalid JSON: {e.msg}"
+
+def read_csv_records(text_file):
+    """
+    Yield (row_number, record) for each CSV row after the header row
+    """
+    reader = csv.DictReader(text_file)
+    for row_number, record in enumerate(reader, start=1):
+        # Short rows get None for the missing columns, which fails validation;
+        # values past the last header column are dropped
+        record.pop(None, None)
+        yield row_number, record
+
+def read_json_array_records(text_file):
+    """
+    Yield (row_number, record) for each element of a top-level JSON array,
+    decoding the array incrementally instead of loading the whole document
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    finished = False
+
+    def fill():
+        nonlocal buffer, position, finished
+        chunk = text_file.read(JSON_READ_SIZE)
+        if not chunk:
+            finished = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def next_token():
+        # Skip whitespace and return the next character, reading more text as needed
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if finished:
+                return None
+            fill()
+
+    if next_token() != "[":
+        raise ValueError("JSON upload must be an array of policy objects")
+    position += 1
+    if next_token() == "]":
+        return
+
+    row_number = 0
+    while True:
+        next_token()
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or finished:
+                    break
+            except json.JSONDecodeError as e:
+                if finished or len(buffer) - position > JSON_MAX_RECORD_CHARS:
+                    raise ValueError(f"Invalid JSON after row {row_number}: {e.msg}")
+            fill()
+        position = end
+        row_number += 1
+        yield row_number, record
+
+        separator = next_token()
+        position += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Invalid JSON after row {row_number}: expected ',' or ']'")
+
+IMPORT_READERS = {
+    "ndjson": read_ndjson_records,
+    "csv": read_csv_records,
+    "json": read_json_array_records
+}
+
+def validation_error_message(error):
+    """
+    One-line summary of a pydantic validation error
+    """
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+def import_policies(binary_file, import_format, store=None, batch_rows=POLICY_IMPORT_BATCH_ROWS, max_errors=POLICY_IMPORT_MAX_ERRORS):
+    """
+    Validate and insert the policies of an upload row by row (blocking call).
+
+    Rows are read as a stream and written in transactions of batch_rows rows
+    with executemany, so memory stays bounded by one batch whatever the
+    upload size. Rows that fail validation or a database constraint are
+    skipped and reported with their row number (the first max_errors of them).
+    """
+    store = store or get_policy_store()
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="" if import_format == "csv" else None)
+    started = time.perf_counter()
+    summary = {"format": import_format, "rows": 0, "inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def add_error(row_number, message):
+        summary["failed"] += 1
+        if len(summary["errors"]) < max_errors:
+            summary["errors"].append({"row": row_number, "error": message})
+        else:
+            summary["errors_truncated"] = True
+
+    def write_batch(batch):
+        row_numbers = [row_number for row_number, _ in batch]
+        errors = store.insert_many([row for _, row in batch])
+        summary["inserted"] += len(batch) - len(errors)
+        for index, message in sorted(errors.items()):
+            add_error(row_numbers[index], message)
+
+    batch = []
+    submitted_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        for row_number, record in IMPORT_READERS[import_format](text_file):
+            summary["rows"] += 1
+            if isinstance(record, str):
+                add_error(row_number, record)
+                continue
+            if not isinstance(record, dict):
+                add_error(row_number, "Expected an object with the policy fields")
+                continue
+            try:
+                row = policy_row(BikeInsurancePolicy(**record), submitted_at)
+            except ValidationError as e:
+                add_error(row_number, validation_error_message(e))
+                continue
+            except ValueError as e:
+                add_error(row_number, str(e))
+                continue
+            batch.append((row_number, row))
+            if len(batch) >= batch_rows:
+                write_batch(batch)
+                batch = []
+    except (ValueError, csv.Error) as e:
+        # The rest of the upload cannot be parsed; the rows read before it are still stored
+        summary["error"] = f"⚠️ {str(e)}"
+    if batch:
+        write_batch(batch)
+    # Leave the upload's own file open for FastAPI to close
+    text_file.detach()
+
+    seconds = time.perf_counter() - started
+    summary["seconds"] = round(seconds, 3)
+    summary["rows_per_second"] = round(summary["rows"] / seconds) if seconds else 0
+    return summary
@@ -0,0 +1,93 @@
+import asyncio
+import multiprocessing
+import threading
+import os
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF for PDF processing
+from dotenv import load_dotenv
+from page_renderer import render_page
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Number of worker processes rendering pages (0 renders on a thread of the API process)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+# Maximum number of rendered batches waiting for the OCR stage
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "4"))
+
+def render_page_range(pdf_path, page_nums, settings):
+    """
+    Render a range of pages in a worker process. The document is reopened by
+    path in the worker, since PyMuPDF documents cannot be shared between processes.
+    Returns the page images and their render info.
+    """
+    pdf_document = fitz.open(pdf_path)
+    try:
+        rendered = [render_page(pdf_document[page_num], settings) for page_num in page_nums]
+    finally:
+        pdf_document.close()
+    return [img_data for img_data, _ in rendered], [render_info for _, render_info in rendered]
+
+def make_render_pool(workers):
+    """
+    Create a process pool for rendering; workers are spawned rather than forked
+    so they do not inherit the MuPDF state of the API process
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """
+    Return the process-wide render pool, creating it on first use, or None when RENDER_WORKERS is 0
+    """
+    global _render_pool
+    if RENDER_WORKERS <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = make_render_pool(RENDER_WORKERS)
+        return _render_pool
+
+def shutdown_render_pool():
+    """
+    Stop the render worker processes (called on application shutdown)
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(cancel_futures=True)
+            _render_pool = None
+
+async def render_batches(batches, render_batch, max_in_flight, queue_size=None):
+    """
+    Render batches of pages with at most max_in_flight renders running at once
+    and yield them through a bounded queue as they finish, so the OCR stage
+    can start on the first batches while later ones are still rendering.
+
+    render_batch(page_nums) is an async callable returning (images, renders).
+    Yields (page_nums, images, renders, error) in completion order; a failed
+    batch has error set instead of images. A render holds its slot until the
+    queue has room for its result, so a slow consumer throttles rendering.
+    """
+    queue = asyncio.Queue(maxsize=queue_size or RENDER_QUEUE_SIZE)
+    slots = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def produce(page_nums):
+        async with slots:
+            try:
+                images, renders = await render_batch(page_nums)
+                item = (page_nums, images, renders, None)
+            except Exception as e:
+                item = (page_nums, None, None, e)
+            await queue.put(item)
+
+    tasks = [asyncio.create_task(produce(page_nums)) for page_nums in batches]
+    try:
+        for _ in batches:
+            yield await queue.get()
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Accuracy-versus-bytes report for the OCR render settings.
+
+Renders every PDF in a fixture directory with a set of render presets, OCRs
+the pages with Vision API and compares each preset against the baseline
+(RGB PNG, the old fixed 2x rendering) on image bytes, OCR latency, text
+similarity and field recall.
+
+Field recall uses an optional "<name>.fields.json" file next to each PDF
+holding the expected field values (any nested JSON); a field counts as found
+when its value appears in the OCR text.
+
+Usage: python render_report.py fixtures/ [--presets baseline,gray_jpeg_85] [--no-ocr] [--json report.json]
+"""
+
+import argparse
+import difflib
+import glob
+import json
+import os
+import sys
+import time
+import fitz  # PyMuPDF for PDF processing
+from page_renderer import render_page, render_settings
+
+# Presets compared by the report; the first one is the reference for text similarity
+RENDER_PRESETS = {
+    "baseline": {"target_pixels": 2000000, "grayscale": False, "image_format": "png", "crop_to_content": False},
+    "gray_png": {"target_pixels": 2000000, "grayscale": True, "image_format": "png", "crop_to_content": False},
+    "gray_jpeg_85": {"target_pixels": 2000000, "grayscale": True, "image_format": "jpeg", "quality": 85, "crop_to_content": False},
+    "gray_webp_80": {"target_pixels": 2000000, "grayscale": True, "image_format": "webp", "quality": 80, "crop_to_content": False},
+    "gray_jpeg_75_crop": {"target_pixels": 1500000, "grayscale": True, "image_format": "jpeg", "quality": 75, "crop_to_content": True},
+    "gray_webp_70_crop_small": {"target_pixels": 1000000, "grayscale": True, "image_format": "webp", "quality": 70, "crop_to_content": True}
+}
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+def expected_field_values(value):
+    """Flatten an expected fields JSON into its non-empty leaf values"""
+    if isinstance(value, dict):
+        return [leaf for item in value.values() for leaf in expected_field_values(item)]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in expected_field_values(item)]
+    if value is None or normalize(value) == "":
+        return []
+    return [normalize(value)]
+
+def render_document(pdf_path, settings):
+    """Render every page of a PDF, returning the images and the render time"""
+    pdf_document = fitz.open(pdf_path)
+    try:
+        started = time.perf_counter()
+        images = [render_page(page, settings)[0] for page in pdf_document]
+        return images, time.perf_counter() - started
+    finally:
+        pdf_document.close()
+
+def ocr_images(client, images):
+    """OCR page images in batches of 16, returning the page texts and the OCR time"""
+    from ocr_backends import detect_text_batch
+
+    started = time.perf_counter()
+    texts = []
+    for first in range(0, len(images), 16):
+        batch = images[first:first + 16]
+        for result in detect_text_batch(client, list(range(first, first + len(batch))), batch):
+            if result["error"]:
+                print(f"   ⚠️ page {result['page']}: {result['error']}")
+            texts.append(result["text"])
+    return texts, time.perf_counter() - started
+
+def run_report(fixture_dir, preset_names, run_ocr=True):
+    pdf_paths = sorted(glob.glob(os.path.join(fixture_dir, "*.pdf")))
+    if not pdf_paths:
+        print(f"❌ No PDF fixtures found in {fixture_dir}")
+        return []
+
+    if run_ocr:
+        from vision_client import get_vision_client
+        client = get_vision_client()
+    else:
+        client = None
+    rows = []
+    for pdf_path in pdf_paths:
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        fields_path = os.path.join(fixture_dir, f"{name}.fields.json")
+        expected = []
+        if os.path.exists(fields_path):
+            with open(fields_path) as f:
+                expected = expected_field_values(json.load(f))
+
+        print(f"📄 {name}")
+        reference_text = None
+        for preset_name in preset_names:
+            settings = render_settings(**RENDER_PRESETS[preset_name])
+            images, render_seconds = render_document(pdf_path, settings)
+            row = {
+                "document": name,
+                "preset": preset_name,
+                "pages": len(images),
+                "bytes": sum(len(img_data) for img_data in images),
+                "render_seconds": round(render_seconds, 3),
+                "ocr_seconds": None,
+                "similarity": None,
+                "fields_found": None,
+                "fields_expected": len(expected)
+            }
+            if run_ocr:
+                texts, ocr_seconds = ocr_images(client, images)
+                text = normalize("\n".join(texts))
+                if reference_text is None:
+                    reference_text = text
+                row["ocr_seconds"] = round(ocr_seconds, 3)
+                row["similarity"] = round(difflib.SequenceMatcher(None, reference_text, text, autojunk=False).ratio(), 4)
+                row["fields_found"] = sum(1 for value in expected if value in text)
+            rows.append(row)
+    return rows
+
+def print_summary(rows, preset_names):
+    print("\n📋 Summary per preset")
+    print(f"{'preset':<26}{'bytes':>12}{'vs base':>9}{'render s':>10}{'ocr s':>9}{'similar':>9}{'fields':>11}")
+    baseline_bytes = sum(row["bytes"] for row in rows if row["preset"] == preset_names[0]) or 1
+    for preset_name in preset_names:
+        preset_rows = [row for row in rows if row["preset"] == preset_name]
+        total_bytes = sum(row["bytes"] for row in preset_rows)
+        render_seconds = sum(row["render_seconds"] for row in preset_rows)
+        line = f"{preset_name:<26}{total_bytes:>12,}{total_bytes / baseline_bytes:>8.0%} {render_seconds:>9.2f}"
+        if preset_rows and preset_rows[0]["ocr_seconds"] is not None:
+            ocr_seconds = sum(row["ocr_seconds"] for row in preset_rows)
+            similarity = sum(row["similarity"] for row in preset_rows) / len(preset_rows)
+            found = sum(row["fields_found"] for row in preset_rows)
+            expected = sum(row["fields_expected"] for row in preset_rows)
+            line += f"{ocr_seconds:>9.2f}{similarity:>9.3f}{f'{found}/{expected}':>11}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR render settings on image bytes, latency and accuracy")
+    parser.add_argument("fixture_dir", help="Directory of PDF fixtures (with optional <name>.fields.json)")
+    parser.add_argument("--presets", default=",".join(RENDER_PRESETS), help="Comma separated presets; the first is the reference")
+    parser.add_argument("--no-ocr", action="store_true", help="Only report render size and time, without calling Vision API")
+    parser.add_argument("--json", help="Also write the per-document rows to this JSON file")
+    args = parser.parse_args()
+
+    preset_names = [name.strip() for name in args.presets.split(",") if name.strip()]
+    unknown = [name for name in preset_names if name not in RENDER_PRESETS]
+    if unknown:
+        print(f"❌ Unknown presets: {', '.join(unknown)} (available: {', '.join(RENDER_PRESETS)})")
+        sys.exit(1)
+
+    rows = run_report(args.fixture_dir, preset_names, run_ocr=not args.no_ocr)
+    if not rows:
+        sys.exit(1)
+    print_summary(rows, preset_names)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n✅ Wrote {len(rows)} rows to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+import zlib
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Result cache settings
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.db")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+def make_cache_key(pdf_sha256, product_type, prompt_version, ocr_backend="vision", llm_extractor="gemini"):
+    """
+    Build the cache key for a processed document
+    """
+    key = f"{pdf_sha256}:{product_type}:{prompt_version}"
+    # Results of Vision API and the default Gemini model keep their original keys
+    if ocr_backend != "vision":
+        key += f":{ocr_backend}"
+    if llm_extractor != "gemini":
+        key += f":{llm_extractor}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    SQLite-backed cache of processed document results with TTL expiry and
+    size-based LRU eviction
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                size INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Return the cached result for a key, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(value))
+
+    def set(self, key, result):
+        """
+        Store a result and evict least recently used entries above the size limit
+        """
+        value = zlib.compress(json.dumps(result).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used ones until under the size limit
+        self._conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        evict_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access"):
+            if total_size <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            total_size -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", evict_keys)
+
+    def stats(self):
+        """
+        Hit/miss counters and current size of the cache
+        """
+        with self._lock:
+            entries, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RESULT_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total_size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """
+    Return the process-wide result cache, creating it on first use
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -0,0 +1,146 @@
+import math
+import re
+
+# Medical sections grouped by where they usually appear in a policy schedule,
+# with the keywords the extraction prompt tells Gemini to look for
+MEDICAL_SECTION_GROUPS = {
+    "policy": {
+        "sections": [
+            "generic_information", "policy_details", "insurer_details",
+            "endorsement_schedule_details", "policy_holder_policy_details"
+        ],
+        "keywords": [
+            "policy schedule", "policy no", "policy number", "previous policy", "period of insurance",
+            "date of insurance", "endorsement schedule", "endorsement no", "endorsement date",
+            "insured name", "policy holder", "issue office", "issuing office", "gstin",
+            "invoice no", "plan", "company"
+        ]
+    },
+    "premium": {
+        "sections": [
+            "gross_premium_and_stamp_duty", "amount_details", "premium_details",
+            "gst_details", "installment_details"
+        ],
+        "keywords": [
+            "gross premium", "net premium", "total premium", "stamp duty", "premium",
+            "cgst", "sgst", "utgst", "ugst", "igst", "gst tds", "installment", "instalment",
+            "tax", "total amount"
+        ]
+    },
+    "members": {
+        "sections": [
+            "individual_member_details", "member_details", "risk_details", "nominee_details",
+            "other_insured_person_details", "premium_details_all", "insured_person_premium_details"
+        ],
+        "keywords": [
+            "member", "members covered", "dependant", "dependent", "relation", "relationship",
+            "date of birth", "dob", "age", "gender", "occupation", "nominee", "sum insured",
+            "cumulative bonus", "deductible", "abha", "self", "spouse", "risk details"
+        ]
+    },
+    "intermediaries": {
+        "sections": [
+            "agent_broker_details", "sales_channel_details", "intermediary_agent_details",
+            "intermediary_details", "tpa_details", "third_party_details", "co_insurance_details"
+        ],
+        "keywords": [
+            "agent", "broker", "intermediary", "sales channel", "tpa", "third party administrator",
+            "co-insurance", "coinsurance", "share", "health id card", "industry type",
+            "contact no", "contact number", "telephone", "email"
+        ]
+    },
+    "benefits": {
+        "sections": [
+            "schedule_of_benefits", "policy_conditions_extensions_endorsements",
+            "optional_copayment_details"
+        ],
+        "keywords": [
+            "schedule of benefits", "benefit", "conditions", "extensions", "endorsements",
+            "exclusion", "co-payment", "copayment", "co-pay", "coverage", "waiting period",
+            "sub-limit", "room rent"
+        ]
+    }
+}
+
+def _keyword_pattern(keyword):
+    # Match whole words/phrases, tolerating any whitespace between words
+    words = [re.escape(word) for word in keyword.split()]
+    return re.compile(r"\b" + r"\s+".join(words) + r"\b", re.IGNORECASE)
+
+_KEYWORD_PATTERNS = {
+    group_name: [(keyword, _keyword_pattern(keyword)) for keyword in group["keywords"]]
+    for group_name, group in MEDICAL_SECTION_GROUPS.items()
+}
+
+class SectionRouter:
+    """
+    TF-IDF index of document pages over the section keywords, used to send each
+    medical section group only the pages most likely to contain it
+    """
+
+    def __init__(self, page_texts=()):
+        self.page_count = 0
+        # keyword counts per group per page
+        self.counts = {group_name: [] for group_name in _KEYWORD_PATTERNS}
+        self._idf = None
+        for text in page_texts:
+            self.add_page(text)
+
+    def add_page(self, text):
+        """
+        Index the next page; pages can be added as they are read, in page order
+        """
+        for group_name, patterns in _KEYWORD_PATTERNS.items():
+            self.counts[group_name].append(
+                {keyword: len(pattern.findall(text or "")) for keyword, pattern in patterns}
+            )
+        self.page_count += 1
+        self._idf = None
+
+    @property
+    def idf(self):
+        # Keywords that appear on every page (headers, footers) carry little signal
+        if self._idf is None:
+            self._idf = {}
+            for group_name, page_counts in self.counts.items():
+                for keyword, _ in _KEYWORD_PATTERNS[group_name]:
+                    document_frequency = sum(1 for counts in page_counts if counts[keyword])
+                    self._idf[keyword] = math.log((self.page_count + 1) / (document_frequency + 1)) + 1
+        return self._idf
+
+    def page_scores(self, group_name):
+        """
+        Score every page for a section group (sublinear TF times IDF, summed over keywords)
+        """
+        return [
+            sum((1 + math.log(count)) * self.idf[keyword] for keyword, count in counts.items() if count)
+            for counts in self.counts[group_name]
+        ]
+
+    def top_pages(self, group_name, top_k, min_score_ratio=None):
+        """
+        The top_k highest scoring page indexes for a group, in document order,
+        plus every other page scoring at least min_score_ratio of the best one.
+        Falls back to the first pages when no keyword of the group matches.
+        """
+        scores = self.page_scores(group_name)
+        ranked = sorted(
+            (page_num for page_num in range(self.page_count) if scores[page_num] > 0),
+            key=lambda page_num: (-scores[page_num], page_num)
+        )
+        if not ranked:
+            return list(range(min(top_k, self.page_count)))
+        selected = ranked[:top_k]
+        if min_score_ratio is not None:
+            cutoff = scores[ranked[0]] * min_score_ratio
+            selected += [page_num for page_num in ranked[top_k:] if scores[page_num] >= cutoff]
+        return sorted(selected)
+
+    def route(self, top_k, min_score_ratio=None):
+        """
+        Map every section group to the page indexes it should be extracted from
+        """
+        return {
+            group_name: self.top_pages(group_name, top_k, min_score_ratio)
+            for group_name in MEDICAL_SECTION_GROUPS
+        }
@@ -31,6 +31,8 @@ if page == "API Overview":
     
     **Available Endpoints:**
     - `POST /submit-policy/` - Submit a new insurance policy
+    - `GET /policies` - List policies a page at a time, with filters
+    - `POST /policies/bulk` - Import policies from NDJSON, CSV or a JSON array
     - `GET /docs` - Interactive API documentation (Swagger UI)
     - `GET /redoc` - Alternative API documentation
     
@@ -177,30 +179,55 @@ elif page == "Submit Policy":
 elif page == "View Database":
     st.header("🗄️ Database Contents")
     
+    # Filters and the page to show; pages are read one at a time from GET /policies
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        insurer_filter = st.text_input("Insurer")
+    with col2:
+        vehicle_type_filter = st.text_input("Vehicle Type")
+    with col3:
+        email_filter = st.text_input("Email")
+    page_size = st.selectbox("Policies per page", [25, 50, 100, 250], index=1)
+    
+    params = {"limit": page_size}
+    for name, value in (("insurer", insurer_filter), ("vehicle_type", vehicle_type_filter), ("email", email_filter)):
+        if value:
+            params[name] = value
+    
+    # Cursors of the pages shown so far; reset when the filters change
+    if st.session_state.get("policy_params") != params:
+        st.session_state.policy_params = params
+        st.session_state.policy_cursors = [None]
+    cursors = st.session_state.policy_cursors
+    
     try:
-        import sqlite3
         import pandas as pd
         
-        conn = sqlite3.connect("insurance.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM policies")
-        rows = cursor.fetchall()
-        conn.close()
+        if cursors[-1] is not None:
+            params = dict(params, cursor=cursors[-1])
+        response = requests.get("http://localhost:8000/policies", params=params)
+        response.raise_for_status()
+        listing = response.json()
         
-        if rows:
-            columns = [
-                "ID", "Name", "Email", "Insurer", "Policy Number", 
-                "Policy Start Date", "Policy End Date", "Date of Policy",
-                "Expiry Date", "Vehicle Type", "Submitted At"
-            ]
-            df = pd.DataFrame(rows, columns=columns)
+        if listing["policies"]:
+            df = pd.DataFrame(listing["policies"])
             st.dataframe(df, use_container_width=True)
+            st.caption(f"Page {len(cursors)}")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if len(cursors) > 1 and st.button("⬅️ Previous page"):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                if listing["next_cursor"] is not None and st.button("Next page ➡️"):
+                    cursors.append(listing["next_cursor"])
+                    st.rerun()
             
             # Download option
             csv = df.to_csv(index=False).encode('utf-8')
             st.download_button(
-                "📥 Download as CSV", 
+                "📥 Download page as CSV", 
                 data=csv, 
                 file_name="policies.csv", 
                 mime="text/csv"
@@ -208,6 +235,8 @@ elif page == "View Database":
         else:
             st.info("No policies in database yet.")
             
+    except requests.exceptions.ConnectionError:
+        st.error("❌ Cannot connect to API server. Make sure the FastAPI server is running on localhost:8000")
     except Exception as e:
         st.error(f"❌ Database error: {e}")
 
@@ -0,0 +1,49 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+import pytest
+import batch_processor
+
+class Upload:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.file = io.BytesIO(data)
+
+def zip_upload(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return Upload("batch.zip", buffer.getvalue())
+
+@pytest.fixture
+def spool_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+def test_manifest_picks_product_types_and_members_load_lazily(spool_root):
+    upload = zip_upload({
+        "manifest.json": json.dumps({"car.pdf": "CAR"}),
+        "car.pdf": b"%PDF car",
+        "docs/bike.pdf": b"%PDF bike"
+    })
+    documents, spool_dir = asyncio.run(batch_processor.collect_batch_documents([upload], ["BIKE"]))
+    try:
+        assert [(document["filename"], document["product_type"]) for document in documents] == [
+            ("batch.zip/car.pdf", "CAR"), ("batch.zip/docs/bike.pdf", "BIKE")
+        ]
+        with open(documents[1]["load"](), "rb") as f:
+            assert f.read() == b"%PDF bike"
+    finally:
+        batch_processor.cleanup_batch(spool_dir)
+    assert os.listdir(spool_root) == []
+
+@pytest.mark.parametrize("manifest", [b"{not json", b'["car.pdf", "CAR"]', b'"CAR"'])
+def test_invalid_manifest_is_a_value_error_and_leaves_no_spool_dir(spool_root, manifest):
+    upload = zip_upload({"manifest.json": manifest, "car.pdf": b"%PDF car"})
+    with pytest.raises(ValueError, match="manifest.json in batch.zip"):
+        asyncio.run(batch_processor.collect_batch_documents([upload], ["CAR"]))
+    assert os.listdir(spool_root) == []
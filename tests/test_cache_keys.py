@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+import llm_extractors
+import vision_gemini_processor as processor
+from result_cache import make_cache_key
+
+PDF_SHA256 = "ab" * 32
+
+class RecordingCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+class PageTexts:
+    def get_document_pages(self, pdf_sha256):
+        return ["Policy Number: 3001/123", "Insured: Asha Rao"]
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    cache = RecordingCache()
+    monkeypatch.setattr(processor, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(processor, "get_result_cache", lambda: cache)
+    return cache
+
+def test_default_key_is_unchanged(monkeypatch):
+    monkeypatch.setattr(processor, "OCR_BACKEND", "vision")
+    monkeypatch.setattr(processor, "OCR_ROUTING", "off")
+    monkeypatch.setattr(llm_extractors, "LLM_EXTRACTOR", "gemini")
+    assert processor.result_cache_key(PDF_SHA256, "BIKE") == make_cache_key(PDF_SHA256, "BIKE", processor.PROMPT_VERSION)
+
+def test_key_depends_on_backend_routing_and_extractor(monkeypatch):
+    monkeypatch.setattr(processor, "OCR_BACKEND", "vision")
+    monkeypatch.setattr(processor, "OCR_ROUTING", "off")
+    monkeypatch.setattr(llm_extractors, "LLM_EXTRACTOR", "gemini")
+    keys = {
+        processor.result_cache_key(PDF_SHA256, "BIKE"),
+        processor.result_cache_key(PDF_SHA256, "CAR"),
+        processor.result_cache_key(PDF_SHA256, "BIKE", "tesseract")
+    }
+    monkeypatch.setattr(processor, "OCR_ROUTING", "local_digital")
+    keys.add(processor.result_cache_key(PDF_SHA256, "BIKE"))
+    # An explicit backend reads every page, whatever the routing policy
+    assert processor.result_cache_key(PDF_SHA256, "BIKE", "tesseract") in keys
+    monkeypatch.setattr(llm_extractors, "LLM_EXTRACTOR", "openai:gpt-4o-mini")
+    keys.add(processor.result_cache_key(PDF_SHA256, "BIKE"))
+    assert len(keys) == 5
+
+@pytest.mark.parametrize("backend, routing", [("vision", "off"), ("tesseract", "off"), ("vision", "local_digital")])
+def test_reclassified_result_is_read_by_process_pdf_file(monkeypatch, result_cache, backend, routing):
+    monkeypatch.setattr(processor, "OCR_BACKEND", backend)
+    monkeypatch.setattr(processor, "OCR_ROUTING", routing)
+    monkeypatch.setattr(processor, "get_ocr_cache", lambda: PageTexts())
+
+    async def classify_document_text(full_text, insurance_type, vehicle_type, page_texts):
+        return {"policy_number": "3001/123"}
+
+    async def extract_text_from_pdf_path(*args, **kwargs):
+        raise AssertionError("the reclassified result should have been read from the cache")
+
+    monkeypatch.setattr(processor, "classify_document_text", classify_document_text)
+    monkeypatch.setattr(processor, "extract_text_from_pdf_path", extract_text_from_pdf_path)
+    monkeypatch.setattr(processor, "is_processed_result", lambda result: True)
+
+    async def scenario():
+        await processor.reclassify_from_ocr_cache(PDF_SHA256, "BIKE")
+        return await processor.process_pdf_file("unused.pdf", "BIKE", pdf_sha256=PDF_SHA256)
+
+    result = asyncio.run(scenario())
+    assert result["policy_number"] == "3001/123"
+    assert result["processing_metadata"]["result_cache"] == "hit"
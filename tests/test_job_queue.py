@@ -0,0 +1,40 @@
+import asyncio
+import io
+import threading
+from job_queue import JobQueue
+
+def test_job_runs_and_records_progress_off_the_event_loop(tmp_path):
+    loop_threads = set()
+    write_threads = set()
+
+    async def process(pdf_path, product_type, force_refresh, progress_callback):
+        for page in range(1, 4):
+            progress_callback(page, 3)
+            await asyncio.sleep(0)
+        return {"Coverton imp_keys": {"policy_number": "3001/123"}}
+
+    async def scenario():
+        loop_threads.add(threading.get_ident())
+        queue = JobQueue(process, db_path=str(tmp_path / "jobs.db"), spool_dir=str(tmp_path / "spool"), workers=1)
+        execute = queue._execute
+
+        def recording_execute(sql, params=()):
+            write_threads.add(threading.get_ident())
+            return execute(sql, params)
+
+        queue._execute = recording_execute
+        await queue.start()
+        job_id = await queue.submit(io.BytesIO(b"%PDF-1.4"), "policy.pdf", "BIKE")
+        await asyncio.wait_for(queue._queue.join(), 5)
+        await queue.stop()
+        return queue, job_id
+
+    queue, job_id = asyncio.run(scenario())
+    assert write_threads and not write_threads & loop_threads
+
+    reopened = JobQueue(None, db_path=str(tmp_path / "jobs.db"), spool_dir=str(tmp_path / "spool"))
+    job = reopened.get(job_id)
+    assert job["status"] == "completed"
+    assert (job["pages_done"], job["pages_total"]) == (3, 3)
+    assert job["result"]["Coverton imp_keys"]["policy_number"] == "3001/123"
+    assert not (tmp_path / "spool" / f"{job_id}.pdf").exists()
@@ -0,0 +1,69 @@
+import fitz
+from layout_templates import LayoutIndex, read_pdf_layout
+
+def policy_layout(number, insurer="ACME General Insurance Company Limited", top=130):
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 50), insurer, fontsize=14)
+    page.insert_text((72, 70), "Private Car Package Policy - Schedule", fontsize=11)
+    page.insert_text((72, top), f"Policy No: 3001/{12345600 + number}/00/000", fontsize=10)
+    page.insert_text((72, top + 20), "Insured Name", fontsize=10)
+    page.insert_text((250, top + 20), f"Customer{number} Rao", fontsize=10)
+    page.insert_text((72, top + 40), f"Period of Insurance: From {number + 1:02d}/03/2024 to {number:02d}/03/2025", fontsize=10)
+    page.insert_text((72, top + 270), "Total Premium", fontsize=10)
+    page.insert_text((400, top + 270), f"{11000 + number}.00", fontsize=10)
+    return read_pdf_layout(document)
+
+def extracted_fields(number):
+    # The fields the LLM extracted from policy_layout(number)
+    return {
+        "policyno": f"3001/{12345600 + number}/00/000", "firstName": f"Customer{number}",
+        "grossPremium": f"{11000 + number}", "commenceMentDate": f"{number + 1:02d}-03-2024", "state": "Tamil Nadu"
+    }
+
+def test_templates_are_learned_and_read_from_new_documents(tmp_path):
+    index = LayoutIndex(str(tmp_path / "layouts.db"))
+    first = index.lookup(policy_layout(0))
+    assert first["layout_id"] is None and first["fields"] == {}
+    layout_id = index.learn(first, extracted_fields(0))
+    for number in range(1, 9):
+        match = index.lookup(policy_layout(number))
+        assert match["layout_id"] == layout_id
+        index.learn(match, extracted_fields(number))
+
+    match = index.lookup(policy_layout(20))
+    assert match["insurer"] == "ACME General Insurance Company Limited"
+    assert {field: read["value"] for field, read in match["fields"].items()} == {
+        "policyno": "3001/12345620/00/000", "firstName": "Customer20",
+        "grossPremium": "11020.00", "commenceMentDate": "21-03-2024"
+    }
+    # Nine documents agreed with each template
+    assert all(read["confidence"] == 0.9 for read in match["fields"].values())
+
+    # The index is kept on disk
+    reopened = LayoutIndex(str(tmp_path / "layouts.db"))
+    assert reopened.lookup(policy_layout(21))["fields"]["policyno"]["value"] == "3001/12345621/00/000"
+    assert reopened.layouts[layout_id]["documents"] == 9
+
+def test_another_layout_is_not_matched(tmp_path):
+    index = LayoutIndex(str(tmp_path / "layouts.db"))
+    index.learn(index.lookup(policy_layout(0)), extracted_fields(0))
+
+    other = index.lookup(policy_layout(1, insurer="Zenith Motor Insurance Co Ltd", top=330))
+    assert other["layout_id"] is None and other["fields"] == {}
+    assert index.learn(other, extracted_fields(1)) != index.learn(index.lookup(policy_layout(2)), extracted_fields(2))
+
+def test_a_template_that_keeps_disagreeing_is_learned_again(tmp_path):
+    index = LayoutIndex(str(tmp_path / "layouts.db"))
+    layout_id = index.learn(index.lookup(policy_layout(0)), extracted_fields(0))
+    # The LLM reads another name than the template does
+    index.learn(index.lookup(policy_layout(1)), dict(extracted_fields(1), firstName="Rao"))
+    template = index.layouts[layout_id]["templates"]["firstName"]
+    assert (template["confirmations"], template["conflicts"]) == (1, 1)
+    assert index.lookup(policy_layout(2))["fields"]["firstName"]["confidence"] == 0.333
+
+    # Wrong more often than right: the rule is learned again from the document
+    index.learn(index.lookup(policy_layout(2)), dict(extracted_fields(2), firstName="Rao"))
+    template = index.layouts[layout_id]["templates"]["firstName"]
+    assert (template["confirmations"], template["conflicts"]) == (1, 0)
+    assert index.layouts[layout_id]["templates"]["policyno"]["confirmations"] == 3
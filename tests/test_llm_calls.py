@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import vision_gemini_processor as processor
+from google.api_core import exceptions as google_exceptions
+
+class ScriptedExtractor:
+    """
+    LLM extractor that raises or hangs as scripted, one outcome per call, then answers
+    """
+
+    name = "scripted"
+
+    def __init__(self, outcomes=(), delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            outcome = self.outcomes.pop(0) if self.outcomes else None
+            if outcome == "hang":
+                await asyncio.sleep(60)
+            if isinstance(outcome, Exception):
+                raise outcome
+            await asyncio.sleep(self.delay)
+            return f"answer to {prompt}"
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    # The upper bound of every backoff sleep, with the sleeps themselves skipped
+    bounds = []
+    monkeypatch.setattr(processor, "GEMINI_MAX_RETRIES", 3)
+    monkeypatch.setattr(processor, "GEMINI_RETRY_BASE_DELAY", 0.5)
+    monkeypatch.setattr(processor.random, "uniform", lambda low, high: bounds.append(high) or 0)
+    return bounds
+
+def test_rate_limits_and_server_errors_are_retried_with_backoff(backoffs):
+    extractor = ScriptedExtractor([
+        google_exceptions.TooManyRequests("quota"), google_exceptions.ServiceUnavailable("busy")
+    ])
+    assert asyncio.run(processor.generate_llm_text("prompt", extractor)) == "answer to prompt"
+    assert extractor.calls == 3
+    assert backoffs == [0.5, 1.0]
+
+def test_other_errors_are_not_retried(backoffs):
+    extractor = ScriptedExtractor([google_exceptions.InvalidArgument("bad prompt")])
+    with pytest.raises(google_exceptions.InvalidArgument):
+        asyncio.run(processor.generate_llm_text("prompt", extractor))
+    assert extractor.calls == 1
+    assert backoffs == []
+
+def test_the_last_retryable_error_is_raised(backoffs):
+    extractor = ScriptedExtractor([google_exceptions.InternalServerError("boom")] * 4)
+    with pytest.raises(google_exceptions.InternalServerError):
+        asyncio.run(processor.generate_llm_text("prompt", extractor))
+    assert extractor.calls == 4
+    assert backoffs == [0.5, 1.0, 2.0]
+
+def test_calls_that_hang_time_out_and_are_retried(backoffs, monkeypatch):
+    monkeypatch.setattr(processor, "GEMINI_TIMEOUT_SECONDS", 0.05)
+    extractor = ScriptedExtractor(["hang"])
+    assert asyncio.run(processor.generate_llm_text("prompt", extractor)) == "answer to prompt"
+    assert extractor.calls == 2
+
+    extractor = ScriptedExtractor(["hang"] * 4)
+    with pytest.raises(Exception, match="scripted request timed out after 0.05s"):
+        asyncio.run(processor.generate_llm_text("prompt", extractor))
+    assert extractor.calls == 4
+
+def test_calls_share_the_concurrency_limit(monkeypatch):
+    extractor = ScriptedExtractor(delay=0.01)
+
+    async def run():
+        monkeypatch.setattr(processor, "gemini_semaphore", asyncio.Semaphore(2))
+        return await asyncio.gather(*(processor.generate_llm_text(f"prompt {number}", extractor) for number in range(8)))
+
+    assert asyncio.run(run()) == [f"answer to prompt {number}" for number in range(8)]
+    assert extractor.max_in_flight == 2
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import threading
+import pytest
+import llm_extractors
+from http.server import ThreadingHTTPServer
+from llm_extractors import LlmRetryableError, OpenAICompatibleExtractor, ReplayExtractor, get_llm_extractor
+from llm_stub_server import CANNED_RESPONSE, make_handler
+
+@pytest.fixture
+def stub_url(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(0, str(tmp_path / "stub_fixtures")))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+def test_openai_compatible_endpoint_answers_the_prompt(stub_url):
+    extractor = OpenAICompatibleExtractor("stub-model", base_url=stub_url + "/", api_key="secret")
+    assert extractor.name == "openai:stub-model"
+    assert extractor.url == stub_url + "/chat/completions"
+    assert extractor._session.headers["Authorization"] == "Bearer secret"
+    assert asyncio.run(extractor.generate("Extract the policy fields")) == CANNED_RESPONSE
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = "error body"
+
+    def raise_for_status(self):
+        raise RuntimeError(f"HTTP {self.status_code}")
+
+@pytest.mark.parametrize("status_code, error", [
+    (429, LlmRetryableError), (503, LlmRetryableError), (400, RuntimeError)
+])
+def test_only_rate_limits_and_server_errors_are_retryable(status_code, error):
+    extractor = OpenAICompatibleExtractor("stub-model", base_url="http://127.0.0.1:9/v1")
+    extractor._session.post = lambda url, json, timeout: FakeResponse(status_code)
+    with pytest.raises(error):
+        asyncio.run(extractor.generate("prompt"))
+
+def test_replay_records_once_and_replays_offline(tmp_path, stub_url, monkeypatch):
+    live = OpenAICompatibleExtractor("stub-model", base_url=stub_url)
+    monkeypatch.setitem(llm_extractors._llm_extractors, "openai:stub-model", live)
+    recorder = ReplayExtractor(str(tmp_path / "fixtures"), record_from="openai:stub-model")
+    assert asyncio.run(recorder.generate("prompt one")) == CANNED_RESPONSE
+
+    [recording] = list((tmp_path / "fixtures").iterdir())
+    assert json.loads(recording.read_text()) == {"response": CANNED_RESPONSE, "recorded_from": "openai:stub-model"}
+
+    # Without a recorder, recorded prompts replay and others fail
+    replay = ReplayExtractor(str(tmp_path / "fixtures"))
+    live._session.post = None
+    assert asyncio.run(replay.generate("prompt one")) == CANNED_RESPONSE
+    with pytest.raises(Exception, match="Replay Error: no recorded response"):
+        asyncio.run(replay.generate("prompt two"))
+
+def test_extractors_are_shared_per_spec(monkeypatch):
+    monkeypatch.setattr(llm_extractors, "_llm_extractors", {})
+    first = get_llm_extractor("openai:model-a")
+    assert get_llm_extractor("openai:model-a") is first
+    assert get_llm_extractor("openai:model-b").model_name == "model-b"
+    with pytest.raises(ValueError, match="Unknown LLM extractor: claude"):
+        get_llm_extractor("claude")
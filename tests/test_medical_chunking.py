@@ -0,0 +1,61 @@
+import json
+import vision_gemini_processor as processor
+from models import IndividualMemberDetails
+from medical_chunking import TextChunker, merge_medical_partials, merge_members, split_text_into_chunks
+
+def member(name, **fields):
+    return {"name": name, **fields}
+
+def test_pages_are_kept_whole_in_chunks():
+    pages = ["a" * 40, "b" * 40, "", "c" * 40, "d" * 10]
+    assert split_text_into_chunks(pages, 90) == ["a" * 40 + "\n" + "b" * 40, "c" * 40 + "\n" + "d" * 10]
+
+def test_a_page_larger_than_a_chunk_is_split_on_lines():
+    page = "\n".join(f"line {number:02d} " + "x" * 20 for number in range(10))
+    chunks = split_text_into_chunks([page], 70)
+    assert all(len(chunk) <= 70 for chunk in chunks)
+    assert "\n".join(chunks) == page
+    # A single line longer than a chunk is cut hard
+    assert split_text_into_chunks(["y" * 25], 10) == ["y" * 10, "y" * 10, "y" * 5]
+
+def test_the_chunker_hands_out_chunks_as_pages_arrive():
+    chunker = TextChunker(50)
+    assert chunker.add_page("a" * 30) == []
+    assert chunker.add_page("b" * 30) == ["a" * 30]
+    assert chunker.add_page("c" * 10) == []
+    assert chunker.finish() == ["b" * 30 + "\n" + "c" * 10]
+    assert chunker.chunk_count == 2
+
+def test_the_earliest_chunk_wins_and_later_chunks_fill_gaps():
+    merged = merge_medical_partials([
+        {"policy_details": {"policy_number": "HL/001", "insurer": ""}, "remarks": ""},
+        {"policy_details": {"policy_number": "HL/999", "insurer": "Star Health"}, "remarks": "renewal"},
+        {"policy_details": {"insurer": "Other", "plan": "Family Floater"}, "remarks": "ignored"},
+    ])
+    assert merged["policy_details"] == {"policy_number": "HL/001", "insurer": "Star Health", "plan": "Family Floater"}
+    assert merged["remarks"] == "renewal"
+
+def test_members_are_merged_by_name_in_document_order():
+    members = merge_members([
+        {"individual_member_details": {"member_1": member("Asha Rao", dob_and_age="44"), "member_2": member("", dob_and_age="")}},
+        {"individual_member_details": member("ASHA  rao", dob_and_age="45", gender="F")},
+        {"individual_member_details": {"member_1": member("Ravi Rao", dob_and_age="47"), "member_2": member("Anu Rao"), "member_3": member("Dev Rao")}},
+    ])
+    assert [members[slot]["name"] for slot in ("member_1", "member_2", "member_3")] == ["Asha Rao", "Ravi Rao", "Anu Rao"]
+    assert (members["member_1"]["dob_and_age"], members["member_1"]["gender"]) == ("44", "F")
+    # Every slot has every member field, even when no chunk gave it
+    assert set(members["member_3"]) == set(IndividualMemberDetails.model_fields)
+
+def test_failed_chunks_are_skipped_unless_every_chunk_failed():
+    partials = [
+        {"policy_details": {"policy_number": "HL/001"}},
+        json.JSONDecodeError("Expecting value", "", 0),
+        {"policy_details": {"insurer": "Star Health"}},
+    ]
+    result = processor.merge_medical_chunk_results(partials)
+    assert result["medical_insurance"]["policy_details"]["policy_number"] == "HL/001"
+    assert result["medical_insurance"]["policy_details"]["insurer"] == "Star Health"
+    assert (result["processing_metadata"]["medical_chunks"], result["processing_metadata"]["medical_failed_chunks"]) == (3, 1)
+
+    assert processor.merge_medical_chunk_results([partials[1]]).startswith("⚠️ JSON parsing error")
+    assert processor.merge_medical_chunk_results([RuntimeError("quota")]) == "⚠️ Gemini AI error: quota"
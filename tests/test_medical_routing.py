@@ -0,0 +1,41 @@
+import asyncio
+import json
+import vision_gemini_processor as processor
+from section_router import SectionRouter
+
+POLICY_PAGE = "Policy Schedule\nPolicy Number: 2024/HL/001\nPeriod of Insurance: 01-04-2024 to 31-03-2025"
+FILLER_PAGE = "Terms and definitions of the policy wording apply to every claim."
+
+def member_page(number):
+    return f"Members covered\nMember {number}: Member name {number}, Relationship: Self, Date of Birth: 01-01-1980, Age 44, Gender M, Sum Insured 500000"
+
+def test_every_member_page_scoring_near_the_best_is_routed():
+    pages = [POLICY_PAGE] + [member_page(number) for number in range(1, 7)] + [FILLER_PAGE] * 5
+    router = SectionRouter(pages)
+    assert router.top_pages("members", 3) == [1, 2, 3]
+    assert router.top_pages("members", 3, 0.5) == [1, 2, 3, 4, 5, 6]
+    # A group with no keyword on any page gets the first pages
+    assert SectionRouter([FILLER_PAGE] * 5).top_pages("premium", 3, 0.5) == [0, 1, 2]
+
+def test_long_routed_group_is_extracted_in_chunks(monkeypatch):
+    prompts = []
+
+    async def generate_llm_text(prompt, extractor=None):
+        prompts.append(prompt)
+        return json.dumps({"medical_insurance": {}})
+
+    monkeypatch.setattr(processor, "generate_llm_text", generate_llm_text)
+    monkeypatch.setattr(processor, "MEDICAL_CHUNKED_EXTRACTION", "auto")
+    monkeypatch.setattr(processor, "MEDICAL_CHUNK_THRESHOLD_CHARS", 2000)
+    monkeypatch.setattr(processor, "MEDICAL_CHUNK_MAX_CHARS", 1000)
+    # Member tables long enough that the routed member pages exceed the threshold
+    pages = [POLICY_PAGE] + [member_page(number) * 4 for number in range(1, 9)] + [FILLER_PAGE] * 3
+
+    result = asyncio.run(processor.classify_medical_fields_routed(pages))
+    metadata = result["processing_metadata"]
+    assert metadata["medical_extraction"] == "routed"
+    assert metadata["section_routes"]["members"] == list(range(2, 10))
+    assert metadata["section_chunks"]["members"] > 1
+    assert "policy" not in metadata["section_chunks"]
+    assert any("part 2 of a longer document" in prompt for prompt in prompts)
+    assert len(prompts) == len(processor.MEDICAL_SECTION_GROUPS) - 1 + metadata["section_chunks"]["members"]
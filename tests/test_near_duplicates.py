@@ -0,0 +1,90 @@
+import io
+import fitz
+import pytest
+from PIL import Image
+import near_duplicates
+import vision_gemini_processor as processor
+from near_duplicates import NearDuplicateIndex
+from ocr_backends import OcrBackend
+from ocr_cache import OcrTextCache
+from page_renderer import render_page, render_settings
+
+def schedule_pdf_page(policy_number, fontsize):
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 100), "MOTOR INSURANCE POLICY SCHEDULE", fontsize=14)
+    for line in range(30):
+        page.insert_text((72, 140 + line * 18), f"Line {line} of the general wording of the schedule page", fontsize=fontsize)
+    page.insert_text((72, 700), f"Policy No: 3001/{policy_number}/00/000", fontsize=fontsize)
+    return page
+
+def rendered_page(policy_number, fontsize=8):
+    img_data, render_info = render_page(schedule_pdf_page(policy_number, fontsize), render_settings(fingerprint=True))
+    return img_data, (render_info["dhash"], render_info["thumbnail"])
+
+def reencoded_fingerprint(img_data, quality):
+    # A copy of the page saved again as a JPEG
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(img_data)).convert("RGB").save(buffer, format="JPEG", quality=quality)
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    render_info = render_page(page, render_settings(fingerprint=True))[1]
+    return render_info["dhash"], render_info["thumbnail"]
+
+def test_near_duplicate_detection_is_off_by_default():
+    assert near_duplicates.NEAR_DUPLICATE_ENABLED is False
+
+@pytest.mark.parametrize("fontsize", [6, 8, 10])
+def test_a_changed_digit_is_not_a_near_duplicate(tmp_path, fontsize):
+    index = NearDuplicateIndex(str(tmp_path / "index.db"))
+    index.add_many("vision", {"first": rendered_page("12345678", fontsize)[1]})
+
+    dhash, thumbnail = rendered_page("12345679", fontsize)[1]
+    assert index.find("vision", dhash, thumbnail) is None
+    assert index.stats()["rejected"] == 1
+
+def test_a_resaved_copy_is_a_near_duplicate(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.db"))
+    img_data, fingerprint = rendered_page("12345678")
+    index.add_many("vision", {"first": reencoded_fingerprint(img_data, 90)})
+
+    match = index.find("vision", *reencoded_fingerprint(img_data, 60))
+    assert match is not None and match["page_key"] == "first"
+    assert index.find("tesseract", *fingerprint) is None
+
+def test_pages_indexed_with_old_thumbnails_are_dropped(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = NearDuplicateIndex(path)
+    index._conn.execute("INSERT INTO pages VALUES ('old', 'vision', '0000000000000000', ?, 0)", (bytes(96 * 128),))
+    index._conn.execute("PRAGMA user_version = 0")
+    index._conn.commit()
+    assert NearDuplicateIndex(path).stats()["pages"] == 0
+
+class CountingOcrBackend(OcrBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.pages_read = []
+
+    def ocr_images(self, page_nums, images):
+        self.pages_read.extend(page_nums)
+        return [{"page": page_num + 1, "text": f"text of page {page_num + 1}", "error": None} for page_num in page_nums]
+
+def test_a_page_with_a_changed_digit_is_read_again(tmp_path, monkeypatch):
+    ocr_cache = OcrTextCache(str(tmp_path / "ocr"))
+    index = NearDuplicateIndex(str(tmp_path / "index.db"))
+    monkeypatch.setattr(processor, "OCR_CACHE_ENABLED", True)
+    monkeypatch.setattr(processor, "NEAR_DUPLICATE_ENABLED", True)
+    monkeypatch.setattr(processor, "get_ocr_cache", lambda: ocr_cache)
+    monkeypatch.setattr(processor, "get_near_duplicate_index", lambda: index)
+    backend = CountingOcrBackend()
+
+    first_image, first_fingerprint = rendered_page("12345678")
+    processor.ocr_rendered_batch(backend, [0], [first_image], [first_fingerprint])
+    changed_image, changed_fingerprint = rendered_page("12345679")
+    [result] = processor.ocr_rendered_batch(backend, [1], [changed_image], [changed_fingerprint])
+
+    assert backend.pages_read == [0, 1]
+    assert result["ocr_cache"] == "miss"
+    assert result["text"] == "text of page 2"
@@ -0,0 +1,36 @@
+import multiprocessing
+import sqlite3
+from ocr_cache import OcrTextCache
+
+def page_text(worker, number):
+    return f"worker {worker} page {number} " + "policy schedule text " * (number % 7 + 1)
+
+def append_pages(directory, worker, pages, batch):
+    cache = OcrTextCache(directory)
+    for start in range(0, pages, batch):
+        cache.put_many({f"{worker}:{number}": page_text(worker, number) for number in range(start, start + batch)})
+
+def test_processes_appending_at_once_keep_their_offsets(tmp_path):
+    workers, pages, batch = 4, 200, 5
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=append_pages, args=(str(tmp_path), worker, pages, batch))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    texts = OcrTextCache(str(tmp_path)).get_many([f"{worker}:{number}" for worker in range(workers) for number in range(pages)])
+    assert len(texts) == workers * pages
+    assert all(texts[f"{worker}:{number}"] == page_text(worker, number) for worker in range(workers) for number in range(pages))
+
+def test_lookups_larger_than_the_parameter_limit(tmp_path):
+    cache = OcrTextCache(str(tmp_path))
+    variable_limit = cache._conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    page_texts = {f"page:{number}": f"text {number}" for number in range(variable_limit + 1)}
+    cache.put_many(page_texts)
+    cache.put_many(page_texts)
+    assert cache.get_many(list(page_texts) + ["missing"]) == page_texts
@@ -0,0 +1,44 @@
+import io
+import fitz
+import pytest
+from PIL import Image
+from page_renderer import adaptive_zoom, content_bbox, render_page, render_settings
+
+def text_page(width=595, height=842):
+    page = fitz.open().new_page(width=width, height=height)
+    page.insert_text((100, 200), "Policy No: 3001/12345678/00/000", fontsize=12)
+    page.insert_text((100, 300), "Total Premium 11,800.00", fontsize=12)
+    return page
+
+def test_zoom_keeps_every_page_size_near_the_pixel_budget():
+    settings = render_settings(target_pixels=2000000, min_zoom=1.0, max_zoom=4.0)
+    for width, height in ((595, 842), (842, 1191), (298, 421)):
+        zoom = adaptive_zoom(fitz.Rect(0, 0, width, height), settings)
+        assert width * height * zoom * zoom == pytest.approx(2000000, rel=0.01)
+    # Tiny and huge pages stay within the zoom bounds
+    assert adaptive_zoom(fitz.Rect(0, 0, 100, 100), settings) == 4.0
+    assert adaptive_zoom(fitz.Rect(0, 0, 3000, 3000), settings) == 1.0
+
+@pytest.mark.parametrize("image_format, pil_format", [("png", "PNG"), ("jpeg", "JPEG"), ("webp", "WEBP")])
+def test_pages_are_encoded_in_the_configured_format(image_format, pil_format):
+    img_data, render_info = render_page(text_page(), render_settings(image_format=image_format, grayscale=True))
+    image = Image.open(io.BytesIO(img_data))
+    assert image.format == pil_format
+    assert image.size == (render_info["width"], render_info["height"])
+    assert render_info["bytes"] == len(img_data)
+    assert render_info["image_format"] == image_format
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError, match="Unsupported image format"):
+        render_settings(image_format="tiff")
+
+def test_cropping_renders_only_the_content_at_a_higher_zoom():
+    page = text_page()
+    box = content_bbox(page)
+    assert box.x0 < 100 < box.x1 and box.y0 < 190 and 300 < box.y1 < 330
+    full = render_page(page, render_settings())[1]
+    cropped = render_page(page, render_settings(crop_to_content=True))[1]
+    assert cropped["cropped"] and not full["cropped"]
+    assert cropped["zoom"] > full["zoom"]
+    # A blank page is rendered whole
+    assert content_bbox(fitz.open().new_page()) == fitz.Rect(0, 0, 595, 842)
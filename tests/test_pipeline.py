@@ -0,0 +1,37 @@
+import asyncio
+import fitz
+import vision_gemini_processor as processor
+from ocr_backends import OcrBackend
+
+class FailingOcrBackend(OcrBackend):
+    name = "failing"
+    cacheable = False
+
+    def ocr_images(self, page_nums, images):
+        raise RuntimeError("OCR credentials missing")
+
+async def no_layout_match(pdf_document, insurance_type):
+    return None
+
+def scanned_pdf(path, page_count):
+    document = fitz.open()
+    for page_num in range(page_count):
+        document.new_page().insert_text((72, 72), f"Policy schedule page {page_num + 1}")
+    document.save(path)
+
+def test_backend_failure_leaves_no_pending_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr(processor, "TEXT_LAYER_FAST_PATH", False)
+    monkeypatch.setattr(processor, "get_render_pool", lambda: None)
+    monkeypatch.setattr(processor, "get_ocr_backend", lambda name=None: FailingOcrBackend())
+    monkeypatch.setattr(processor, "match_document_layout", no_layout_match)
+    monkeypatch.setattr(processor, "extractor_for", lambda insurance_type, vehicle_type=None: None)
+    pdf_path = str(tmp_path / "policy.pdf")
+    scanned_pdf(pdf_path, 12)
+
+    async def run():
+        result = await processor.extract_text_from_pdf_path(pdf_path, "medical")
+        return result, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    result, pending = asyncio.run(run())
+    assert result == "⚠️ Error processing PDF: OCR credentials missing"
+    assert pending == []
@@ -0,0 +1,83 @@
+import io
+import json
+import pytest
+import policy_import
+from database import PolicyStore
+from policy_import import detect_import_format, import_policies
+
+def policy(number, **overrides):
+    return dict({
+        "name": f"Customer {number}", "email": f"customer{number}@example.com", "insurer": "ACKO",
+        "policy_number": f"3001/{number:08d}", "policy_start_date": "01-04-2025", "policy_end_date": "31-03-2026",
+        "date_of_policy": "28-03-2025", "expiry_date": "31-03-2026", "vehicle_type": "bike"
+    }, **overrides)
+
+@pytest.fixture
+def store(tmp_path):
+    store = PolicyStore(str(tmp_path / "policies.db"), pool_size=2)
+    yield store
+    store.close()
+
+def run_import(store, text, import_format, **kwargs):
+    return import_policies(io.BytesIO(text.encode("utf-8")), import_format, store, **kwargs)
+
+def stored_numbers(store):
+    with store.connection() as conn:
+        return [row[0] for row in conn.execute("SELECT policy_number FROM policies ORDER BY id")]
+
+def test_detect_import_format():
+    assert detect_import_format("policies.JSONL") == "ndjson"
+    assert detect_import_format("policies.csv", "application/json") == "csv"
+    assert detect_import_format("upload", "application/json; charset=utf-8") == "json"
+    assert detect_import_format("policies.txt", "text/plain") is None
+
+def test_ndjson_reports_bad_rows_and_keeps_the_others(store):
+    lines = [json.dumps(policy(1)), "", "{not json", json.dumps([1, 2]), json.dumps(policy(2, expiry_date="someday")),
+             json.dumps(policy(3, email=None)), json.dumps(policy(1)), json.dumps(policy(4))]
+    summary = run_import(store, "\n".join(lines), "ndjson", batch_rows=2)
+    assert (summary["rows"], summary["inserted"], summary["failed"]) == (7, 2, 5)
+    assert [error["row"] for error in summary["errors"]] == [3, 4, 5, 6, 7]
+    assert "Invalid JSON" in summary["errors"][0]["error"]
+    assert "expiry_date" in summary["errors"][2]["error"]
+    assert "UNIQUE" in summary["errors"][4]["error"]
+    assert stored_numbers(store) == ["3001/00000001", "3001/00000004"]
+
+def test_csv_with_bom_quoted_commas_and_short_rows(store):
+    header = ",".join(policy(1))
+    rows = [
+        ",".join(f'"{value}"' for value in policy(1, name="Rao, Asha").values()),
+        "only,three,columns",
+        ",".join(policy(2).values()) + ",extra"
+    ]
+    summary = run_import(store, "﻿" + "\r\n".join([header] + rows) + "\r\n", "csv")
+    assert (summary["rows"], summary["inserted"], summary["failed"]) == (3, 2, 1)
+    assert summary["errors"][0]["row"] == 2
+    with store.connection() as conn:
+        assert conn.execute("SELECT name FROM policies ORDER BY id").fetchone()[0] == "Rao, Asha"
+
+def test_json_array_split_across_reads(store, monkeypatch):
+    monkeypatch.setattr(policy_import, "JSON_READ_SIZE", 7)
+    text = " [\n" + ",\n".join(json.dumps(policy(number)) for number in range(1, 6)) + "\n] "
+    summary = run_import(store, text, "json")
+    assert (summary["rows"], summary["inserted"], summary["failed"]) == (5, 5, 0)
+    assert "error" not in summary
+
+@pytest.mark.parametrize("text, message", [
+    ('{"name": "not an array"}', "must be an array"),
+    ("[" + json.dumps(policy(1)) + " " + json.dumps(policy(2)) + "]", "expected ',' or ']'"),
+    ("[" + json.dumps(policy(1)) + ", {\"name\": ", "Invalid JSON after row 1")
+])
+def test_json_array_parse_errors_keep_the_rows_before(store, text, message):
+    summary = run_import(store, text, "json")
+    assert message in summary["error"]
+    assert summary["inserted"] == (0 if "array" in message else 1)
+
+def test_empty_uploads(store):
+    assert run_import(store, "[ ]", "json")["rows"] == 0
+    assert run_import(store, "", "ndjson")["rows"] == 0
+    assert run_import(store, "", "csv")["rows"] == 0
+
+def test_error_list_is_truncated(store):
+    lines = "\n".join("{bad" for _ in range(5))
+    summary = run_import(store, lines, "ndjson", max_errors=2)
+    assert summary["failed"] == 5 and len(summary["errors"]) == 2 and summary["errors_truncated"]
@@ -0,0 +1,147 @@
+import asyncio
+import csv
+import pytest
+from contextlib import contextmanager
+import main
+from database import PolicyStore
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = PolicyStore(str(tmp_path_factory.mktemp("listing") / "policies.db"), pool_size=2)
+    # Few distinct dates, so many policies share the date a cursor stops on
+    rows = [
+        (
+            f"Customer {number}", f"customer{number % 50}@example.com", ("ACKO", "HDFC ERGO", "ICICI Lombard")[number % 3],
+            f"3001/{number:08d}", f"2025-{number % 6 + 1:02d}-01", "2026-03-31", "2025-03-28",
+            f"2026-{number % 12 + 1:02d}-{number % 3 + 1:02d}", ("bike", "car")[number % 2], "2025-03-28 10:00:00"
+        )
+        for number in range(1000)
+    ]
+    store.insert_many(rows)
+    yield store
+    store.close()
+
+def walk(store, filters, descending=False, limit=37):
+    seen, cursor, pages = [], None, 0
+    while True:
+        policies, cursor = store.list_policies(filters, cursor=cursor, limit=limit, descending=descending)
+        seen += [policy["id"] for policy in policies]
+        pages += 1
+        assert pages < 1000
+        if cursor is None:
+            return seen
+
+def expected(store, filters, descending=False):
+    conditions = {
+        "insurer": "insurer = ?", "vehicle_type": "vehicle_type = ?", "email": "email = ?",
+        "expiry_from": "expiry_date >= ?", "expiry_to": "expiry_date <= ?",
+        "start_from": "policy_start_date >= ?", "start_to": "policy_start_date <= ?"
+    }
+    order = "expiry_date, id" if "expiry_from" in filters or "expiry_to" in filters else (
+        "policy_start_date, id" if "start_from" in filters or "start_to" in filters else "id"
+    )
+    if descending:
+        order = order.replace(", id", " DESC, id") + " DESC"
+    sql = "SELECT id FROM policies"
+    if filters:
+        sql += " WHERE " + " AND ".join(conditions[name] for name in filters)
+    with store.connection() as conn:
+        return [row[0] for row in conn.execute(f"{sql} ORDER BY {order}", list(filters.values()))]
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"insurer": "ACKO"},
+    {"vehicle_type": "car", "email": "customer4@example.com"},
+    {"expiry_from": "2026-04-01", "expiry_to": "2026-09-30"},
+    {"expiry_to": "2026-06-02"},
+    {"insurer": "HDFC ERGO", "expiry_from": "2026-05-01"},
+    {"vehicle_type": "bike", "start_from": "2025-02-01", "start_to": "2025-05-01"},
+    {"expiry_from": "2026-03-01", "start_from": "2025-03-01"}
+])
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_walk_every_match_once_in_order(store, filters, descending):
+    assert walk(store, filters, descending) == expected(store, filters, descending)
+
+def test_cursor_format(store):
+    _, cursor = store.list_policies({}, limit=10)
+    assert isinstance(cursor, int)
+    _, cursor = store.list_policies({"expiry_from": "2026-01-01"}, limit=10)
+    date, policy_id = cursor.rsplit(":", 1)
+    assert date.startswith("2026-") and policy_id.isdigit()
+
+def test_fields_and_errors(store):
+    policies, _ = store.list_policies({"insurer": "ACKO"}, fields=("policy_number", "expiry_date"), limit=2)
+    assert set(policies[0]) == {"id", "policy_number", "expiry_date"}
+    policies, _ = store.list_policies({"expiry_from": "2026-01-01"}, fields=("expiry_date",), limit=2)
+    assert set(policies[0]) == {"id", "expiry_date"}
+    with pytest.raises(ValueError):
+        store.list_policies({}, fields=("password",))
+    with pytest.raises(ValueError):
+        store.list_policies({"surname": "Rao"})
+    with pytest.raises(ValueError):
+        store.list_policies({"expiry_from": "2026-01-01"}, cursor="12")
+    with pytest.raises(ValueError):
+        store.list_policies({}, cursor="2026-01-01:12")
+
+def test_range_listings_seek_instead_of_sorting(store):
+    filters = {"insurer": "ACKO", "expiry_from": "2026-04-01"}
+    _, cursor = store.list_policies(filters, limit=10)
+    plans = []
+    real_connection = store.connection
+
+    class Recorder:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def execute(self, sql, params):
+            plans.append([row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)])
+            return self.conn.execute(sql, params)
+
+    @contextmanager
+    def recording_connection():
+        with real_connection() as conn:
+            yield Recorder(conn)
+
+    store.connection = recording_connection
+    try:
+        store.list_policies(filters, limit=10)
+        store.list_policies(filters, cursor=cursor, limit=10)
+    finally:
+        store.connection = real_connection
+    first_page, next_page = plans
+    assert first_page == ["SEARCH policies USING INDEX idx_policies_insurer_expiry_date (insurer=? AND expiry_date>?)"]
+    # The next page merges two seeks of the composite index, sorting only the page rows they return
+    searches = [step for step in next_page if step.startswith(("SEARCH policies", "SCAN policies"))]
+    assert len(searches) == 2
+    assert all("idx_policies_insurer_expiry_date" in step for step in searches)
+
+def test_cursor_outside_the_range_stays_in_the_range(store):
+    filters = {"expiry_from": "2026-05-01", "expiry_to": "2026-08-31"}
+    policies, _ = store.list_policies(filters, cursor="2026-01-01:5", limit=500)
+    assert [policy["id"] for policy in policies] == expected(store, filters)
+    policies, _ = store.list_policies(filters, cursor="2026-12-31:5", limit=500, descending=True)
+    assert [policy["id"] for policy in policies] == expected(store, filters, descending=True)
+
+def test_csv_export_streams_every_policy_a_page_at_a_time(store, monkeypatch):
+    monkeypatch.setattr(main, "get_policy_store", lambda: store)
+    monkeypatch.setattr(main, "POLICY_PAGE_MAX_SIZE", 40)
+    filters = dict(insurer=None, vehicle_type=None, email=None, expiry_to=None, start_from=None, start_to=None)
+
+    async def export(**params):
+        response = await main.export_policies_csv(**dict(filters, **params))
+        if not hasattr(response, "body_iterator"):
+            return response, None
+        return response, [chunk async for chunk in response.body_iterator]
+
+    response, chunks = asyncio.run(export(expiry_from="2026-06-01", fields="policy_number,expiry_date"))
+    assert response.media_type == "text/csv"
+    rows = list(csv.DictReader("".join(chunks).splitlines()))
+    assert [int(row["id"]) for row in rows] == expected(store, {"expiry_from": "2026-06-01"})
+    assert list(rows[0]) == ["id", "policy_number", "expiry_date"]
+    # One chunk per listing page
+    assert len(chunks) == -(-len(rows) // 40)
+
+    response, _ = asyncio.run(export(expiry_from="2026-06-01", fields="premium"))
+    assert response.status_code == 400
+    response, _ = asyncio.run(export(expiry_from="not a date", fields=None))
+    assert response.status_code == 400
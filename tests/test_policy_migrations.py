@@ -0,0 +1,91 @@
+import json
+import sqlite3
+from database import PolicyStore, SCHEMA_MIGRATIONS, migrate_create_policies
+
+LEGACY_ROWS = [
+    # name, email, insurer, policy_number, start, end, date_of_policy, expiry, vehicle_type, submitted_at
+    ("Asha", "asha@example.com", "ACKO", "P-1", "01-04-2024", "31/03/2025", "28.03.2024", "2025-03-31", "bike", "March 28, 2024 at 10:15 AM"),
+    ("Ravi", "ravi@example.com", "ACKO", "P-2", "1 Apr 2024", "soon", "", "31-03-2025", "car", "2024-03-28 10:20:00"),
+    ("Asha", "asha@example.com", "ACKO", "P-1", "01-04-2024", "31-03-2025", "28-03-2024", "31-03-2025", "bike", "2024-03-29 09:00:00"),
+    ("Meera", "meera@example.com", "HDFC ERGO", "P-1", "2024-05-01", "2025-04-30", "2024-05-01", "2025-04-30", "car", "2024-05-01 12:00:00")
+]
+
+def legacy_database(path, with_id=True):
+    conn = sqlite3.connect(path, isolation_level=None)
+    if with_id:
+        migrate_create_policies(conn)
+    else:
+        # Tables created by the old save_policy had no id column
+        conn.execute("""
+            CREATE TABLE policies (
+                name TEXT, email TEXT, insurer TEXT, policy_number TEXT, policy_start_date TEXT,
+                policy_end_date TEXT, date_of_policy TEXT, expiry_date TEXT, vehicle_type TEXT, submitted_at TEXT
+            )
+        """)
+    conn.executemany(
+        "INSERT INTO policies (name, email, insurer, policy_number, policy_start_date, policy_end_date, "
+        "date_of_policy, expiry_date, vehicle_type, submitted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        LEGACY_ROWS
+    )
+    conn.close()
+
+def migrated(tmp_path, with_id=True):
+    path = str(tmp_path / "insurance.db")
+    legacy_database(path, with_id)
+    store = PolicyStore(path, pool_size=1)
+    with store.connection() as conn:
+        conn.row_factory = sqlite3.Row
+        policies = [dict(row) for row in conn.execute("SELECT * FROM policies ORDER BY id")]
+        duplicates = [dict(row) for row in conn.execute("SELECT * FROM policy_duplicates ORDER BY id")]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.row_factory = None
+    return store, policies, duplicates, indexes, version
+
+def test_legacy_table_is_migrated_to_the_latest_version(tmp_path):
+    store, policies, duplicates, indexes, version = migrated(tmp_path)
+    assert version == SCHEMA_MIGRATIONS[-1][0]
+    # Databases of the original app have no user_version, so version 1 runs (and keeps the table)
+    assert store.migrated_versions == [version for version, _ in SCHEMA_MIGRATIONS]
+
+    # The latest submission of a policy number is kept; ids are preserved
+    assert [(policy["id"], policy["insurer"], policy["policy_number"]) for policy in policies] == [
+        (2, "ACKO", "P-2"), (3, "ACKO", "P-1"), (4, "HDFC ERGO", "P-1")
+    ]
+    assert [(duplicate["id"], duplicate["submitted_at"]) for duplicate in duplicates] == [(1, "2024-03-28 10:15:00")]
+
+    ravi = policies[0]
+    assert ravi["policy_start_date"] == "2024-04-01"
+    assert ravi["expiry_date"] == "2025-03-31"
+    # Unreadable dates are NULL and kept verbatim; empty ones are just NULL
+    assert ravi["policy_end_date"] is None and ravi["date_of_policy"] is None
+    assert json.loads(ravi["legacy_values"]) == {"policy_end_date": "soon"}
+    assert policies[1]["legacy_values"] is None
+
+    assert {
+        "idx_policies_policy_number", "idx_policies_email", "idx_policies_insurer", "idx_policies_expiry_date",
+        "idx_policies_vehicle_type", "idx_policies_start_date", "idx_policies_insurer_expiry_date"
+    } <= indexes
+    assert "policies_v1_dedup" not in indexes
+    store.close()
+
+def test_table_without_id_column_is_migrated_by_rowid(tmp_path):
+    store, policies, duplicates, _, _ = migrated(tmp_path, with_id=False)
+    assert [policy["id"] for policy in policies] == [2, 3, 4]
+    assert [duplicate["id"] for duplicate in duplicates] == [1]
+    store.close()
+
+def test_migrations_run_once_and_new_rows_keep_unique_numbers(tmp_path):
+    store, _, _, _, _ = migrated(tmp_path)
+    store.close()
+    reopened = PolicyStore(str(tmp_path / "insurance.db"), pool_size=1)
+    assert reopened.migrated_versions == []
+    row = ("Asha", "asha@example.com", "ACKO", "P-1", "2024-04-01", "2025-03-31", "2024-03-28", "2025-03-31", "bike", "2024-04-01 00:00:00")
+    errors = reopened.insert_many([row, row[:3] + ("P-9",) + row[4:]])
+    assert list(errors) == [0] and "UNIQUE" in errors[0]
+    reopened.close()
+
+def test_new_database_starts_at_the_latest_version(tmp_path):
+    store = PolicyStore(str(tmp_path / "new.db"), pool_size=1)
+    assert store.migrated_versions == [version for version, _ in SCHEMA_MIGRATIONS]
+    store.close()
@@ -0,0 +1,90 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from database import PolicyStore
+
+def row(number):
+    return (
+        f"Customer {number}", f"customer{number}@example.com", "ACKO", f"3001/{number:08d}",
+        "2025-04-01", "2026-03-31", "2025-03-28", "2026-03-31", "car", "2025-03-28 10:00:00"
+    )
+
+def count(store):
+    with store.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+@pytest.fixture
+def store(tmp_path):
+    store = PolicyStore(str(tmp_path / "policies.db"), pool_size=4, busy_timeout_ms=10000)
+    yield store
+    store.close()
+
+def test_pooled_connections_use_wal_and_wait_for_the_write_lock(store):
+    with store.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 10000
+        assert conn.isolation_level is None
+
+def test_the_pool_never_opens_more_connections_than_its_size(store):
+    borrowed = set()
+    lock = threading.Lock()
+    barrier = threading.Barrier(8)
+
+    def borrow():
+        barrier.wait()
+        for _ in range(20):
+            with store.connection() as conn:
+                with lock:
+                    borrowed.add(id(conn))
+                conn.execute("SELECT COUNT(*) FROM policies").fetchone()
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: borrow(), range(8)))
+    assert len(store._connections) <= 4
+    assert borrowed == {id(conn) for conn in store._connections}
+
+def test_concurrent_writers_queue_instead_of_failing(store):
+    def insert(worker):
+        for number in range(50):
+            store.insert_policy(row(worker * 1000 + number))
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(insert, range(8)))
+    assert count(store) == 400
+
+def test_readers_are_not_blocked_by_an_open_write_transaction(store):
+    store.insert_policy(row(1))
+    written = threading.Event()
+    release = threading.Event()
+
+    def write():
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO policies (name, policy_number) VALUES ('Pending', 'P-1')")
+            written.set()
+            release.wait(10)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert written.wait(10)
+    try:
+        # The reader sees the last committed state at once, without waiting on the writer
+        assert count(store) == 1
+    finally:
+        release.set()
+        writer.join()
+    assert count(store) == 2
+
+def test_a_failed_transaction_is_rolled_back(store):
+    with pytest.raises(RuntimeError):
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO policies (name, policy_number) VALUES ('First', 'P-1')")
+            raise RuntimeError("validation failed")
+    assert count(store) == 0
+    # The connection went back to the pool usable
+    store.insert_policy(row(1))
+    assert count(store) == 1
+
+def test_a_closed_store_refuses_connections(store):
+    store.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        store.insert_policy(row(1))
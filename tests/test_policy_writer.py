@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from database import PolicyStore, PolicyWriteBatcher, policy_row
+from models import BikeInsurancePolicy
+
+def make_row(policy_number):
+    policy = BikeInsurancePolicy(
+        name="Asha Rao", email="asha@example.com", insurer="Acko", policy_number=policy_number,
+        policy_start_date="01-04-2024", policy_end_date="31-03-2025", date_of_policy="28-03-2024",
+        expiry_date="31-03-2025", vehicle_type="Bike"
+    )
+    return policy_row(policy)
+
+@pytest.fixture
+def writer(tmp_path):
+    store = PolicyStore(str(tmp_path / "policies.db"), pool_size=2)
+    writer = PolicyWriteBatcher(store)
+    yield writer
+    writer.close()
+    store.close()
+
+def count_policies(writer):
+    with writer.store.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+def test_rows_are_committed_before_the_future_resolves(writer):
+    futures = [writer.submit(make_row(f"P-{index}")) for index in range(20)]
+    ids = [future.result(timeout=5) for future in futures]
+    assert len(set(ids)) == 20
+    assert count_policies(writer) == 20
+
+def test_duplicate_fails_alone(writer):
+    first = writer.submit(make_row("P-1"))
+    duplicate = writer.submit(make_row("P-1"))
+    other = writer.submit(make_row("P-2"))
+    assert first.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    assert other.result(timeout=5)
+
+def test_cancelled_row_is_dropped_and_writer_survives(writer):
+    # Hold the write lock so the writer stalls on its first row while the next one waits in the queue
+    with writer.store.transaction():
+        blocked = writer.submit(make_row("P-1"))
+        while not blocked.running():
+            time.sleep(0.001)
+        cancelled = writer.submit(make_row("P-2"))
+        assert cancelled.cancel()
+    assert blocked.result(timeout=10)
+    assert writer.submit(make_row("P-3")).result(timeout=5)
+    assert writer._thread.is_alive()
+    with writer.store.connection() as conn:
+        numbers = {row[0] for row in conn.execute("SELECT policy_number FROM policies")}
+    assert numbers == {"P-1", "P-3"}
+
+def test_cancelled_await_does_not_stop_the_writer(writer):
+    async def submit_and_cancel():
+        task = asyncio.ensure_future(asyncio.wrap_future(writer.submit(make_row("P-1"))))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await asyncio.wrap_future(writer.submit(make_row("P-2")))
+
+    assert asyncio.run(asyncio.wait_for(submit_and_cancel(), 5))
+    assert writer._thread.is_alive()
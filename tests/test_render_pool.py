@@ -0,0 +1,79 @@
+import asyncio
+import fitz
+from page_renderer import render_page, render_settings
+from render_pool import make_render_pool, render_batches, render_page_range
+
+def write_pdf(path, page_count):
+    document = fitz.open()
+    for page_num in range(page_count):
+        document.new_page().insert_text((72, 72), f"Policy schedule page {page_num + 1}", fontsize=12)
+    document.save(path)
+
+def test_worker_processes_render_the_same_images(tmp_path):
+    pdf_path = str(tmp_path / "policy.pdf")
+    write_pdf(pdf_path, 4)
+    settings = render_settings(image_format="png")
+    pool = make_render_pool(2)
+    try:
+        images, renders = pool.submit(render_page_range, pdf_path, [3, 1], settings).result(60)
+    finally:
+        pool.shutdown()
+
+    document = fitz.open(pdf_path)
+    expected = [render_page(document[page_num], settings) for page_num in (3, 1)]
+    assert images == [img_data for img_data, _ in expected]
+    assert renders == [render_info for _, render_info in expected]
+
+def collect(batches, render_batch, max_in_flight, queue_size, consume_delay=0.0):
+    async def run():
+        items = []
+        async for item in render_batches(batches, render_batch, max_in_flight, queue_size):
+            items.append(item)
+            await asyncio.sleep(consume_delay)
+        return items
+    return asyncio.run(run())
+
+def test_renders_are_bounded_and_failures_are_yielded():
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def render_batch(page_nums):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(0.01)
+            if page_nums == [4, 5]:
+                raise RuntimeError("broken page")
+            return [b"image"] * len(page_nums), [{}] * len(page_nums)
+        finally:
+            state["in_flight"] -= 1
+
+    batches = [[page_num, page_num + 1] for page_num in range(0, 12, 2)]
+    items = collect(batches, render_batch, 2, 4)
+    assert sorted(page_nums for page_nums, _, _, _ in items) == batches
+    assert state["max_in_flight"] == 2
+    [failed] = [item for item in items if item[3] is not None]
+    assert failed[0] == [4, 5] and failed[1] is None and str(failed[3]) == "broken page"
+
+def test_a_slow_consumer_throttles_rendering():
+    rendered = []
+    consumed = []
+
+    async def render_batch(page_nums):
+        rendered.append(page_nums)
+        return [b"image"], [{}]
+
+    async def run():
+        generator = render_batches([[page_num] for page_num in range(20)], render_batch, 2, 3)
+        async for page_nums, _, _, _ in generator:
+            consumed.append(page_nums)
+            await asyncio.sleep(0.01)
+            # At most the queued batches and the ones holding a slot are ahead of the consumer
+            assert len(rendered) - len(consumed) <= 3 + 2
+            if len(consumed) == 5:
+                break
+        await generator.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    # Closing the stream early stops the remaining renders
+    assert len(rendered) < 20
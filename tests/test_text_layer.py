@@ -0,0 +1,84 @@
+import asyncio
+import io
+import fitz
+from PIL import Image
+import vision_gemini_processor as processor
+from ocr_backends import OcrBackend
+
+WORDING = "The insurer will indemnify the insured against loss of or damage to the vehicle insured. "
+
+def digital_page(document):
+    page = document.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 523, 770), WORDING * 25, fontsize=10)
+    return page
+
+def scanned_page(document):
+    # A full-page image with a few words of header text over it
+    buffer = io.BytesIO()
+    Image.new("RGB", (600, 800), "white").save(buffer, format="PNG")
+    page = document.new_page()
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    page.insert_textbox(fitz.Rect(72, 72, 523, 300), WORDING * 4, fontsize=10)
+    return page
+
+class GarbledPage:
+    """
+    A page whose text layer came out of a font without a usable encoding
+    """
+
+    rect = fitz.Rect(0, 0, 595, 842)
+
+    def get_text(self):
+        return ("\ue000\ue013\ue021 \ue017\ue004 " * 40) + WORDING * 5
+
+    def get_image_info(self):
+        return []
+
+def test_born_digital_page_is_read_from_its_text_layer():
+    text, decision = processor.classify_page_text_layer(digital_page(fitz.open()))
+    assert decision["source"] == "text_layer"
+    assert decision["reason"] == "digital_text_layer"
+    assert text.startswith("The insurer will indemnify")
+
+def test_pages_that_need_ocr():
+    for new_page, reason in (
+        (lambda: fitz.open().new_page(), "sparse_text_layer"),
+        (lambda: scanned_page(fitz.open()), "image_heavy_page"),
+        (GarbledPage, "garbled_text_layer"),
+    ):
+        text, decision = processor.classify_page_text_layer(new_page())
+        assert (text, decision["source"], decision["reason"]) == ("", "ocr", reason)
+    assert processor.garbled_character_ratio("abc\ufffd") == 0.25
+
+class RecordingOcrBackend(OcrBackend):
+    name = "recording"
+    cacheable = False
+
+    def __init__(self):
+        self.pages_read = []
+
+    def ocr_images(self, page_nums, images):
+        self.pages_read.extend(page_nums)
+        return [{"page": page_num + 1, "text": f"OCR text {page_num + 1}", "error": None} for page_num in page_nums]
+
+def read_pages(monkeypatch, document, fast_path):
+    backend = RecordingOcrBackend()
+    monkeypatch.setattr(processor, "TEXT_LAYER_FAST_PATH", fast_path)
+    monkeypatch.setattr(processor, "get_ocr_backend", lambda name=None: backend)
+    return asyncio.run(processor.extract_pdf_pages(document)), backend.pages_read
+
+def test_only_pages_without_a_usable_text_layer_are_ocred(monkeypatch):
+    document = fitz.open()
+    digital_page(document)
+    scanned_page(document)
+    digital_page(document)
+    document.new_page()
+
+    pages, pages_read = read_pages(monkeypatch, document, True)
+    assert sorted(pages_read) == [1, 3]
+    assert [page["source"] for page in pages] == ["text_layer", "ocr", "text_layer", "ocr"]
+    assert pages[1]["text"] == "OCR text 2" and pages[0]["text"].startswith("The insurer")
+
+    pages, pages_read = read_pages(monkeypatch, document, False)
+    assert sorted(pages_read) == [0, 1, 2, 3]
+    assert all(page["classifier"]["reason"] == "fast_path_disabled" for page in pages)
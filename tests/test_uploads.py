@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import os
+import pytest
+import vision_gemini_processor as processor
+
+class FakeUpload:
+    """
+    UploadFile stand-in that hands out content in the sizes asked for, failing after fail_after bytes
+    """
+
+    def __init__(self, content, fail_after=None):
+        self.content = content
+        self.fail_after = fail_after
+        self.position = 0
+        self.largest_read = 0
+
+    async def read(self, size=-1):
+        if size < 0:
+            raise AssertionError("the whole upload was read at once")
+        self.largest_read = max(self.largest_read, size)
+        if self.fail_after is not None and self.position >= self.fail_after:
+            raise ConnectionError("client disconnected")
+        chunk = self.content[self.position:self.position + size]
+        self.position += len(chunk)
+        return chunk
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(processor, "PDF_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(processor, "UPLOAD_CHUNK_SIZE", 1000)
+    return tmp_path
+
+def test_uploads_are_copied_to_disk_in_chunks(spool_dir):
+    content = os.urandom(10500)
+    upload = FakeUpload(content)
+    pdf_path, sha256 = asyncio.run(processor.spool_upload(upload))
+
+    assert os.path.dirname(pdf_path) == str(spool_dir)
+    with open(pdf_path, "rb") as f:
+        assert f.read() == content
+    assert sha256 == hashlib.sha256(content).hexdigest() == processor.hash_file(pdf_path)
+    assert upload.largest_read == 1000
+
+def test_a_failed_upload_leaves_no_spool_file(spool_dir):
+    with pytest.raises(ConnectionError):
+        asyncio.run(processor.spool_upload(FakeUpload(os.urandom(5000), fail_after=2000)))
+    assert os.listdir(spool_dir) == []
+
+def test_the_spool_file_is_removed_after_processing(spool_dir, monkeypatch):
+    seen = []
+
+    async def extract_text_from_pdf_path(pdf_path, insurance_type, vehicle_type=None, max_concurrency=None, pdf_sha256=None):
+        seen.append((os.path.exists(pdf_path), pdf_sha256))
+        raise RuntimeError("OCR failed")
+
+    monkeypatch.setattr(processor, "extract_text_from_pdf_path", extract_text_from_pdf_path)
+    content = b"%PDF-1.7 policy"
+    with pytest.raises(RuntimeError):
+        asyncio.run(processor.extract_text_from_pdf_with_vision(FakeUpload(content), "vehicle", "car"))
+    assert seen == [(True, hashlib.sha256(content).hexdigest())]
+    assert os.listdir(spool_dir) == []
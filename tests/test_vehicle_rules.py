@@ -0,0 +1,41 @@
+import asyncio
+import json
+import pytest
+import vision_gemini_processor as processor
+from vehicle_rules import extract_vehicle_fields, normalize_vehicle_value
+
+SCHEDULE = """Private Car Package Policy - Schedule
+Policy No: 3001/12345678/00/000
+Period of Insurance: From 15/03/2024 to 14/03/2025
+Email ID: customer@example.com   Mobile No: 9876543210
+Premium Details
+Net Premium 10,000.00
+{gst_lines}
+Total Premium: 11,800.00
+"""
+
+@pytest.mark.parametrize("gst_lines, value", [
+    ("IGST @ 18% 1,800.00", "18"),
+    ("CGST @ 9% 900.00\nSGST @ 9% 900.00", "18"),
+    ("GST (12.50%) 1,250.00", "12.5"),
+])
+def test_gst_percentage_is_a_bare_number(gst_lines, value):
+    fields = extract_vehicle_fields(SCHEDULE.format(gst_lines=gst_lines))
+    assert fields["gstPercentage"]["value"] == value
+    assert fields["policyno"]["value"] == "3001/12345678/00/000"
+    assert fields["grossPremium"]["value"] == "11800.00"
+
+def test_gst_percentage_from_a_layout_template_is_a_bare_number():
+    assert normalize_vehicle_value("gstPercentage", "18.00 %") == "18"
+    assert normalize_vehicle_value("gstPercentage", "18") is None
+
+def test_prefilled_gst_percentage_matches_the_llm_format(monkeypatch):
+    async def generate_llm_text(prompt, extractor=None):
+        assert "gstPercentage" not in prompt.split("Document Text:")[0]
+        return json.dumps({"Coverton imp_keys": {"firstName": "Asha", "lastName": "Rao"}})
+
+    monkeypatch.setattr(processor, "generate_llm_text", generate_llm_text)
+    monkeypatch.setattr(processor, "VEHICLE_RULES_MODE", "assist")
+    text = SCHEDULE.format(gst_lines="IGST @ 18% 1,800.00")
+    result = asyncio.run(processor.classify_vehicle_fields_with_gemini(text, "car"))
+    assert result["Coverton imp_keys"]["gstPercentage"] == "18"
@@ -0,0 +1,28 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from vision_client import VisionClientManager
+
+def test_clients_are_created_once_and_used_round_robin():
+    manager = VisionClientManager(endpoint="localhost:50051", pool_size=3, insecure=True)
+    with ThreadPoolExecutor(8) as executor:
+        clients = list(executor.map(lambda _: manager.get_client(), range(30)))
+    try:
+        assert len({id(client) for client in clients}) == 3
+        assert all(clients.count(client) == 10 for client in manager._clients)
+        assert [manager.get_client() for _ in range(3)] == [manager.get_client() for _ in range(3)]
+    finally:
+        manager.close()
+
+def test_closed_clients_are_replaced_on_next_use():
+    manager = VisionClientManager(endpoint="localhost:50051", pool_size=2, insecure=True)
+    first = manager.get_client()
+    manager.close()
+    assert manager._clients == []
+    assert manager.get_client() is not first
+    manager.close()
+
+def test_a_missing_api_key_is_reported(monkeypatch):
+    monkeypatch.delenv("GOOGLE_CLOUD_VISION_API_KEY", raising=False)
+    manager = VisionClientManager(pool_size=2)
+    with pytest.raises(ValueError, match="GOOGLE_CLOUD_VISION_API_KEY not found"):
+        manager.get_client()
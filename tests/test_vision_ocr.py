@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+import fitz
+import ocr_backends
+import vision_gemini_processor as processor
+from google.cloud import vision_v1
+
+class FakeVisionClient:
+    """
+    Vision client reading the page number off fake page images. Later batches
+    answer sooner, so they finish in reverse order.
+    """
+
+    def __init__(self, failing_pages=(), failing_batches=()):
+        self.failing_pages = set(failing_pages)
+        self.failing_batches = set(failing_batches)
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests):
+        pages = [int(request.image.content.decode().split("-")[1]) for request in requests]
+        with self._lock:
+            self.batches.append(pages)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.05 / (pages[0] + 1))
+            if pages[0] in self.failing_batches:
+                raise RuntimeError("503 Service Unavailable")
+            responses = []
+            for page in pages:
+                if page in self.failing_pages:
+                    responses.append(vision_v1.AnnotateImageResponse(error={"message": "Bad image data"}))
+                else:
+                    responses.append(vision_v1.AnnotateImageResponse(text_annotations=[{"description": f"text of page {page}"}]))
+            return vision_v1.BatchAnnotateImagesResponse(responses=responses)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def fake_render_page_batch(pdf_document, page_nums, settings=None):
+    return [f"page-{page_num}".encode() for page_num in page_nums], [{"bytes": 6} for _ in page_nums]
+
+def blank_pdf(page_count):
+    document = fitz.open()
+    for _ in range(page_count):
+        document.new_page()
+    return document
+
+def ocr_pages(monkeypatch, client, page_count, **options):
+    monkeypatch.setattr(processor, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(processor, "render_page_batch", fake_render_page_batch)
+    monkeypatch.setattr(ocr_backends, "get_vision_client", lambda: client)
+    backend = ocr_backends.VisionOcrBackend()
+    return asyncio.run(processor.ocr_pdf_pages(blank_pdf(page_count), backend, mode="image", **options))
+
+def test_pages_come_back_in_page_order(monkeypatch):
+    client = FakeVisionClient()
+    pages = ocr_pages(monkeypatch, client, 20, batch_size=4, max_concurrency=3)
+
+    assert [page["page"] for page in pages] == list(range(1, 21))
+    assert [page["text"] for page in pages] == [f"text of page {page_num}" for page_num in range(20)]
+    assert sorted(client.batches) == [list(range(first, first + 4)) for first in range(0, 20, 4)]
+    assert 1 < client.max_in_flight <= 3
+
+def test_a_failed_page_does_not_fail_its_batch(monkeypatch):
+    pages = ocr_pages(monkeypatch, FakeVisionClient(failing_pages={5}), 8, batch_size=4)
+
+    assert pages[5] == {
+        "page": 6, "text": "", "error": "Vision API Error: Bad image data",
+        "ocr_cache": "miss", "page_hash": pages[5]["page_hash"], "render": {"bytes": 6}, "ocr_backend": "vision"
+    }
+    assert all(page["error"] is None for page in pages[:5] + pages[6:])
+
+def test_a_failed_batch_fails_only_its_own_pages(monkeypatch):
+    pages = ocr_pages(monkeypatch, FakeVisionClient(failing_batches={4}), 12, batch_size=4)
+
+    assert [page["page"] for page in pages if page["error"]] == [5, 6, 7, 8]
+    assert all(page["error"] == "Vision API Error: 503 Service Unavailable" for page in pages[4:8])
+    assert [page["text"] for page in pages[8:]] == [f"text of page {page_num}" for page_num in range(8, 12)]
+
+class FakeFileVisionClient:
+    """
+    Vision client answering files:annotate with the pages in reverse order
+    and without the pages listed as missing
+    """
+
+    def __init__(self, missing_pages=()):
+        self.missing_pages = set(missing_pages)
+
+    def batch_annotate_files(self, requests):
+        pages = [page for page in requests[0].pages if page not in self.missing_pages]
+        responses = [
+            vision_v1.AnnotateImageResponse(
+                text_annotations=[{"description": f"text of page {page}"}], context={"page_number": page}
+            )
+            for page in reversed(pages)
+        ]
+        return vision_v1.BatchAnnotateFilesResponse(responses=[{"responses": responses}])
+
+def test_pdf_mode_matches_pages_to_their_numbers(tmp_path, monkeypatch):
+    pdf_path = str(tmp_path / "policy.pdf")
+    document = blank_pdf(6)
+    document.save(pdf_path)
+    monkeypatch.setattr(processor, "get_vision_client", lambda: FakeFileVisionClient(missing_pages={3}))
+
+    pages = asyncio.run(processor.ocr_pdf_pages(document, ocr_backends.VisionOcrBackend(), pdf_path, mode="pdf", batch_size=4))
+
+    assert [page["page"] for page in pages] == [1, 2, 3, 4, 5, 6]
+    assert pages[2]["error"] == "Vision API Error: page missing from response"
+    assert [page["text"] for page in pages if not page["error"]] == [f"text of page {page}" for page in (1, 2, 4, 5, 6)]
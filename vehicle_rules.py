@@ -0,0 +1,248 @@
+import re
+import os
+from datetime import datetime
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# "assist" fills the fields the rules are confident about and asks the LLM only for the rest,
+# "rules_only" skips the LLM and returns the confident rule fields, "off" disables the rules
+VEHICLE_RULES_MODE = os.getenv("VEHICLE_RULES_MODE", "assist")
+
+# Rule values at or above this confidence are used without asking the LLM
+VEHICLE_RULES_MIN_CONFIDENCE = float(os.getenv("VEHICLE_RULES_MIN_CONFIDENCE", "0.9"))
+
+# Confidence of a value found right after its label, and of one of several different labelled values
+LABELLED_CONFIDENCE = 0.95
+AMBIGUOUS_LABELLED_CONFIDENCE = 0.6
+
+# Confidence of one of several different unlabelled values
+AMBIGUOUS_UNLABELLED_CONFIDENCE = 0.4
+
+# Separator between a label and its value: punctuation, spaces and an optional "(Rs.)" style note
+_SEP = r"[\s:.\-#=/|]{0,6}(?:\([^)\n]{0,12}\)[\s:.\-#=/|]{0,6})?"
+
+_DATE = (
+    r"(\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}"
+    r"|\d{1,2}[\s\-/](?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s\-/,]{1,2}\d{2,4}"
+    r"|\d{4}-\d{2}-\d{2})"
+)
+
+_AMOUNT = r"(?:Rs\.?|INR|₹)?\s*(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)"
+
+_EMAIL = r"([A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,})"
+
+_MOBILE = r"(?:\+?91[\s\-]?)?[6-9]\d{4}[\s\-]?\d{5}"
+
+_DATE_FORMATS = [
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%y", "%Y-%m-%d",
+    "%d %b %Y", "%d-%b-%Y", "%d/%b/%Y", "%d %B %Y", "%d-%B-%Y", "%d %b, %Y", "%d %B, %Y",
+    "%d-%b-%y", "%d %b %y"
+]
+
+# Mailboxes of the insurer rather than the customer
+_GENERIC_MAILBOXES = re.compile(r"^(?:care|customer|support|help|service|grievance|noreply|no-reply|info|claims?|contact)", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _normalize_date(value):
+    value = " ".join(value.replace("Sept", "Sep").split())
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%d-%m-%Y")
+        except ValueError:
+            continue
+    return None
+
+def _digits(value):
+    return re.sub(r"\D", "", value)
+
+def _amount(value):
+    return value.replace(",", "")
+
+# (fields captured in group order, trigger words, label pattern, value pattern, normalizer).
+# A label is only tried where one of its trigger words starts, and its value
+# right where the label ends.
+LABELLED_RULES = [
+    (("policyno",), ("policy",),
+     r"(?<!previous )(?<!prev\. )(?<!old )policy\s*(?:no|number|num)\b",
+     _SEP + r"((?=[A-Z/\-]*\d)[A-Z0-9][A-Z0-9/\-]{5,30}[A-Z0-9])", str.upper),
+    (("emailId",), ("email", "e-mail"),
+     r"e-?mail(?:\s*id)?\b",
+     _SEP + _EMAIL, str.lower),
+    (("phoneNo",), ("phone", "mob", "cell", "contact", "tel"),
+     r"(?:phone|mobile|mob|cell|contact|telephone|tel)(?:\s*(?:no|number))?\b",
+     _SEP + r"(" + _MOBILE + r"|\d{10,12})\b", _digits),
+    (("pincode",), ("pin", "postal"),
+     r"(?:pin\s*code|pincode|pin|postal\s*code)\b",
+     _SEP + r"([1-9]\d{2}\s?\d{3})\b", _digits),
+    (("panNo",), ("pan",),
+     r"pan(?:\s*(?:no|number|card))?\b",
+     _SEP + r"([A-Z]{5}\d{4}[A-Z])\b", str.upper),
+    (("adharNo",), ("aadhaar", "aadhar", "adhar", "uid"),
+     r"(?:aadhaar|aadhar|adhar|uid)(?:\s*(?:no|number|card))?\b",
+     _SEP + r"(\d{4}\s?\d{4}\s?\d{4})\b", _digits),
+    (("dob",), ("date", "dob", "d.o.b"),
+     r"(?:date\s*of\s*birth|d\.o\.b\.?|dob)\b",
+     _SEP + _DATE, _normalize_date),
+    (("policyissuedDate",), ("date", "issue", "policy"),
+     r"(?:date\s*of\s*issue|issue\s*date|issued\s*on|date\s*of\s*issuance|policy\s*issued?\s*date)\b",
+     _SEP + _DATE, _normalize_date),
+    (("commenceMentDate", "policyEndDate"), ("period", "policy", "insurance"),
+     r"(?:period\s*of\s*insurance|policy\s*period|insurance\s*period|period\s*of\s*cover)\b",
+     r"[^\n]{0,40}?" + _DATE + r"(?:[^\n]{0,40}?(?:to|till|-)\s*(?:midnight\s*of\s*)?" + _DATE + r")?", _normalize_date),
+    (("commenceMentDate",), ("risk", "start", "commencement", "valid", "from"),
+     r"(?:risk\s*start\s*date|start\s*date|commencement\s*date|valid\s*from|from\s*date)\b",
+     _SEP + _DATE, _normalize_date),
+    (("policyEndDate",), ("risk", "end", "expiry", "valid", "to date"),
+     r"(?:risk\s*end\s*date|end\s*date|expiry\s*date|valid\s*(?:up\s*)?to|valid\s*till|to\s*date)\b",
+     _SEP + _DATE, _normalize_date),
+    (("grossPremium",), ("gross", "total", "premium", "final"),
+     r"(?:gross\s*premium|total\s*premium|premium\s*payable|total\s*amount\s*payable|final\s*premium)\b",
+     _SEP + _AMOUNT, _amount),
+    (("sumInsuredIdv",), ("total", "insured", "idv", "sum"),
+     r"(?:total\s*idv|insured'?s?\s*declared\s*value|idv|sum\s*insured)",
+     _SEP + _AMOUNT, _amount)
+]
+
+# field: (pattern, confidence of a single value, normalizer) for values recognisable without a label
+UNLABELLED_RULES = {
+    "emailId": (re.compile(r"\b" + _EMAIL + r"\b"), 0.8, str.lower),
+    "phoneNo": (re.compile(r"(?<![\d\-/])(" + _MOBILE + r")(?![\d\-/])"), 0.7, _digits),
+    "pincode": (re.compile(r"[A-Za-z][\s,]*[-–,]\s*([1-9]\d{5})\b"), 0.6, _digits),
+    # The fourth letter of an individual's PAN is P
+    "panNo": (re.compile(r"\b([A-Z]{3}P[A-Z]\d{4}[A-Z])\b"), 0.8, str.upper)
+}
+
+# Value patterns and normalizers of the fields with a regular format, shared
+# with the layout templates (see layout_templates.py)
+DATE_FIELDS = ("dob", "policyissuedDate", "commenceMentDate", "policyEndDate")
+AMOUNT_FIELDS = ("sumInsuredIdv", "grossPremium")
+FIELD_VALUE_PATTERNS = {
+    **{field: re.compile(_DATE, re.IGNORECASE) for field in DATE_FIELDS},
+    **{field: re.compile(_AMOUNT) for field in AMOUNT_FIELDS},
+    "policyno": re.compile(r"((?=[A-Z/\-]*\d)[A-Z0-9][A-Z0-9/\-]{5,30}[A-Z0-9])", re.IGNORECASE),
+    "emailId": re.compile(_EMAIL),
+    "phoneNo": re.compile(r"(" + _MOBILE + r"|\d{10,12})"),
+    "pincode": re.compile(r"([1-9]\d{2}\s?\d{3})"),
+    "panNo": re.compile(r"([A-Z]{5}\d{4}[A-Z])", re.IGNORECASE),
+    "adharNo": re.compile(r"(\d{4}\s?\d{4}\s?\d{4})"),
+    "gstPercentage": re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s*%")
+}
+FIELD_NORMALIZERS = {
+    **{field: _normalize_date for field in DATE_FIELDS},
+    **{field: _amount for field in AMOUNT_FIELDS},
+    "policyno": str.upper,
+    "emailId": str.lower,
+    "phoneNo": _digits,
+    "pincode": _digits,
+    "panNo": str.upper,
+    "adharNo": _digits,
+    # A bare number ("18"), like the LLM and the medical Coverton fields give it
+    "gstPercentage": lambda value: f"{float(value):g}"
+}
+
+def normalize_vehicle_value(field, raw):
+    """
+    Normalize a raw field value the way the rules report it; None when a
+    field with a regular format has no valid value in raw
+    """
+    pattern = FIELD_VALUE_PATTERNS.get(field)
+    if pattern is None:
+        return " ".join(raw.split()).strip(" :-#,") or None
+    match = pattern.search(raw)
+    return FIELD_NORMALIZERS[field](match.group(1)) if match else None
+
+def _rules_by_trigger(rules):
+    by_trigger = {}
+    for index, (_, triggers, _, _, _) in enumerate(rules):
+        for trigger in triggers:
+            by_trigger.setdefault(trigger, []).append(index)
+    return by_trigger
+
+# Rules to try at each trigger word; a label must start a word
+_TRIGGERS = _rules_by_trigger(LABELLED_RULES)
+_PATTERNS = [
+    re.compile(r"(?<![A-Za-z])" + label + value, re.IGNORECASE)
+    for _, _, label, value, _ in LABELLED_RULES
+]
+
+# ASCII-only lowercasing keeps string positions when str.lower() would not
+_ASCII_LOWERCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+_GST_RATE = re.compile(r"\b(IGST|CGST|SGST|UTGST|GST)\s*(?:@|\(|:)?\s*(\d{1,2}(?:\.\d{1,2})?)\s*%", re.IGNORECASE)
+
+def _pick(candidates, confidence, ambiguous_confidence):
+    distinct = list(dict.fromkeys(value for value in candidates if value))
+    if not distinct:
+        return None
+    return distinct[0], confidence if len(distinct) == 1 else ambiguous_confidence
+
+def _customer_emails(values):
+    return [value for value in values if not _GENERIC_MAILBOXES.match(value)]
+
+def _extract_gst_percentage(text):
+    rates = {}
+    for match in _GST_RATE.finditer(text):
+        rates.setdefault(match.group(1).upper(), float(match.group(2)))
+    if "IGST" in rates:
+        rate, confidence = rates["IGST"], LABELLED_CONFIDENCE
+    elif "CGST" in rates and ("SGST" in rates or "UTGST" in rates):
+        rate, confidence = rates["CGST"] + rates.get("SGST", rates.get("UTGST", 0)), LABELLED_CONFIDENCE
+    elif "GST" in rates:
+        rate, confidence = rates["GST"], 0.8
+    else:
+        return None
+    return f"{rate:g}", confidence
+
+def extract_vehicle_fields(text):
+    """
+    Deterministic pre-extraction of the regular vehicle policy fields.
+
+    Returns {field: {"value": ..., "confidence": 0.0-1.0, "rule": "labelled" | "unlabelled"}}
+    for the fields found. A value right after its label scores highest; values
+    that are ambiguous (several different candidates) score low.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = text.translate(_ASCII_LOWERCASE)
+
+    # Scanning for plain trigger words is much faster than one
+    # case-insensitive alternation of every label over the whole text
+    candidates = {}
+    for trigger, indexes in _TRIGGERS.items():
+        position = lowered.find(trigger)
+        while position != -1:
+            for index in indexes:
+                match = _PATTERNS[index].match(text, position)
+                if match is None:
+                    continue
+                fields, normalize = LABELLED_RULES[index][0], LABELLED_RULES[index][4]
+                for field, raw in zip(fields, match.groups()):
+                    if raw:
+                        candidates.setdefault(field, []).append(normalize(raw))
+            position = lowered.find(trigger, position + 1)
+    if "emailId" in candidates:
+        candidates["emailId"] = _customer_emails(candidates["emailId"])
+
+    fields = {}
+    for field, values in candidates.items():
+        picked = _pick(values, LABELLED_CONFIDENCE, AMBIGUOUS_LABELLED_CONFIDENCE)
+        if picked is not None:
+            fields[field] = {"value": picked[0], "confidence": picked[1], "rule": "labelled"}
+
+    for field, (pattern, confidence, normalize) in UNLABELLED_RULES.items():
+        if field in fields:
+            continue
+        values = [normalize(match.group(1)) for match in pattern.finditer(text)]
+        if field == "emailId":
+            values = _customer_emails(values)
+        picked = _pick(values, confidence, AMBIGUOUS_UNLABELLED_CONFIDENCE)
+        if picked is not None:
+            fields[field] = {"value": picked[0], "confidence": picked[1], "rule": "unlabelled"}
+
+    gst = _extract_gst_percentage(text)
+    if gst is not None:
+        fields["gstPercentage"] = {"value": gst[0], "confidence": gst[1], "rule": "labelled"}
+    return fields
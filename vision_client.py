@@ -0,0 +1,103 @@
+import itertools
+import threading
+import os
+import grpc
+from google.auth import api_key
+from google.cloud.vision_v1 import ImageAnnotatorClient
+from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Vision API endpoint; point it at a local stub for testing and benchmarks
+VISION_API_ENDPOINT = os.getenv("VISION_API_ENDPOINT", "vision.googleapis.com")
+
+# Use a plaintext channel without credentials (only for local stubs)
+VISION_API_INSECURE = os.getenv("VISION_API_INSECURE", "false").lower() == "true"
+
+# Number of gRPC channels (HTTP/2 connections) requests are spread over
+VISION_CHANNEL_POOL_SIZE = max(1, int(os.getenv("VISION_CHANNEL_POOL_SIZE", "4")))
+
+# Interval of the keepalive pings that stop idle connections from being dropped, in seconds
+VISION_KEEPALIVE_SECONDS = int(os.getenv("VISION_KEEPALIVE_SECONDS", "30"))
+
+class VisionClientManager:
+    """
+    Process-wide pool of Vision API clients.
+
+    Clients are created lazily on first use and shared by every request, so
+    channel setup, TLS handshake and auth are paid once per channel instead
+    of once per document. Requests are spread round-robin over the pool.
+    """
+
+    def __init__(self, api_key_value=None, endpoint=VISION_API_ENDPOINT, pool_size=VISION_CHANNEL_POOL_SIZE,
+                 keepalive_seconds=VISION_KEEPALIVE_SECONDS, insecure=VISION_API_INSECURE):
+        self.api_key = api_key_value or os.getenv("GOOGLE_CLOUD_VISION_API_KEY")
+        self.endpoint = endpoint
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.insecure = insecure
+        self._clients = []
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def _channel_options(self):
+        return [
+            # Each channel of the pool gets its own connection instead of sharing
+            # the global subchannel of identical channels
+            ("grpc.use_local_subchannel_pool", 1),
+            ("grpc.keepalive_time_ms", self.keepalive_seconds * 1000),
+            ("grpc.keepalive_timeout_ms", 10000),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            # Batches of page images and their annotations exceed the 4 MB default
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1)
+        ]
+
+    def _create_client(self):
+        if not self.insecure and not self.api_key:
+            raise ValueError("GOOGLE_CLOUD_VISION_API_KEY not found in environment variables. Please check your .env file.")
+        if self.insecure:
+            channel = grpc.insecure_channel(self.endpoint, options=self._channel_options())
+        else:
+            channel = ImageAnnotatorGrpcTransport.create_channel(
+                self.endpoint,
+                credentials=api_key.Credentials(self.api_key),
+                options=self._channel_options()
+            )
+        return ImageAnnotatorClient(transport=ImageAnnotatorGrpcTransport(channel=channel))
+
+    def get_client(self):
+        """
+        Return the next client of the pool, creating the pool on first use
+        """
+        with self._lock:
+            if not self._clients:
+                self._clients = [self._create_client() for _ in range(self.pool_size)]
+                self._cycle = itertools.cycle(self._clients)
+            return next(self._cycle)
+
+    def close(self):
+        """
+        Close every channel of the pool; the next get_client() creates a new one
+        """
+        with self._lock:
+            clients, self._clients, self._cycle = self._clients, [], None
+        for client in clients:
+            client.transport.close()
+
+_vision_clients = VisionClientManager()
+
+def get_vision_client():
+    """
+    Return a shared Vision API client from the process-wide pool
+    """
+    return _vision_clients.get_client()
+
+def close_vision_clients():
+    """
+    Close the shared Vision API channels (called on application shutdown)
+    """
+    _vision_clients.close()
@@ -1,139 +1,822 @@
-import google.generativeai as genai
 from google.cloud import vision
 import fitz  # PyMuPDF for PDF processing
 import base64
 import json
+import hashlib
 import io
 from PIL import Image
 import os
+import asyncio
+import random
+import threading
+import unicodedata
+import tempfile
 from google.cloud import vision_v1
-from google.cloud.vision_v1 import ImageAnnotatorClient
-from google.api_core import client_options
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
-from models import CovertonImpKeys, MedicalInsuranceResponse
+from models import CovertonImpKeys, MedicalInsuranceResponse, MedicalInsurance
+from result_cache import RESULT_CACHE_ENABLED, make_cache_key, get_result_cache
+from ocr_cache import OCR_CACHE_ENABLED, get_ocr_cache, document_page_hashes
+from near_duplicates import NEAR_DUPLICATE_ENABLED, NEAR_DUPLICATE_REUSE_RESULTS, get_near_duplicate_index
+from medical_chunking import TextChunker, split_text_into_chunks, merge_medical_partials, MEMBER_SLOTS
+from section_router import SectionRouter, MEDICAL_SECTION_GROUPS
+from page_renderer import render_page, render_settings
+from render_pool import RENDER_WORKERS, get_render_pool, render_page_range, render_batches
+from vision_client import get_vision_client
+from layout_templates import LAYOUT_TEMPLATES_ENABLED, LAYOUT_LEARN, LAYOUT_MIN_CONFIDENCE, read_pdf_layout, get_layout_index
+from vehicle_rules import VEHICLE_RULES_MODE, VEHICLE_RULES_MIN_CONFIDENCE, extract_vehicle_fields
+from llm_extractors import LlmRetryableError, get_llm_extractor, extractor_spec_for_product
+from ocr_backends import (
+    OCR_BACKEND, OCR_ROUTING, OCR_LOCAL_BACKEND, _text_detection_features, page_result_from_response,
+    get_ocr_backend, route_ocr_page
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# API Keys from environment variables (secure)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GOOGLE_CLOUD_VISION_API_KEY = os.getenv("GOOGLE_CLOUD_VISION_API_KEY")
+# API keys are read from the environment when the Vision clients and the
+# Gemini extractor are first created (see vision_client.py and llm_extractors.py)
 
-# Validate API keys are loaded
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables. Please check your .env file.")
-if not GOOGLE_CLOUD_VISION_API_KEY:
-    raise ValueError("GOOGLE_CLOUD_VISION_API_KEY not found in environment variables. Please check your .env file.")
+# Long medical documents are split into chunks of pages that are extracted in
+# parallel and merged: "auto" chunks above MEDICAL_CHUNK_THRESHOLD_CHARS, "always" or "never"
+MEDICAL_CHUNKED_EXTRACTION = os.getenv("MEDICAL_CHUNKED_EXTRACTION", "auto")
+MEDICAL_CHUNK_THRESHOLD_CHARS = int(os.getenv("MEDICAL_CHUNK_THRESHOLD_CHARS", "30000"))
+MEDICAL_CHUNK_MAX_CHARS = int(os.getenv("MEDICAL_CHUNK_MAX_CHARS", "12000"))
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("models/gemini-1.5-pro")
+# Medical documents with many pages are extracted per section group from only the
+# pages the section router picks for it: "auto" routes documents with at
+# least MEDICAL_ROUTING_MIN_PAGES pages, "always" or "never". Routing takes
+# precedence over chunked extraction: the routed pages of a group are
+# themselves extracted in chunks when they exceed MEDICAL_CHUNK_THRESHOLD_CHARS.
+MEDICAL_SECTION_ROUTING = os.getenv("MEDICAL_SECTION_ROUTING", "auto")
+MEDICAL_ROUTING_MIN_PAGES = int(os.getenv("MEDICAL_ROUTING_MIN_PAGES", "4"))
 
-async def extract_text_from_pdf_with_vision(pdf_file, insurance_type, vehicle_type=None):
+# Pages routed to a section group: its MEDICAL_ROUTING_TOP_K best scoring pages, and
+# every other page scoring at least MEDICAL_ROUTING_MIN_SCORE_RATIO of the best one,
+# so a section spread over many pages (a long member list) is sent whole
+MEDICAL_ROUTING_TOP_K = int(os.getenv("MEDICAL_ROUTING_TOP_K", "3"))
+MEDICAL_ROUTING_MIN_SCORE_RATIO = float(os.getenv("MEDICAL_ROUTING_MIN_SCORE_RATIO", "0.5"))
+
+# Added to the medical prompt when only part of the document is sent
+MEDICAL_CHUNK_NOTE = """
+
+    NOTE: The document text below is part {part} of a longer document. Extract only the information present in this part and leave every other field as an empty string."""
+
+# Bump whenever the Gemini prompts or output schema change so cached results are not reused
+PROMPT_VERSION = "4"
+
+# Maximum number of Vision API requests in flight at the same time for one document
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "8"))
+
+# Maximum number of Vision API requests in flight across all documents being processed
+OCR_GLOBAL_CONCURRENCY = int(os.getenv("OCR_GLOBAL_CONCURRENCY", "16"))
+
+# Maximum number of LLM extractor calls in flight across all documents being processed
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+
+# Per-call timeout for LLM extractor requests, in seconds
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "120"))
+
+# Retries for rate-limited (429), server-side (5xx) and timed out LLM extractor calls
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+
+# Base delay of the jittered exponential backoff between LLM extractor retries, in seconds
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "1.0"))
+
+# LLM extractor errors worth retrying: rate limiting and transient server-side failures
+GEMINI_RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    LlmRetryableError,
+    asyncio.TimeoutError
+)
+
+# Process-wide limits shared by every request, job and batch
+ocr_global_semaphore = asyncio.Semaphore(OCR_GLOBAL_CONCURRENCY)
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Number of page images grouped into one batch_annotate_images request (Vision API allows up to 16)
+OCR_BATCH_SIZE = max(1, min(int(os.getenv("OCR_BATCH_SIZE", "8")), 16))
+
+# "image" renders pages and sends them with batch_annotate_images,
+# "pdf" sends the PDF itself to the files:annotate endpoint
+OCR_MODE = os.getenv("OCR_MODE", "image")
+
+# files:annotate only processes 5 pages of a PDF per request
+PDF_ANNOTATE_MAX_PAGES = 5
+
+# Read the embedded text layer of born-digital pages instead of OCRing them
+TEXT_LAYER_FAST_PATH = os.getenv("TEXT_LAYER_FAST_PATH", "true").lower() == "true"
+
+# Minimum text layer density (characters per 100x100 pt of page area) to trust the text layer
+TEXT_LAYER_MIN_DENSITY = float(os.getenv("TEXT_LAYER_MIN_DENSITY", "2.0"))
+
+# Pages whose images cover more than this fraction of the page are OCRed (scans, photos of documents)
+TEXT_LAYER_MAX_IMAGE_COVERAGE = float(os.getenv("TEXT_LAYER_MAX_IMAGE_COVERAGE", "0.5"))
+
+# Maximum fraction of unreadable glyphs (broken font encodings) in a usable text layer
+TEXT_LAYER_MAX_GARBLED_RATIO = float(os.getenv("TEXT_LAYER_MAX_GARBLED_RATIO", "0.05"))
+
+# Uploads are copied to disk in chunks of this size instead of being read into memory at once
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Directory for spooled uploads (system temp directory when not set)
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+
+# Maximum number of read pages waiting for the classify stage of the pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+
+# PyMuPDF is not thread-safe, so page rendering is serialized while the
+# Vision API calls themselves run concurrently
+_fitz_lock = threading.Lock()
+
+def render_page_image(pdf_document, page_num, settings=None):
     """
-    Extract text from PDF using Google Cloud Vision API
+    Render a single PDF page for OCR at an adaptive zoom and the configured
+    image encoding. Returns the image bytes and the render info.
+    """
+    with _fitz_lock:
+        return render_page(pdf_document[page_num], settings)
+
+def render_page_batch(pdf_document, page_nums, settings=None):
+    """
+    Render a batch of pages in this process. Returns the page images and their render info.
+    """
+    rendered = [render_page_image(pdf_document, page_num, settings) for page_num in page_nums]
+    return [img_data for img_data, _ in rendered], [render_info for _, render_info in rendered]
+
+def garbled_character_ratio(text):
+    """
+    Fraction of non-whitespace characters that are replacement, private-use,
+    control or unassigned glyphs - the signature of a broken font encoding
+    """
+    characters = [char for char in text if not char.isspace()]
+    if not characters:
+        return 0.0
+    garbled = sum(
+        1 for char in characters
+        if char == "\ufffd" or unicodedata.category(char) in ("Co", "Cc", "Cn")
+    )
+    return garbled / len(characters)
+
+def classify_page_text_layer(page):
+    """
+    Decide whether a page can be read from its text layer or needs OCR.
+    
+    Returns the page text (empty when OCR is needed) and the classifier decision.
+    """
+    text = page.get_text()
+    page_area = abs(page.rect)
+    text_chars = len(text.strip())
+    text_density = text_chars / (page_area / 10000) if page_area else 0.0
+    
+    # Area of the page covered by images, clipped to the page
+    image_area = 0.0
+    for image_info in page.get_image_info():
+        image_area += abs(fitz.Rect(image_info["bbox"]) & page.rect)
+    image_coverage = min(image_area / page_area, 1.0) if page_area else 0.0
+    
+    garbled_ratio = garbled_character_ratio(text)
+    
+    if garbled_ratio > TEXT_LAYER_MAX_GARBLED_RATIO:
+        source, reason = "ocr", "garbled_text_layer"
+    elif text_density < TEXT_LAYER_MIN_DENSITY:
+        source, reason = "ocr", "sparse_text_layer"
+    elif image_coverage > TEXT_LAYER_MAX_IMAGE_COVERAGE:
+        source, reason = "ocr", "image_heavy_page"
+    else:
+        source, reason = "text_layer", "digital_text_layer"
+    
+    decision = {
+        "source": source,
+        "reason": reason,
+        "text_chars": text_chars,
+        "text_density": round(text_density, 2),
+        "image_coverage": round(image_coverage, 3),
+        "garbled_ratio": round(garbled_ratio, 3)
+    }
+    return (text if source == "text_layer" else ""), decision
+
+def classify_pdf_pages(pdf_document):
+    """
+    Run the text layer classifier over every page of a PDF (blocking call)
+    """
+    with _fitz_lock:
+        return [classify_page_text_layer(pdf_document[page_num]) for page_num in range(len(pdf_document))]
+
+def detect_pdf_text_batch(client, pdf_path, page_nums):
     """
+    OCR a range of pages by sending the PDF itself to files:annotate (blocking call)
+    """
+    # The PDF bytes are only held in memory for the duration of the request
+    with open(pdf_path, "rb") as f:
+        pdf_content = f.read()
+    request = vision_v1.AnnotateFileRequest(
+        input_config=vision_v1.InputConfig(content=pdf_content, mime_type="application/pdf"),
+        features=_text_detection_features(),
+        pages=[page_num + 1 for page_num in page_nums]  # 1-based page numbers
+    )
     try:
-        # Read PDF file content
-        pdf_content = await pdf_file.read()
-        
-        # Open PDF with PyMuPDF
-        pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+        response = client.batch_annotate_files(requests=[request])
+        file_response = response.responses[0]
+        if file_response.error.message:
+            raise Exception(file_response.error.message)
+    except Exception as e:
+        return [{"page": page_num + 1, "text": "", "error": f"Vision API Error: {str(e)}"} for page_num in page_nums]
+    
+    # Match the page responses back to their page numbers
+    page_responses = {
+        page_response.context.page_number: page_response
+        for page_response in file_response.responses
+    }
+    results = []
+    for page_num in page_nums:
+        page_response = page_responses.get(page_num + 1)
+        if page_response is None:
+            results.append({"page": page_num + 1, "text": "", "error": "Vision API Error: page missing from response"})
+        else:
+            results.append(page_result_from_response(page_num, page_response))
+    return results
+
+def ocr_rendered_batch(backend, page_nums, images, fingerprints=None):
+    """
+    OCR a batch of rendered pages with an OCR backend, reusing cached text for
+    page images seen before (blocking call). With fingerprints, a (dhash, thumbnail)
+    pair per page, pages that look the same as an earlier page reuse its text too.
+    """
+    use_cache = OCR_CACHE_ENABLED and backend.cacheable
+    page_hashes = [backend.page_key(img_data) for img_data in images]
+    cached_texts = get_ocr_cache().get_many(page_hashes) if use_cache else {}
+    
+    # Pages missing from the cache are looked up by their fingerprint next
+    near_duplicates = {}
+    use_near_duplicates = use_cache and NEAR_DUPLICATE_ENABLED and fingerprints is not None
+    if use_near_duplicates:
+        index = get_near_duplicate_index()
+        for page_hash, (dhash, thumbnail) in zip(page_hashes, fingerprints):
+            if page_hash not in cached_texts:
+                match = index.find(backend.name, dhash, thumbnail)
+                if match is not None:
+                    near_duplicates[page_hash] = match
+        matched_texts = get_ocr_cache().get_many([match["page_key"] for match in near_duplicates.values()])
+        near_duplicates = {
+            page_hash: match for page_hash, match in near_duplicates.items()
+            if match["page_key"] in matched_texts
+        }
+    
+    # Only pages that have not been OCRed before go to the OCR engine
+    uncached = [
+        (page_num, img_data) for page_num, img_data, page_hash in zip(page_nums, images, page_hashes)
+        if page_hash not in cached_texts and page_hash not in near_duplicates
+    ]
+    ocr_results = {}
+    if uncached:
+        uncached_page_nums = [page_num for page_num, _ in uncached]
+        uncached_images = [img_data for _, img_data in uncached]
+        for result in backend.ocr_images(uncached_page_nums, uncached_images):
+            ocr_results[result["page"] - 1] = result
+    
+    results = []
+    new_texts = {}
+    for page_num, page_hash in zip(page_nums, page_hashes):
+        if page_hash in cached_texts:
+            result = {"page": page_num + 1, "text": cached_texts[page_hash], "error": None, "ocr_cache": "hit"}
+        elif page_hash in near_duplicates:
+            # The page is recorded under the key of the page it duplicates
+            match = near_duplicates[page_hash]
+            result = {
+                "page": page_num + 1, "text": matched_texts[match["page_key"]], "error": None,
+                "ocr_cache": "near_duplicate", "near_duplicate": {"distance": match["distance"], "pixel_diff": match["pixel_diff"]}
+            }
+            page_hash = match["page_key"]
+        else:
+            result = dict(ocr_results[page_num], ocr_cache="miss")
+            if not result["error"]:
+                new_texts[page_hash] = result["text"]
+        result["page_hash"] = page_hash
+        results.append(result)
+    
+    if use_cache and new_texts:
+        get_ocr_cache().put_many(new_texts)
+    if use_near_duplicates:
+        # Index the pages read by the engine or found in the cache, so later
+        # near-duplicates of them are found
+        get_near_duplicate_index().add_many(backend.name, {
+            page_hash: fingerprint for page_hash, fingerprint in zip(page_hashes, fingerprints)
+            if page_hash in new_texts or page_hash in cached_texts
+        })
+    return results
+
+async def ocr_pdf_pages(pdf_document, backend, pdf_path=None, max_concurrency=None, batch_size=None, mode=None, page_nums=None, on_batch_done=None):
+    """
+    OCR pages of a PDF (all pages unless page_nums is given) with batched OCR
+    backend requests, several batches in flight at once. The async on_batch_done(results)
+    is called with the page results of each batch as it finishes.
+    
+    Returns one dict per page, in page order: {"page": 1, "text": "...", "error": None}.
+    A failed page gets an error message and empty text instead of failing the whole document.
+    """
+    # Only Vision API can read the PDF itself
+    mode = (mode or OCR_MODE) if backend.name == "vision" else "image"
+    batch_size = min(batch_size or OCR_BATCH_SIZE, backend.max_batch_size)
+    if mode == "pdf":
+        batch_size = min(batch_size, PDF_ANNOTATE_MAX_PAGES)
+    semaphore = asyncio.Semaphore(max_concurrency or OCR_MAX_CONCURRENCY)
+    
+    if page_nums is None:
+        page_nums = list(range(len(pdf_document)))
+    batches = [
+        page_nums[first:first + batch_size]
+        for first in range(0, len(page_nums), batch_size)
+    ]
+    
+    if mode == "pdf":
+        async def ocr_batch(page_nums):
+            async with semaphore, ocr_global_semaphore:
+                # Run the blocking Vision call off the event loop
+                results = await asyncio.to_thread(detect_pdf_text_batch, get_vision_client(), pdf_path, page_nums)
+            for result in results:
+                result["ocr_backend"] = backend.name
+            if on_batch_done:
+                await on_batch_done(results)
+            return results
         
-        # Initialize Vision API client with API key
-        client_options_obj = client_options.ClientOptions(
-            api_key=GOOGLE_CLOUD_VISION_API_KEY
+        # gather preserves the order of the batches regardless of completion order
+        batch_results = await asyncio.gather(*(ocr_batch(page_nums) for page_nums in batches))
+        return [page for batch in batch_results for page in batch]
+    
+    # Pages are rendered in worker processes (or a thread when there is no pool or
+    # no file to reopen) and handed to the OCR stage through a bounded queue
+    settings = render_settings(fingerprint=NEAR_DUPLICATE_ENABLED and backend.cacheable)
+    pool = get_render_pool() if pdf_path else None
+    
+    async def render_batch(page_nums):
+        if pool:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, render_page_range, pdf_path, page_nums, settings)
+        return await asyncio.to_thread(render_page_batch, pdf_document, page_nums, settings)
+    
+    async def ocr_batch(page_nums, images, renders):
+        # The fingerprints are used for the lookup only, not reported with the render
+        fingerprints = None
+        if settings["fingerprint"]:
+            fingerprints = [(render_info.pop("dhash"), render_info.pop("thumbnail")) for render_info in renders]
+        try:
+            async with ocr_global_semaphore:
+                # Run the blocking OCR call off the event loop
+                results = await asyncio.to_thread(ocr_rendered_batch, backend, page_nums, images, fingerprints)
+        finally:
+            semaphore.release()
+        for result, render_info in zip(results, renders):
+            result["render"] = render_info
+            result["ocr_backend"] = backend.name
+        if on_batch_done:
+            await on_batch_done(results)
+        return results
+    
+    tasks = []
+    failed_pages = []
+    rendered = render_batches(batches, render_batch, RENDER_WORKERS if pool else 1)
+    try:
+        async for page_nums, images, renders, error in rendered:
+            if error:
+                failed = [{"page": page_num + 1, "text": "", "error": f"Render Error: {str(error)}"} for page_num in page_nums]
+                failed_pages.extend(failed)
+                if on_batch_done:
+                    await on_batch_done(failed)
+                continue
+            # Take an OCR slot before accepting more rendered pages, so the images held
+            # in memory are bounded by the render queue plus the batches being OCRed
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(ocr_batch(page_nums, images, renders)))
+        batch_results = await asyncio.gather(*tasks)
+    finally:
+        await rendered.aclose()
+        for task in tasks:
+            task.cancel()
+    
+    # Batches finish in any order
+    pages = failed_pages + [page for batch in batch_results for page in batch]
+    return sorted(pages, key=lambda page: page["page"])
+
+async def extract_pdf_pages(pdf_document, pdf_path=None, max_concurrency=None, progress_callback=None, page_queue=None, ocr_backend=None):
+    """
+    Read every page of a PDF, taking born-digital pages from their text layer
+    and rendering and OCRing only the pages that need it.
+    
+    Returns one dict per page, in page order, with the text, the source it
+    was read from, any OCR error and the text layer classifier decision.
+    progress_callback(pages_done, pages_total) is called as pages are read,
+    and every page is also put on page_queue (in completion order) when given.
+    Pages are OCRed with ocr_backend when given, otherwise with the backend
+    the OCR routing policy picks for each page.
+    """
+    page_count = len(pdf_document)
+    if TEXT_LAYER_FAST_PATH:
+        classified = await asyncio.to_thread(classify_pdf_pages, pdf_document)
+    else:
+        classified = [("", {"source": "ocr", "reason": "fast_path_disabled"})] * page_count
+    
+    pages = [
+        {"page": page_num + 1, "text": text, "error": None, "source": decision["source"], "classifier": decision}
+        for page_num, (text, decision) in enumerate(classified)
+    ]
+    
+    ocr_page_nums = [page_num for page_num in range(page_count) if pages[page_num]["source"] == "ocr"]
+    
+    pages_done = page_count - len(ocr_page_nums)
+    if progress_callback:
+        progress_callback(pages_done, page_count)
+    if page_queue:
+        for page in pages:
+            if page["source"] != "ocr":
+                await page_queue.put(page)
+    
+    async def on_batch_done(results):
+        nonlocal pages_done
+        for result in results:
+            pages[result["page"] - 1].update(result)
+        pages_done += len(results)
+        if progress_callback:
+            progress_callback(pages_done, page_count)
+        if page_queue:
+            for result in results:
+                await page_queue.put(pages[result["page"] - 1])
+    
+    # Group the pages by the OCR backend that reads them
+    backend_page_nums = {}
+    for page_num in ocr_page_nums:
+        backend_name = route_ocr_page(pages[page_num]["classifier"], ocr_backend)
+        backend_page_nums.setdefault(backend_name, []).append(page_num)
+    
+    # Page results are merged into pages by on_batch_done as each batch finishes
+    await asyncio.gather(*(
+        ocr_pdf_pages(
+            pdf_document, get_ocr_backend(backend_name), pdf_path, max_concurrency,
+            page_nums=page_nums, on_batch_done=on_batch_done
         )
-        client = ImageAnnotatorClient(client_options=client_options_obj)
+        for backend_name, page_nums in backend_page_nums.items()
+    ))
+    
+    return pages
+
+def attach_processing_metadata(result, metadata):
+    """
+    Attach per-document processing metadata to a successful classification result
+    """
+    if isinstance(result, dict):
+        result.setdefault("processing_metadata", {}).update(metadata)
+    return result
+
+async def spool_upload(pdf_file):
+    """
+    Copy an uploaded file to a temp file in chunks, without holding the whole
+    upload in memory. Returns the temp file path and the SHA-256 of the content.
+    """
+    sha256 = hashlib.sha256()
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf", dir=PDF_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await pdf_file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(pdf_path)
+        raise
+    return pdf_path, sha256.hexdigest()
+
+def hash_file(path):
+    """
+    SHA-256 of a file, read in chunks
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def read_document_layout(pdf_document):
+    """
+    Positioned text lines of the first pages of a PDF, for layout fingerprinting (blocking call)
+    """
+    with _fitz_lock:
+        return read_pdf_layout(pdf_document)
+
+async def match_document_layout(pdf_document, insurance_type):
+    """
+    Match a vehicle policy against the known insurer layouts and read its
+    templated fields; None when templates are disabled or the first page has no text layer
+    """
+    if insurance_type != "vehicle" or not LAYOUT_TEMPLATES_ENABLED:
+        return None
+    try:
+        layout = await asyncio.to_thread(read_document_layout, pdf_document)
+        return await asyncio.to_thread(get_layout_index().lookup, layout)
+    except Exception as e:
+        # The template fast path is an optimization; the LLM extracts every field without it
+        print(f"Layout matching failed: {str(e)}")
+        return None
+
+async def learn_document_layout(layout_match, result):
+    """
+    Update the layout index from a classified vehicle policy and return the layout metadata
+    """
+    if layout_match is None:
+        return None
+    metadata = {
+        "layout_id": layout_match["layout_id"],
+        "insurer": layout_match["insurer"],
+        "similarity": layout_match["score"],
+        "fields": {field: match["confidence"] for field, match in layout_match["fields"].items()}
+    }
+    if LAYOUT_LEARN and is_processed_result(result) and isinstance(result.get("Coverton imp_keys"), dict):
+        # Fields read by the template itself are no evidence for or against it
+        prefilled = result.get("processing_metadata", {}).get("vehicle_rules", {}).get("prefilled", {})
+        skip_fields = {field for field, rule in prefilled.items() if rule == "layout"} | set(VEHICLE_DEFAULT_FIELDS)
+        try:
+            metadata["layout_id"] = await asyncio.to_thread(
+                get_layout_index().learn, layout_match, result["Coverton imp_keys"], skip_fields
+            )
+        except Exception as e:
+            print(f"Layout learning failed: {str(e)}")
+    return metadata
+
+async def find_near_duplicate_result(pages, pdf_sha256, insurance_type, vehicle_type=None, ocr_backend=None):
+    """
+    Return (pdf_sha256, result) of an earlier document with the same page texts,
+    when some pages were only found by their fingerprint and its result is
+    still cached, otherwise (None, None)
+    """
+    if not (NEAR_DUPLICATE_REUSE_RESULTS and OCR_CACHE_ENABLED and RESULT_CACHE_ENABLED):
+        return None, None
+    if any(page["error"] for page in pages) or not any(page.get("ocr_cache") == "near_duplicate" for page in pages):
+        return None, None
+    
+    original_sha256 = await asyncio.to_thread(get_ocr_cache().find_document, document_page_hashes(pages), pdf_sha256)
+    if original_sha256 is None:
+        return None, None
+    product_type = product_type_for(insurance_type, vehicle_type)
+    result = await asyncio.to_thread(get_result_cache().get, result_cache_key(original_sha256, product_type, ocr_backend))
+    if result is None:
+        return None, None
+    get_near_duplicate_index().record_document_hit()
+    return original_sha256, result
+
+async def extract_text_from_pdf_with_vision(pdf_file, insurance_type, vehicle_type=None, max_concurrency=None):
+    """
+    Extract text from PDF using Google Cloud Vision API
+    """
+    try:
+        # Spool the upload to disk instead of reading it into memory
+        pdf_path, pdf_sha256 = await spool_upload(pdf_file)
+    except Exception as e:
+        return f"⚠️ Error processing PDF: {str(e)}"
+    
+    try:
+        return await extract_text_from_pdf_path(pdf_path, insurance_type, vehicle_type, max_concurrency, pdf_sha256=pdf_sha256)
+    finally:
+        os.remove(pdf_path)
+
+async def extract_text_from_pdf_path(pdf_path, insurance_type, vehicle_type=None, max_concurrency=None, progress_callback=None, pdf_sha256=None, ocr_backend=None):
+    """
+    Extract text from a PDF file on disk and classify the fields with Gemini AI
+    """
+    try:
+        # Open PDF with PyMuPDF by path, so pages are loaded from disk on demand
+        pdf_document = fitz.open(pdf_path)
         
-        all_text = []
+        # Render -> OCR -> classify pipeline: read pages flow to the classify stage
+        # through a bounded queue, so routing and chunk extraction start on the
+        # first pages while later ones are still being OCRed
+        page_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stream = StreamingClassifier(len(pdf_document), insurance_type, vehicle_type)
+        consume_task = asyncio.create_task(stream.consume(page_queue))
+        # Read the text layer where possible and OCR the remaining pages in
+        # concurrent batches, while the layout is matched against known templates
+        extraction = asyncio.gather(
+            extract_pdf_pages(pdf_document, pdf_path, max_concurrency, progress_callback, page_queue, ocr_backend),
+            match_document_layout(pdf_document, insurance_type)
+        )
+        try:
+            # A failure on either side of the queue stops the other, so neither
+            # is left waiting on the queue forever
+            done, _ = await asyncio.wait([extraction, consume_task], return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            pages, layout_match = extraction.result()
+        except BaseException:
+            extraction.cancel()
+            consume_task.cancel()
+            stream.cancel()
+            await asyncio.gather(extraction, consume_task, *stream.chunk_tasks, return_exceptions=True)
+            raise
+        finally:
+            pdf_document.close()
         
-        # Process each page
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            
-            # Convert PDF page to image
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Higher resolution
-            img_data = pix.tobytes("png")
-            
-            # Create image object for Vision API
-            image = vision_v1.Image(content=img_data)
-            
-            # Perform text detection
-            response = client.text_detection(image=image)
-            texts = response.text_annotations
-            
-            if texts:
-                # Extract text from the first annotation (contains all text)
-                page_text = texts[0].description
-                all_text.append(page_text)
-            
-            if response.error.message:
-                raise Exception(f"Vision API Error: {response.error.message}")
+        # Only give up when no page could be read at all
+        failed_pages = [page for page in pages if page["error"]]
+        if pages and len(failed_pages) == len(pages):
+            stream.cancel()
+            raise Exception(failed_pages[0]["error"])
         
-        pdf_document.close()
+        if layout_match is not None:
+            stream.layout_fields = {
+                field: match for field, match in layout_match["fields"].items()
+                if match["confidence"] >= LAYOUT_MIN_CONFIDENCE
+            }
         
-        # Combine all text
-        full_text = "\n".join(all_text)
+        async def cache_document_pages():
+            # Keep the page texts so the Gemini stage can be rerun without OCR
+            sha256 = pdf_sha256 or await asyncio.to_thread(hash_file, pdf_path)
+            if OCR_CACHE_ENABLED:
+                await asyncio.to_thread(get_ocr_cache().put_document, sha256, pages)
+            return sha256
         
-        # Process with Gemini AI for field classification based on insurance type
-        if insurance_type == "vehicle":
-            return classify_vehicle_fields_with_gemini(full_text, vehicle_type)
-        elif insurance_type == "medical":
-            return classify_medical_fields_with_gemini(full_text)
+        near_duplicate_of, result = await find_near_duplicate_result(pages, pdf_sha256, insurance_type, vehicle_type, ocr_backend)
+        if result is not None:
+            # Every page matches a document processed before, so its extraction is reused
+            stream.cancel()
+            pdf_sha256 = await cache_document_pages()
+            layout_metadata = None
         else:
-            return f"⚠️ Error: Invalid insurance type: {insurance_type}"
+            try:
+                pdf_sha256, result = await asyncio.gather(cache_document_pages(), stream.classify())
+            except BaseException:
+                stream.cancel()
+                raise
+            
+            layout_metadata = await learn_document_layout(layout_match, result)
+        
+        metadata = {
+            "pdf_sha256": pdf_sha256,
+            "ocr_mode": OCR_MODE,
+            "page_count": len(pages),
+            "ocr_page_count": sum(1 for page in pages if page["source"] == "ocr"),
+            "ocr_cache_hits": sum(1 for page in pages if page.get("ocr_cache") == "hit"),
+            "ocr_near_duplicates": sum(1 for page in pages if page.get("ocr_cache") == "near_duplicate"),
+            "near_duplicate_of": near_duplicate_of,
+            "ocr_backends": sorted({page["ocr_backend"] for page in pages if page.get("ocr_backend")}),
+            "llm_extractor": stream.extractor.name,
+            "layout": layout_metadata,
+            "render_settings": render_settings() if OCR_MODE == "image" else None,
+            "ocr_image_bytes": sum(page["render"]["bytes"] for page in pages if page.get("render")),
+            "pages": [
+                {
+                    "page": page["page"],
+                    "source": page["source"],
+                    "ocr_backend": page.get("ocr_backend"),
+                    "ocr_cache": page.get("ocr_cache"),
+                    "near_duplicate": page.get("near_duplicate"),
+                    "render": page.get("render"),
+                    "error": page["error"],
+                    "classifier": page["classifier"]
+                }
+                for page in pages
+            ]
+        }
+        return attach_processing_metadata(result, metadata)
         
     except Exception as e:
         return f"⚠️ Error processing PDF: {str(e)}"
 
-def classify_vehicle_fields_with_gemini(extracted_text, vehicle_type):
+def product_type_for(insurance_type, vehicle_type=None):
+    """
+    Convert (insurance_type, vehicle_type) back into the product type (CAR, BIKE or HEALTH)
+    """
+    if insurance_type == "vehicle":
+        return (vehicle_type or "").upper()
+    return "HEALTH" if insurance_type == "medical" else None
+
+def extractor_for(insurance_type, vehicle_type=None):
+    """
+    The LLM extractor configured for the product type of a document
+    """
+    return get_llm_extractor(extractor_spec_for_product(product_type_for(insurance_type, vehicle_type)))
+
+async def classify_document_text(full_text, insurance_type, vehicle_type=None, page_texts=None, extractor=None, layout_fields=None):
     """
-    Use Gemini AI to classify vehicle insurance fields and return JSON in specified format
+    Run the LLM classification stage on already extracted document text
     """
-    prompt = f"""
+    try:
+        extractor = extractor or extractor_for(insurance_type, vehicle_type)
+    except Exception as e:
+        return f"⚠️ Gemini AI error: {str(e)}"
+    
+    # Process with the LLM extractor for field classification based on insurance type
+    if insurance_type == "vehicle":
+        return await classify_vehicle_fields_with_gemini(full_text, vehicle_type, extractor, layout_fields)
+    elif insurance_type == "medical":
+        return await classify_medical_fields_with_gemini(full_text, page_texts, extractor)
+    else:
+        return f"⚠️ Error: Invalid insurance type: {insurance_type}"
+
+async def generate_llm_text(prompt, extractor=None):
+    """
+    Call the LLM extractor (the configured one unless given) under the shared
+    concurrency limit, with a per-call timeout and jittered exponential
+    backoff on 429/5xx errors
+    """
+    extractor = extractor or get_llm_extractor()
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        try:
+            async with gemini_semaphore:
+                return await asyncio.wait_for(extractor.generate(prompt), timeout=GEMINI_TIMEOUT_SECONDS)
+        except GEMINI_RETRYABLE_ERRORS as e:
+            if attempt == GEMINI_MAX_RETRIES:
+                if isinstance(e, asyncio.TimeoutError):
+                    raise Exception(f"{extractor.name} request timed out after {GEMINI_TIMEOUT_SECONDS}s")
+                raise
+            # Full jitter keeps concurrent retries from hitting the API in lockstep
+            await asyncio.sleep(random.uniform(0, GEMINI_RETRY_BASE_DELAY * 2 ** attempt))
+
+# Vehicle fields the prompt sets to fixed defaults rather than reading them from the document
+VEHICLE_DEFAULT_FIELDS = ("category", "product", "state", "remarks", "subProduct")
+
+def vehicle_field_template(vehicle_type):
+    """
+    Fields of the vehicle JSON format with their default values, in output order
+    """
+    return {
+        "insuranceCompany": "",
+        "category": vehicle_type,
+        "product": "Motor",
+        "policyno": "",
+        "lastName": "",
+        "firstName": "",
+        "dob": "",
+        "emailId": "",
+        "phoneNo": "",
+        "lane1": "",
+        "lane2": "",
+        "area": "",
+        "state": "Tamil Nadu",
+        "pincode": "",
+        "adharNo": None,
+        "panNo": None,
+        "remarks": None,
+        "subProduct": vehicle_type,
+        "policyissuedDate": "",
+        "commenceMentDate": "",
+        "policyEndDate": "",
+        "sumInsuredIdv": "",
+        "grossPremium": None,
+        "gstPercentage": "",
+        "plan": ""
+    }
+
+def build_vehicle_prompt(extracted_text, vehicle_type, fields=None):
+    """
+    Build the Gemini prompt for vehicle insurance field extraction, asking only for the given fields (all when None)
+    """
+    template = vehicle_field_template(vehicle_type)
+    requested = {field: value for field, value in template.items() if fields is None or field in fields}
+    json_format = json.dumps({"Coverton imp_keys": requested}, indent=4).replace("\n", "\n    ")
+    
+    # Fields filled by the rule pre-extractor are left out of the format and the instructions
+    partial_note = ""
+    if len(requested) < len(template):
+        partial_note = """
+
+    NOTE: The other policy fields were already extracted. Return only the fields in the JSON format below."""
+    
+    phone_rules = ""
+    if "phoneNo" in requested:
+        phone_rules = """
+    CRITICAL PHONE NUMBER EXTRACTION RULES:
+    - Look for phone numbers in formats: 10-digit, 11-digit, or 12-digit numbers
+    - Search for keywords: "phone", "mobile", "cell", "cellno", "contact", "tel", "telephone"
+    - Extract any number that appears to be a contact number
+    - If multiple numbers found, use the most likely customer contact number
+    - Phone number should NOT be null - if not found, use empty string ""
+    - Common patterns: 9XXXXXXXXX, 8XXXXXXXXX, 7XXXXXXXXX, 6XXXXXXXXX
+    - Remove any spaces, dashes, or special characters from phone numbers
+"""
+    
+    customer_fields = ", ".join(field for field in ("lastName", "firstName", "dob", "emailId", "phoneNo", "lane1", "lane2", "area", "pincode", "adharNo", "panNo") if field in requested)
+    policy_fields = ", ".join(field for field in ("insuranceCompany", "policyno", "policyissuedDate", "commenceMentDate", "policyEndDate", "sumInsuredIdv", "grossPremium", "gstPercentage") if field in requested)
+    
+    return f"""
     You are an expert vehicle insurance document analyzer. Extract information from the following insurance document text and return it in the exact JSON format specified below.
 
     Vehicle Type Selected: {vehicle_type}
 
-    IMPORTANT: Return ONLY the JSON object, no additional text or explanations.
+    IMPORTANT: Return ONLY the JSON object, no additional text or explanations.{partial_note}
 
     CRITICAL DATE FORMAT RULE: All dates MUST be in "dd-mm-yyyy" format (e.g., "15-03-2024", "01-12-2023")
 
     JSON Format:
-    {{
-        "Coverton imp_keys": {{
-            "insuranceCompany": "",
-            "category": "{vehicle_type}",
-            "product": "Motor",
-            "policyno": "",
-            "lastName": "",
-            "firstName": "",
-            "dob": "",
-            "emailId": "",
-            "phoneNo": "",
-            "lane1": "",
-            "lane2": "",
-            "area": "",
-            "state": "Tamil Nadu",
-            "pincode": "",
-            "adharNo": null,
-            "panNo": null,
-            "remarks": null,
-            "subProduct": "{vehicle_type}",
-            "policyissuedDate": "",
-            "commenceMentDate": "",
-            "policyEndDate": "",
-            "sumInsuredIdv": "",
-            "grossPremium": null,
-            "gstPercentage": "",
-            "plan": ""
-        }}
-    }}
+    {json_format}
 
     Instructions:
-    1. Extract customer information for: lastName, firstName, dob, emailId, phoneNo, lane1, lane2, area, pincode, adharNo, panNo
-    2. Extract policy information for: insuranceCompany, policyno, policyissuedDate, commenceMentDate, policyEndDate, sumInsuredIdv, grossPremium, gstPercentage
+    1. Extract customer information for: {customer_fields or "(already extracted)"}
+    2. Extract policy information for: {policy_fields or "(already extracted)"}
     3. Set category and subProduct to the selected vehicle type
     4. Split address into lane1 and lane2 (lane1 for house number/street, lane2 for full address)
     5. Extract area and pincode from the address
@@ -142,16 +825,7 @@ def classify_vehicle_fields_with_gemini(extracted_text, vehicle_type):
     8. Leave fields as empty string if not found in document
     9. ALL DATES MUST BE IN "dd-mm-yyyy" FORMAT (e.g., "15-03-2024", "01-12-2023")
     10. Extract plan information: Look for text containing "policy", "schedule", or "policy schedule" - usually found in headers or top sections of the document
-
-    CRITICAL PHONE NUMBER EXTRACTION RULES:
-    - Look for phone numbers in formats: 10-digit, 11-digit, or 12-digit numbers
-    - Search for keywords: "phone", "mobile", "cell", "cellno", "contact", "tel", "telephone"
-    - Extract any number that appears to be a contact number
-    - If multiple numbers found, use the most likely customer contact number
-    - Phone number should NOT be null - if not found, use empty string ""
-    - Common patterns: 9XXXXXXXXX, 8XXXXXXXXX, 7XXXXXXXXX, 6XXXXXXXXX
-    - Remove any spaces, dashes, or special characters from phone numbers
-
+{phone_rules}
     CRITICAL NAME EXTRACTION RULES:
     - Extract ANY name found in the document - customer name, insured name, policy holder name, etc.
     - Look for keywords: "name", "insured", "customer", "policy holder", "applicant"
@@ -163,21 +837,55 @@ def classify_vehicle_fields_with_gemini(extracted_text, vehicle_type):
     Document Text:
     {extracted_text}
     """
+
+async def classify_vehicle_fields_with_gemini(extracted_text, vehicle_type, extractor=None, layout_fields=None):
+    """
+    Use the LLM extractor (Gemini AI by default) to classify vehicle insurance fields and return JSON in specified format.
+    Fields the rule pre-extractor or the document's layout template (layout_fields)
+    are confident about are filled without the LLM (see vehicle_rules.py and layout_templates.py).
+    """
+    template = vehicle_field_template(vehicle_type)
+    rule_fields = extract_vehicle_fields(extracted_text) if VEHICLE_RULES_MODE != "off" else {}
+    sources = {
+        field: match for field, match in rule_fields.items()
+        if match["confidence"] >= VEHICLE_RULES_MIN_CONFIDENCE
+    }
+    for field, match in (layout_fields or {}).items():
+        if match["confidence"] > sources.get(field, {}).get("confidence", 0.0):
+            sources[field] = match
+    prefilled = {field: match["value"] for field, match in sources.items()}
+    
+    # Nothing is left for the LLM when only the fields with fixed defaults remain
+    remaining = [field for field in template if field not in prefilled]
+    skip_llm = VEHICLE_RULES_MODE == "rules_only" or all(field in VEHICLE_DEFAULT_FIELDS for field in remaining)
+    rules_metadata = {"vehicle_rules": {
+        "mode": VEHICLE_RULES_MODE,
+        "min_confidence": VEHICLE_RULES_MIN_CONFIDENCE,
+        "fields": rule_fields,
+        "prefilled": {field: match["rule"] for field, match in sources.items()},
+        "llm_skipped": skip_llm
+    }}
     
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up the response to ensure it's valid JSON
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
+        if skip_llm:
+            parsed_json = {"Coverton imp_keys": {}}
+        else:
+            prompt = build_vehicle_prompt(extracted_text, vehicle_type, remaining)
+            response_text = (await generate_llm_text(prompt, extractor)).strip()
+            
+            # Clean up the response to ensure it's valid JSON
+            if response_text.startswith("```json"):
+                response_text = response_text[7:]
+            if response_text.endswith("```"):
+                response_text = response_text[:-3]
+            
+            response_text = response_text.strip()
+            
+            # Parse JSON to validate
+            parsed_json = json.loads(response_text)
         
-        # Parse JSON to validate
-        parsed_json = json.loads(response_text)
+        # Rule values take precedence; fields neither source returned keep their defaults
+        parsed_json["Coverton imp_keys"] = {**template, **parsed_json.get("Coverton imp_keys", {}), **prefilled}
         
         # Ensure phoneNo is not null - if it is, set to empty string
         if parsed_json.get("Coverton imp_keys", {}).get("phoneNo") is None:
@@ -195,25 +903,25 @@ def classify_vehicle_fields_with_gemini(extracted_text, vehicle_type):
         # Validate with Pydantic model (without affecting existing logic)
         try:
             validated_data = CovertonImpKeys(**parsed_json)
-            return validated_data.model_dump()
+            return attach_processing_metadata(validated_data.model_dump(), rules_metadata)
         except Exception as validation_error:
             # If validation fails, return original data (maintain existing behavior)
             print(f"Validation warning: {validation_error}")
-            return parsed_json
+            return attach_processing_metadata(parsed_json, rules_metadata)
         
     except json.JSONDecodeError as e:
         return f"⚠️ JSON parsing error: {str(e)}"
     except Exception as e:
         return f"⚠️ Gemini AI error: {str(e)}"
 
-def classify_medical_fields_with_gemini(extracted_text):
+def build_medical_prompt(extracted_text, chunk_note=""):
     """
-    Use Gemini AI to classify medical insurance fields and return JSON in specified format
+    Build the Gemini prompt for medical insurance field extraction
     """
-    prompt = f"""
+    return f"""
     You are an expert medical insurance document analyzer. Extract information from the following insurance document text and return it in the exact JSON format specified below.
 
-    IMPORTANT: Return ONLY the JSON object, no additional text or explanations.
+    IMPORTANT: Return ONLY the JSON object, no additional text or explanations.{chunk_note}
 
     CRITICAL DATE FORMAT RULE: All dates MUST be in "dd-mm-yyyy" format (e.g., "15-03-2024", "01-12-2023")
 
@@ -487,93 +1195,524 @@ def classify_medical_fields_with_gemini(extracted_text):
     Document Text:
     {extracted_text}
     """
+
+# Per-section extraction instructions used when only some sections are requested
+MEDICAL_SECTION_INSTRUCTIONS = {
+    "gross_premium_and_stamp_duty": 'Look for "Gross Premium" and "Stamp Duty" amounts in premium sections',
+    "risk_details": 'Find "Risk Details" or "Employee/Dependant" information',
+    "installment_details": 'Extract "Installment Details" with installment numbers, percentages, amounts, taxes',
+    "endorsement_schedule_details": 'Look for "Endorsement Schedule" with endorsement numbers and dates',
+    "agent_broker_details": 'Find "Agent/Broker" information with names and addresses',
+    "sales_channel_details": 'Extract "Sales Channel" details with codes and names',
+    "generic_information": 'Get "Generic Information" including company name, insured name, address, plan type - for plan_type, look for text containing "policy", "schedule", or "policy schedule" in headers or top sections',
+    "individual_member_details": 'Look for "Individual Member Details" with names, DOB, relations, occupations - populate member_1, member_2, member_3 based on the order found in document',
+    "nominee_details": 'Find "Nominee Details" with names and relationships',
+    "optional_copayment_details": 'Extract "Optional Copayment" percentages',
+    "amount_details": 'Get "Amount Details" including premium, total premium, CGST, SGST, IGST, GST TDS',
+    "insurer_details": 'Find "Insurer Details" with insured name, office name, address, contact info, GSTIN',
+    "policy_details": 'Extract "Policy Details" with policy name, number, dates, invoice number',
+    "member_details": 'Get "Member Details" with total members, self covered, dependent covered',
+    "co_insurance_details": 'Find "Co-Insurance Details" with company names and share percentages',
+    "premium_details": 'Extract "Premium Details" with net and gross premium',
+    "gst_details": 'Get "GST Details" with CGST, SGST, UGST, IGST amounts',
+    "tpa_details": 'Find "TPA Details" with TPA ID, name, address, contact info',
+    "policy_conditions_extensions_endorsements": 'For "Policy Conditions/Extensions/Endorsements" - extract each condition as separate fields',
+    "third_party_details": 'Find "Third Party Details" with administrator information',
+    "intermediary_agent_details": 'Extract "Intermediary/Agent Details" with names, contacts, health ID cards',
+    "intermediary_details": 'Get "Intermediary Details" with names, codes, contact numbers',
+    "other_insured_person_details": 'Find "Other Insured Person Details" with names, DOB, sum insured, deductibles',
+    "premium_details_all": 'For "Premium Details (All)" - extract each member\'s details as separate fields',
+    "insured_person_premium_details": 'Get "Insured Person Premium Details" with names, relations, gender, DOB, premium, GST',
+    "schedule_of_benefits": 'For "SCHEDULE OF BENEFITS" - extract each benefit as separate fields',
+    "policy_holder_policy_details": 'For "Policy Holder Policy Details" - extract each policy detail as separate fields'
+}
+
+def empty_medical_section(section):
+    """
+    Empty JSON template of a medical insurance section, as used in the prompt
+    """
+    fields = {field: "" for field in MedicalInsurance.model_fields[section].annotation.model_fields}
+    if section == "individual_member_details":
+        return {f"member_{slot + 1}": dict(fields) for slot in range(MEMBER_SLOTS)}
+    return fields
+
+def build_medical_sections_prompt(extracted_text, sections, chunk_note=""):
+    """
+    Build a Gemini prompt that extracts only the given medical insurance sections
+    """
+    json_format = json.dumps(
+        {"medical_insurance": {section: empty_medical_section(section) for section in sections}},
+        indent=4
+    )
+    instructions = "\n".join(
+        f"    {number}. {MEDICAL_SECTION_INSTRUCTIONS[section]}"
+        for number, section in enumerate(sections, start=1)
+    )
+    return f"""
+    You are an expert medical insurance document analyzer. Extract information from the following insurance document text and return it in the exact JSON format specified below.
+
+    IMPORTANT: Return ONLY the JSON object, no additional text or explanations.
+
+    NOTE: The document text below contains only the pages of the document relevant to these sections.{chunk_note}
+
+    CRITICAL DATE FORMAT RULE: All dates MUST be in "dd-mm-yyyy" format (e.g., "15-03-2024", "01-12-2023")
+
+    CRITICAL EXTRACTION RULES:
+    1. Extract ALL possible information from the document - leave NO field empty unless absolutely not found
+    2. For tables, extract each column as a separate field with its corresponding values
+    3. For amounts, include currency symbols and commas as they appear
+    4. For addresses, extract complete address including street, city, state, pincode, and area/locality
+    5. For policy numbers and IDs, extract exact alphanumeric values
+    6. For names, extract full names as they appear - name fields should NEVER be null, use empty string "" if not found
+    7. For tables with multiple rows, use the most relevant or first row data unless the format has numbered slots
+
+    JSON Format:
+    {json_format}
+
+    SPECIFIC EXTRACTION INSTRUCTIONS:
+{instructions}
+
+    Document Text:
+    {extracted_text}
+    """
+
+def parse_gemini_json(response_text):
+    """
+    Strip markdown code fences from a Gemini response and parse the JSON
+    """
+    # Clean up the response to ensure it's valid JSON
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    
+    response_text = response_text.strip()
     
+    # Parse JSON to validate
+    return json.loads(response_text)
+
+def finalize_medical_json(parsed_json):
+    """
+    Normalize extracted medical insurance JSON: fill null names, format dates,
+    add the Coverton imp_keys section and validate
+    """
+    # Ensure name fields are not null in medical insurance
+    medical_data = parsed_json.get("medical_insurance", {})
+    
+    # Check and fix name fields in various sections
+    name_fields_to_check = [
+        "emp_dependant_name", "agent_broker", "name", "insured_name", 
+        "name", "nominee_details.name", "insured", "tpa_name", 
+        "condition_name", "third_party_administrator", "name", 
+        "intermediary_name", "name", "member_name", "name", 
+        "benefit_name", "policy_holder_name"
+    ]
+    
+    # Helper function to safely set nested field
+    def set_nested_field(data, field_path, default_value=""):
+        if field_path in data:
+            if data[field_path] is None:
+                data[field_path] = default_value
+        elif "." in field_path:
+            parts = field_path.split(".")
+            if parts[0] in data and isinstance(data[parts[0]], dict):
+                if data[parts[0]].get(parts[1]) is None:
+                    data[parts[0]][parts[1]] = default_value
+    
+    # Fix name fields in medical insurance
+    for field in name_fields_to_check:
+        set_nested_field(medical_data, field, "")
+    
+    # Format all dates to dd-mm-yyyy format
+    parsed_json = format_dates_in_medical_json(parsed_json)
+    
+    # Add extra Coverton imp_keys section for health insurance
+    extra_coverton_section = extract_coverton_fields_from_medical(parsed_json)
+    if extra_coverton_section:
+        parsed_json["Coverton imp_keys"] = extra_coverton_section
+    
+    # Validate with Pydantic model (without affecting existing logic)
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up the response to ensure it's valid JSON
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
-        # Parse JSON to validate
-        parsed_json = json.loads(response_text)
-        
-        # Ensure name fields are not null in medical insurance
-        medical_data = parsed_json.get("medical_insurance", {})
-        
-        # Check and fix name fields in various sections
-        name_fields_to_check = [
-            "emp_dependant_name", "agent_broker", "name", "insured_name", 
-            "name", "nominee_details.name", "insured", "tpa_name", 
-            "condition_name", "third_party_administrator", "name", 
-            "intermediary_name", "name", "member_name", "name", 
-            "benefit_name", "policy_holder_name"
-        ]
-        
-        # Helper function to safely set nested field
-        def set_nested_field(data, field_path, default_value=""):
-            if field_path in data:
-                if data[field_path] is None:
-                    data[field_path] = default_value
-            elif "." in field_path:
-                parts = field_path.split(".")
-                if parts[0] in data and isinstance(data[parts[0]], dict):
-                    if data[parts[0]].get(parts[1]) is None:
-                        data[parts[0]][parts[1]] = default_value
-        
-        # Fix name fields in medical insurance
-        for field in name_fields_to_check:
-            set_nested_field(medical_data, field, "")
-        
-        # Format all dates to dd-mm-yyyy format
-        parsed_json = format_dates_in_medical_json(parsed_json)
-        
-        # Add extra Coverton imp_keys section for health insurance
-        extra_coverton_section = extract_coverton_fields_from_medical(parsed_json)
-        if extra_coverton_section:
-            parsed_json["Coverton imp_keys"] = extra_coverton_section
-        
-        # Validate with Pydantic model (without affecting existing logic)
-        try:
-            validated_data = MedicalInsuranceResponse(**parsed_json)
-            return validated_data.model_dump()
-        except Exception as validation_error:
-            # If validation fails, return original data (maintain existing behavior)
-            print(f"Validation warning: {validation_error}")
-            return parsed_json
+        validated_data = MedicalInsuranceResponse(**parsed_json)
+        return validated_data.model_dump()
+    except Exception as validation_error:
+        # If validation fails, return original data (maintain existing behavior)
+        print(f"Validation warning: {validation_error}")
+        return parsed_json
+
+def should_route_medical_pages(page_texts):
+    """
+    Decide whether a medical document is extracted per section group from routed pages
+    """
+    if MEDICAL_SECTION_ROUTING == "always":
+        return True
+    if MEDICAL_SECTION_ROUTING == "never":
+        return False
+    return sum(1 for text in page_texts if text) >= MEDICAL_ROUTING_MIN_PAGES
+
+def should_chunk_medical_text(extracted_text):
+    """
+    Decide whether a medical document is extracted in chunks or with a single prompt
+    """
+    if MEDICAL_CHUNKED_EXTRACTION == "always":
+        return True
+    if MEDICAL_CHUNKED_EXTRACTION == "never":
+        return False
+    return len(extracted_text) > MEDICAL_CHUNK_THRESHOLD_CHARS
+
+async def classify_medical_fields_with_gemini(extracted_text, page_texts=None, extractor=None):
+    """
+    Use the LLM extractor (Gemini AI by default) to classify medical insurance fields and return JSON in specified format
+    """
+    if page_texts and should_route_medical_pages(page_texts):
+        return await classify_medical_fields_routed(page_texts, extractor=extractor)
+    if should_chunk_medical_text(extracted_text):
+        return await classify_medical_fields_chunked(page_texts or [extracted_text], extractor)
+    
+    prompt = build_medical_prompt(extracted_text)
+    
+    try:
+        response_text = (await generate_llm_text(prompt, extractor)).strip()
+        parsed_json = parse_gemini_json(response_text)
+        return finalize_medical_json(parsed_json)
         
     except json.JSONDecodeError as e:
         return f"⚠️ JSON parsing error: {str(e)}"
     except Exception as e:
         return f"⚠️ Gemini AI error: {str(e)}"
 
-async def process_insurance_document(pdf_file, product_type, vehicle_type=None):
+async def classify_medical_fields_chunked(page_texts, extractor=None):
     """
-    Main function to process insurance document
+    Map-reduce extraction for long medical documents: extract every chunk of
+    pages in parallel and merge the partial JSON objects in page order
+    """
+    chunks = split_text_into_chunks(page_texts, MEDICAL_CHUNK_MAX_CHARS)
+    
+    # Concurrency is bounded by the shared Gemini semaphore
+    partials = await asyncio.gather(
+        *(extract_medical_chunk(chunk_num, chunk_text, extractor) for chunk_num, chunk_text in enumerate(chunks)),
+        return_exceptions=True
+    )
+    return merge_medical_chunk_results(partials)
+
+async def extract_medical_chunk(chunk_num, chunk_text, extractor=None):
+    """
+    Extract the "medical_insurance" object from one chunk of a long medical document
+    """
+    chunk_note = MEDICAL_CHUNK_NOTE.format(part=chunk_num + 1)
+    response_text = (await generate_llm_text(build_medical_prompt(chunk_text, chunk_note), extractor)).strip()
+    return parse_gemini_json(response_text).get("medical_insurance", {})
+
+def merge_medical_chunk_results(partials, metadata=None):
+    """
+    Merge the chunk extractions (or their exceptions) of a medical document in page order
+    """
+    usable_partials = [partial for partial in partials if isinstance(partial, dict)]
+    failed_chunks = [partial for partial in partials if isinstance(partial, BaseException)]
+    if not usable_partials:
+        if failed_chunks and isinstance(failed_chunks[0], json.JSONDecodeError):
+            return f"⚠️ JSON parsing error: {str(failed_chunks[0])}"
+        return f"⚠️ Gemini AI error: {str(failed_chunks[0]) if failed_chunks else 'no text to extract'}"
+    
+    merged_json = {"medical_insurance": merge_medical_partials(usable_partials)}
+    result = finalize_medical_json(merged_json)
+    return attach_processing_metadata(result, {
+        "medical_extraction": "chunked",
+        "medical_chunks": len(partials),
+        "medical_failed_chunks": len(failed_chunks),
+        **(metadata or {})
+    })
+
+async def classify_medical_fields_routed(page_texts, router=None, extractor=None):
+    """
+    Extract each medical section group in parallel from only the pages the
+    section router ranks highest for it, then merge the groups. A group whose
+    pages are too long for one prompt is extracted in chunks and merged first.
+    router can be a SectionRouter that already indexed page_texts.
+    """
+    routes = (router or SectionRouter(page_texts)).route(MEDICAL_ROUTING_TOP_K, MEDICAL_ROUTING_MIN_SCORE_RATIO)
+    group_names = list(routes)
+    group_chunks = {}
+    
+    async def extract_section_text(group_text, sections, chunk_note=""):
+        prompt = build_medical_sections_prompt(group_text, sections, chunk_note)
+        response_text = (await generate_llm_text(prompt, extractor)).strip()
+        return parse_gemini_json(response_text).get("medical_insurance", {})
+    
+    async def extract_group(group_name):
+        sections = MEDICAL_SECTION_GROUPS[group_name]["sections"]
+        group_pages = [page_texts[page_num] for page_num in routes[group_name]]
+        group_text = "\n".join(text for text in group_pages if text)
+        if MEDICAL_CHUNKED_EXTRACTION == "never" or not should_chunk_medical_text(group_text):
+            return await extract_section_text(group_text, sections)
+        
+        chunks = split_text_into_chunks(group_pages, MEDICAL_CHUNK_MAX_CHARS)
+        group_chunks[group_name] = len(chunks)
+        partials = await asyncio.gather(
+            *(
+                extract_section_text(chunk_text, sections, MEDICAL_CHUNK_NOTE.format(part=chunk_num + 1))
+                for chunk_num, chunk_text in enumerate(chunks)
+            ),
+            return_exceptions=True
+        )
+        usable_partials = [partial for partial in partials if isinstance(partial, dict)]
+        if not usable_partials:
+            raise partials[0]
+        return merge_medical_partials(usable_partials)
+    
+    # Concurrency is bounded by the shared Gemini semaphore
+    partials = await asyncio.gather(*(extract_group(group_name) for group_name in group_names), return_exceptions=True)
+    
+    usable_partials = [partial for partial in partials if isinstance(partial, dict)]
+    failed_groups = [group_name for group_name, partial in zip(group_names, partials) if isinstance(partial, BaseException)]
+    if not usable_partials:
+        first_error = partials[0]
+        if isinstance(first_error, json.JSONDecodeError):
+            return f"⚠️ JSON parsing error: {str(first_error)}"
+        return f"⚠️ Gemini AI error: {str(first_error)}"
+    
+    merged = merge_medical_partials(usable_partials)
+    # Sections of failed groups are returned empty so the response keeps its full shape
+    medical_insurance = {
+        section: merged.get(section) or empty_medical_section(section)
+        for section in MedicalInsurance.model_fields
+    }
+    result = finalize_medical_json({"medical_insurance": medical_insurance})
+    return attach_processing_metadata(result, {
+        "medical_extraction": "routed",
+        "section_routes": {
+            group_name: [page_num + 1 for page_num in page_nums]
+            for group_name, page_nums in routes.items()
+        },
+        "section_chunks": group_chunks,
+        "medical_failed_groups": failed_groups
+    })
+
+class StreamingClassifier:
+    """
+    Classify stage of the render -> OCR -> classify pipeline.
+    
+    Pages are added as they are read, in any order. The pages read so far in
+    page order are indexed by the section router, and once a medical document
+    is known to be extracted in chunks every completed chunk is sent to Gemini
+    right away instead of after the last page. The extraction mode picked is
+    the same as classify_document_text would pick for the whole document.
+    """
+    
+    def __init__(self, page_count, insurance_type, vehicle_type=None):
+        self.page_count = page_count
+        self.insurance_type = insurance_type
+        self.vehicle_type = vehicle_type
+        self.extractor = extractor_for(insurance_type, vehicle_type)
+        # Fields read by the document's layout template, set before classify()
+        self.layout_fields = None
+        self.pages = [None] * page_count
+        # Texts of the pages read so far in page order, how many of them are
+        # non-empty and the length of the non-empty texts joined by newlines
+        self.page_texts = []
+        self.text_pages = 0
+        self.text_chars = -1
+        medical = insurance_type == "medical"
+        self.router = SectionRouter() if medical and MEDICAL_SECTION_ROUTING != "never" else None
+        self.chunker = TextChunker(MEDICAL_CHUNK_MAX_CHARS) if medical and MEDICAL_CHUNKED_EXTRACTION != "never" else None
+        self.pending_chunks = []
+        self.chunk_tasks = []
+        self.chunks_started_early = 0
+    
+    def routing_decision(self):
+        """
+        True or False once it is known whether the document will be routed, None while undecided
+        """
+        if self.router is None or not self.page_count:
+            return False
+        if MEDICAL_SECTION_ROUTING == "always" or self.text_pages >= MEDICAL_ROUTING_MIN_PAGES:
+            return True
+        pages_left = self.page_count - len(self.page_texts)
+        if self.text_pages + pages_left < MEDICAL_ROUTING_MIN_PAGES:
+            return False
+        return None
+    
+    def chunking_decision(self):
+        """
+        True once the document is known to be extracted in chunks
+        """
+        if self.chunker is None or self.routing_decision() is not False:
+            return False
+        return MEDICAL_CHUNKED_EXTRACTION == "always" or self.text_chars > MEDICAL_CHUNK_THRESHOLD_CHARS
+    
+    def _start_pending_chunks(self):
+        # Concurrency is bounded by the shared Gemini semaphore
+        for chunk_text in self.pending_chunks:
+            task = asyncio.create_task(extract_medical_chunk(len(self.chunk_tasks), chunk_text, self.extractor))
+            self.chunk_tasks.append(task)
+            if len(self.page_texts) < self.page_count:
+                self.chunks_started_early += 1
+        self.pending_chunks = []
+    
+    def add_page(self, page):
+        """
+        Add a read page and start the work its text makes possible
+        """
+        self.pages[page["page"] - 1] = page
+        while len(self.page_texts) < self.page_count and self.pages[len(self.page_texts)] is not None:
+            text = self.pages[len(self.page_texts)]["text"]
+            self.page_texts.append(text)
+            if text:
+                self.text_pages += 1
+                self.text_chars += len(text) + 1
+            if self.router:
+                self.router.add_page(text)
+            if self.chunker:
+                self.pending_chunks.extend(self.chunker.add_page(text))
+        
+        # Drop whichever mode is ruled out, and start chunks as soon as chunking is certain
+        routing = self.routing_decision()
+        if routing is True:
+            self.chunker = None
+            self.pending_chunks = []
+        elif routing is False:
+            self.router = None
+            if self.chunking_decision():
+                self._start_pending_chunks()
+    
+    async def consume(self, page_queue):
+        """
+        Take every page of the document off page_queue
+        """
+        for _ in range(self.page_count):
+            self.add_page(await page_queue.get())
+    
+    async def classify(self):
+        """
+        Classify the document once every page has been added
+        """
+        if self.insurance_type == "medical":
+            if self.routing_decision():
+                return await classify_medical_fields_routed(self.page_texts, self.router, self.extractor)
+            if self.chunking_decision():
+                self.pending_chunks.extend(self.chunker.finish())
+                self._start_pending_chunks()
+                partials = await asyncio.gather(*self.chunk_tasks, return_exceptions=True)
+                return merge_medical_chunk_results(partials, {"medical_chunks_started_early": self.chunks_started_early})
+        
+        full_text = "\n".join(text for text in self.page_texts if text)
+        return await classify_document_text(
+            full_text, self.insurance_type, self.vehicle_type, self.page_texts, self.extractor, self.layout_fields
+        )
+    
+    def cancel(self):
+        """
+        Stop chunk extractions still in flight
+        """
+        for task in self.chunk_tasks:
+            task.cancel()
+
+def is_processed_result(result):
+    """
+    Check whether a pipeline result is extracted data rather than an error
+    """
+    return isinstance(result, dict) and ("Coverton imp_keys" in result or "medical_insurance" in result)
+
+def resolve_product_type(product_type):
+    """
+    Convert a product type into the (insurance_type, vehicle_type) used by the pipeline
     """
-    # Convert product type to insurance type and vehicle type
     if product_type in ["CAR", "BIKE"]:
-        insurance_type = "vehicle"
-        vehicle_type = product_type.lower()
+        return "vehicle", product_type.lower()
     elif product_type == "HEALTH":
-        insurance_type = "medical"
-        vehicle_type = None
-    else:
+        return "medical", None
+    return None, None
+
+async def process_insurance_document(pdf_file, product_type, vehicle_type=None, force_refresh=False, ocr_backend=None):
+    """
+    Main function to process insurance document
+    
+    Results are cached by PDF content, product type and PROMPT_VERSION;
+    force_refresh skips the cache lookup and re-processes the document.
+    ocr_backend picks the OCR engine for this document instead of the configured one.
+    """
+    # Convert product type to insurance type and vehicle type
+    insurance_type, vehicle_type = resolve_product_type(product_type)
+    if insurance_type is None:
         return {"error": "Invalid product type. Must be CAR, BIKE, or HEALTH."}
     
     if insurance_type == "vehicle":
         if vehicle_type not in ["bike", "car"]:
             return {"error": "Invalid vehicle type. Must be bike or car."}
-        return await extract_text_from_pdf_with_vision(pdf_file, insurance_type, vehicle_type)
-    elif insurance_type == "medical":
-        return await extract_text_from_pdf_with_vision(pdf_file, insurance_type)
-    else:
+    elif insurance_type != "medical":
         return {"error": "Invalid insurance type. Must be vehicle or medical."}
+    
+    try:
+        # Spool the upload to disk instead of reading it into memory
+        pdf_path, pdf_sha256 = await spool_upload(pdf_file)
+    except Exception as e:
+        return f"⚠️ Error processing PDF: {str(e)}"
+    
+    try:
+        return await process_pdf_file(pdf_path, product_type, force_refresh, pdf_sha256=pdf_sha256, ocr_backend=ocr_backend)
+    finally:
+        os.remove(pdf_path)
+
+def result_cache_key(pdf_sha256, product_type, ocr_backend=None):
+    """
+    Result cache key of a document processed with the current prompts, OCR backend and LLM extractor
+    """
+    if not ocr_backend:
+        ocr_backend = OCR_BACKEND
+        # Without an explicit backend the routing policy decides which engine reads each page
+        if OCR_ROUTING == "local_digital":
+            ocr_backend = f"{OCR_BACKEND}+{OCR_ROUTING}:{OCR_LOCAL_BACKEND}"
+    return make_cache_key(pdf_sha256, product_type, PROMPT_VERSION, ocr_backend, extractor_spec_for_product(product_type))
+
+async def process_pdf_file(pdf_path, product_type, force_refresh=False, progress_callback=None, pdf_sha256=None, ocr_backend=None):
+    """
+    Process a PDF file on disk for a product type, using the result cache unless force_refresh is set.
+    
+    progress_callback(pages_done, pages_total) reports page-level progress.
+    """
+    insurance_type, vehicle_type = resolve_product_type(product_type)
+    if insurance_type is None:
+        return {"error": "Invalid product type. Must be CAR, BIKE, or HEALTH."}
+    
+    # Identical uploads of the same product type reuse the stored result
+    pdf_sha256 = pdf_sha256 or await asyncio.to_thread(hash_file, pdf_path)
+    cache_key = result_cache_key(pdf_sha256, product_type, ocr_backend)
+    if RESULT_CACHE_ENABLED and not force_refresh:
+        cached_result = await asyncio.to_thread(get_result_cache().get, cache_key)
+        if cached_result is not None:
+            cached_result.setdefault("processing_metadata", {})["result_cache"] = "hit"
+            return cached_result
+    
+    result = await extract_text_from_pdf_path(
+        pdf_path, insurance_type, vehicle_type, progress_callback=progress_callback, pdf_sha256=pdf_sha256,
+        ocr_backend=ocr_backend
+    )
+    
+    if RESULT_CACHE_ENABLED and is_processed_result(result):
+        await asyncio.to_thread(get_result_cache().set, cache_key, result)
+        result.setdefault("processing_metadata", {})["result_cache"] = "miss"
+    return result
+
+async def reclassify_from_ocr_cache(pdf_sha256, product_type):
+    """
+    Rerun only the Gemini stage of a previously processed document using its cached page texts
+    """
+    insurance_type, vehicle_type = resolve_product_type(product_type)
+    if insurance_type is None:
+        return {"error": "Invalid product type. Must be CAR, BIKE, or HEALTH."}
+    
+    page_texts = await asyncio.to_thread(get_ocr_cache().get_document_pages, pdf_sha256)
+    if page_texts is None:
+        return {"error": f"No cached OCR text for document {pdf_sha256}"}
+    
+    full_text = "\n".join(text for text in page_texts if text)
+    result = await classify_document_text(full_text, insurance_type, vehicle_type, page_texts)
+    result = attach_processing_metadata(result, {"pdf_sha256": pdf_sha256, "page_count": len(page_texts), "ocr_cache": "document"})
+    
+    # Refresh the result cache for the current prompt version
+    if RESULT_CACHE_ENABLED and is_processed_result(result):
+        await asyncio.to_thread(get_result_cache().set, result_cache_key(pdf_sha256, product_type), result)
+    return result
 
 def format_dates_in_vehicle_json(data):
     """